@@ -0,0 +1,54 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+"""
+Compares the throughput of the synchronous workers (run.sh webserver, 8 gunicorn workers) against the
+asynchronous serving mode (run.sh asgi) for the endpoints the latter serves natively. Both have to be
+started against the same database beforehand.
+
+usage: python dev.py bench async_throughput [sync_url] [async_url] [concurrency] [requests]
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from time import perf_counter
+
+import requests
+
+QUERIES = [
+    '/api/geo/vg250/?agg_level=gemeinde&zoom_level=6',
+    '/api/geo/vg250/?agg_level=kreis&zoom_level=8&filter_boundingbox_southwest_lng=8.0'
+    '&filter_boundingbox_southwest_lat=50.0&filter_boundingbox_northeast_lng=10.0&filter_boundingbox_northeast_lat=52.0',
+    '/api/geo/vg250/?agg_level=land&zoom_level=4&filter_level=land&filter_names=Bayern&filter_names=Hessen',
+]
+
+
+def run(base_url, concurrency, total):
+    session = requests.Session()
+    session.mount(base_url, requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+
+    def request(i):
+        start = perf_counter()
+        # the compressed cache of the synchronous workers would otherwise answer most requests
+        response = session.get(base_url + QUERIES[i % len(QUERIES)], headers={'Accept-Encoding': 'identity'})
+        return perf_counter() - start, response.status_code
+
+    start = perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(request, range(total)))
+    elapsed = perf_counter() - start
+    latencies = [latency for latency, _ in results]
+    failed = sum(1 for _, status in results if status != 200)
+    percentiles = quantiles(latencies, n=100)
+    return total / elapsed, percentiles[49], percentiles[94], failed
+
+
+def main(sync_url='http://localhost:8080', async_url='http://localhost:8081', concurrency='200', total='2000'):
+    for name, base_url in [('sync', sync_url), ('async', async_url)]:
+        throughput, p50, p95, failed = run(base_url.rstrip('/'), int(concurrency), int(total))
+        print(f'{name:<6} {throughput:8.1f} req/s   p50 {p50 * 1e3:8.1f} ms   p95 {p95 * 1e3:8.1f} ms   failed {failed}')
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
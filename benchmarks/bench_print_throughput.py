@@ -0,0 +1,49 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+"""
+Measures the prints per second of headless_qgis /print with the simple example layout. Start the service
+once with its worker pool (HEADLESS_QGIS_POOL_SIZE, default 2) and once with HEADLESS_QGIS_POOL_SIZE=0,
+which starts a new interpreter per print, to compare both. Every print posts the same script and data, so
+start the service with HEADLESS_QGIS_CACHE_SIZE=0, otherwise all but the first print are answered from the
+print cache.
+
+usage: python dev.py bench print_throughput [url] [concurrency] [prints]
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from statistics import quantiles
+from time import perf_counter
+
+import requests
+
+EXAMPLE = Path(__file__).parent.parent / 'headless_qgis' / 'example' / 'simple'
+FILES = ['layout.qgz', 'deu_ne_adm1 1.gpkg']
+
+
+def main(url='http://localhost:8080/print', concurrency='2', total='20'):
+    script = (EXAMPLE / 'qgis_print.py').read_bytes()
+    data = [(name, (EXAMPLE / name).read_bytes()) for name in FILES]
+
+    def request(_):
+        start = perf_counter()
+        response = requests.post(url, files=[('script', ('qgis_print.py', script))] + [
+            ('data', (name, content)) for name, content in data
+        ])
+        return perf_counter() - start, response.status_code
+
+    start = perf_counter()
+    with ThreadPoolExecutor(int(concurrency)) as executor:
+        results = list(executor.map(request, range(int(total))))
+    elapsed = perf_counter() - start
+    latencies = [latency for latency, _ in results]
+    failed = sum(1 for _, status in results if status != 200)
+    percentiles = quantiles(latencies, n=100)
+    print(f'{int(total) / elapsed:8.2f} prints/s   p50 {percentiles[49] * 1e3:8.1f} ms   '
+          f'p95 {percentiles[94] * 1e3:8.1f} ms   failed {failed}')
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
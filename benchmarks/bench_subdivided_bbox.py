@@ -0,0 +1,55 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+"""
+Compares clipping a large country to a small viewport directly on 'adm0' against
+clipping the pieces of 'adm0_subdivided' and reassembling them.
+
+usage: python dev.py bench subdivided_bbox [adm0_code] [source] [geometry_level] [repetitions]
+"""
+
+import sys
+from statistics import median
+from time import perf_counter
+
+from sqlalchemy import text
+
+from geoservice import app
+from geoservice.model import db
+
+# a viewport of roughly 100 x 100 km around Moscow
+BBOX = {'xmin': 37.0, 'ymin': 55.3, 'xmax': 38.2, 'ymax': 56.1}
+
+QUERIES = {
+    'direct': """
+        SELECT adm0_code, ST_Intersection(geometry, ST_MakeEnvelope(:xmin, :ymin, :xmax, :ymax, 4326)) AS geometry
+        FROM adm0
+        WHERE adm0_code = :adm0_code AND source = :source AND geometry_level = :geometry_level
+            AND ST_Intersects(geometry, ST_MakeEnvelope(:xmin, :ymin, :xmax, :ymax, 4326))
+    """,
+    'subdivided': """
+        SELECT adm0.adm0_code,
+            ST_Union(ST_Intersection(pieces.geometry, ST_MakeEnvelope(:xmin, :ymin, :xmax, :ymax, 4326))) AS geometry
+        FROM adm0
+        JOIN adm0_subdivided AS pieces ON pieces.parent_id = adm0.id
+        WHERE adm0.adm0_code = :adm0_code AND adm0.source = :source AND adm0.geometry_level = :geometry_level
+            AND ST_Intersects(pieces.geometry, ST_MakeEnvelope(:xmin, :ymin, :xmax, :ymax, 4326))
+        GROUP BY adm0.id, adm0.adm0_code
+    """,
+}
+
+
+def main(adm0_code='RUS', source='gadm', geometry_level='0', repetitions='10'):
+    parameters = dict(BBOX, adm0_code=adm0_code, source=source, geometry_level=int(geometry_level))
+    with app.app_context():
+        for name, query in QUERIES.items():
+            timings = []
+            for _ in range(int(repetitions)):
+                start = perf_counter()
+                db.session.execute(text(query), parameters).all()
+                timings.append(perf_counter() - start)
+            print(f'{name:<12} median {median(timings) * 1e3:9.1f} ms   min {min(timings) * 1e3:9.1f} ms')
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -62,6 +62,11 @@ def command_test(*args):
         })
 
 
+def command_bench(name, *args):
+    """runs the benchmark benchmarks/bench_<name>.py against the configured database"""
+    shell(["python", abspath("benchmarks", f"bench_{name}.py")] + list(args))
+
+
 def command_help():
     """displays the help message"""
     print("usage: build <command> [<args>...]")
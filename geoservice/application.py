@@ -5,6 +5,7 @@ import json
 import logging
 import os
 import ssl
+import tempfile
 from typing import Optional
 
 from flask import Flask
@@ -61,6 +62,16 @@ class Application(Flask):
         database_database: str = "",
         database_tls: str = "",
         database_path: str = "",
+        database_read_hosts: str = "",
+        database_read_strategy: str = "round_robin",
+        database_read_retry_interval: str = "30",
+        database_pool_size: str = "5",
+        database_pool_max_overflow: str = "10",
+        database_pool_timeout: str = "30",
+        database_pool_recycle: str = "300",
+        database_pool_pre_ping: str = "true",
+        database_statement_timeout: str = "4500",
+        database_statement_timeouts: str = "{}",
         default_minio_server: str = "",
         minio_s3_endpoint: str = "",
         default_minio_access_key: str = "",
@@ -75,6 +86,35 @@ class Application(Flask):
         etl_pull_missing_files_for_local_runtime: str = "false",
         etl_remote_sources="{}",
         etl_remote_sources_secrets="{}",
+        lookup_refresh_interval: str = "60",
+        adaptive_degradation: str = "false",
+        adaptive_saturation: str = "0.8",
+        adaptive_latency: str = "0.5",
+        admission: str = "{}",
+        admission_default: str = '{"capacity": 12, "queue": 2, "timeout": 2}',
+        admission_waiting: str = "2",
+        admission_retry_after: str = "2",
+        single_flight_directory: str = os.path.join(tempfile.gettempdir(), "geoservice", "single_flight"),
+        single_flight_ttl: str = "2",
+        single_flight_timeout: str = "3",
+        compression_min_size: str = "1024",
+        compression_stream_size: str = "1048576",
+        compression_cache_directory: str = os.path.join(tempfile.gettempdir(), "geoservice", "compressed"),
+        compression_cache_size: str = "536870912",
+        async_pool_size: str = "100",
+        async_wsgi_threads: str = "8",
+        warmer_enabled: str = "true",
+        warmer_directory: str = os.path.join(tempfile.gettempdir(), "geoservice", "warmer"),
+        warmer_size: str = "100",
+        warmer_rate: str = "2",
+        warmer_interval: str = "60",
+        monitoring_budgets: str = "{}",
+        monitoring_cache_ttl: str = "5",
+        svg_path_cache_size: str = "134217728",
+        static_map_cache_size: str = "268435456",
+        geometry_engine: str = "database",
+        geometry_engine_min_level: str = "3",
+        geometry_store_path: str = "",
         **kwargs
     ):
 
@@ -91,7 +131,9 @@ class Application(Flask):
             insensitively equal to the string 'true' is considered false.
 
         database_type:
-            The database to use. Currently supported are 'hana', 'sqlilte'
+            The database to use. Currently supported are 'hana', 'sqlilte', and 'snapshot' for a read-only
+            snapshot written by `flask etl snapshot`, which serves /api/geo/, vg250, population and metadata
+            without PostgreSQL
 
         database_host:
             The host of the database, e.g. 'hana.example.com'
@@ -112,7 +154,29 @@ class Application(Flask):
             whether to use TLS to connect to the database, e.g. 'true'
 
         database_path:
-            The path to the database, e.g. '/path/to/database.db' (only applies to sqlite)
+            The path to the database, e.g. '/path/to/database.db' (only applies to sqlite and snapshot)
+
+        database_read_hosts:
+            comma separated read replicas of the database used by the API, e.g.
+            'replica1.example.com,replica2.example.com:5433' (only applies to postgres).
+            The ETL and the CLI always use database_host
+
+        database_read_strategy:
+            how the API chooses a read replica, 'round_robin' or 'least_connections'
+
+        database_read_retry_interval:
+            seconds an unavailable read replica is skipped
+
+        database_pool_size, database_pool_max_overflow, database_pool_timeout, database_pool_recycle,
+        database_pool_pre_ping:
+            connection pool settings of every database engine (only apply to postgres), see
+            https://docs.sqlalchemy.org/en/20/core/pooling.html
+
+        database_statement_timeout:
+            milliseconds an API query may run before postgres cancels it, '0' disables the limit
+
+        database_statement_timeouts:
+            json object overriding database_statement_timeout per endpoint, e.g. '{"api.api_geo_vg250": 8000}'
 
         secret_key:
             secret, random value, used in generation of client side sessions
@@ -123,6 +187,106 @@ class Application(Flask):
         local_runtime:
             determines if current runtime environment is local
 
+        lookup_refresh_interval:
+            seconds between checks whether in-memory lookup tables (e.g. the LinkTable codes) are outdated
+
+        adaptive_degradation:
+            whether geometry requests are served at a coarser geometry level under load or when their
+            query times out, unless the request sets 'adaptive' itself
+
+        adaptive_saturation:
+            share of the connection pool in use from which adaptive requests start at a coarser level
+
+        adaptive_latency:
+            share of the statement timeout the 95th latency percentile of an endpoint may reach before
+            adaptive requests start at a coarser level
+
+        admission_default:
+            json object limiting every API endpoint per worker: 'capacity' cost units in use at a time
+            (a request costs 1 plus up to 10 for a full resolution request of the whole world), at most
+            'queue' requests waiting up to 'timeout' seconds for free units. Other requests get a 503
+
+        admission:
+            json object overriding admission_default per endpoint, e.g. '{"api.api_landscan": {"capacity": 11}}'
+
+        admission_waiting:
+            requests of a worker waiting for admission across all endpoints. Waiting requests hold their thread,
+            so this stays below the threads per worker (GEOSERVICE_WEBWORKER_THREADS), leaving threads for
+            cheap requests
+
+        admission_retry_after:
+            seconds sent in the Retry-After header of rejected requests
+
+        single_flight_directory:
+            directory shared by the workers of a host to coalesce identical concurrent requests
+
+        single_flight_ttl:
+            seconds the result of a request is kept for the identical requests of other workers which waited for it
+
+        single_flight_timeout:
+            seconds a request waits for an identical one before computing itself, below the timeout of the
+            workers (GEOSERVICE_WEBWORKER_TIMEOUT)
+
+        compression_min_size:
+            bytes from which responses are compressed (gzip, and br or zstd if brotli or zstandard are installed)
+
+        compression_stream_size:
+            bytes from which responses are compressed while they are sent instead of at once
+
+        compression_cache_directory:
+            directory shared by the workers of a host holding the compressed API responses per data version
+
+        compression_cache_size:
+            bytes the compressed API responses may take, the least recently used ones are removed beyond it
+
+        async_pool_size:
+            connections of every database engine of the asynchronous serving mode (geoservice.asgi), which
+            bounds the queries in flight per process
+
+        async_wsgi_threads:
+            threads of the asynchronous serving mode running the endpoints it does not serve itself
+
+        warmer_enabled:
+            whether one worker per host replays the hot API queries on startup and after the data changed
+
+        warmer_directory:
+            directory shared by the workers of a host holding the counts of the API queries served
+
+        warmer_size:
+            number of the most frequent API queries replayed
+
+        warmer_rate:
+            API queries replayed per second at most, one at a time
+
+        warmer_interval:
+            seconds between the checks whether the data changed and the caches have to be warmed
+
+        monitoring_budgets:
+            json object overriding the latency budgets in milliseconds of the /monitoring/ probes,
+            e.g. '{"landscan": 500}'
+
+        monitoring_cache_ttl:
+            seconds the result of the /monitoring/ probes is reused
+
+        svg_path_cache_size:
+            bytes of SVG path data of the /api/geo/svg/ geometries each worker keeps in memory
+
+        static_map_cache_size:
+            bytes of rendered raster and boundary layers of /api/geo/map/ each worker keeps in memory
+
+        geometry_engine:
+            'memory' holds the adm0, adm1 and vg250 geometries from geometry_engine_min_level on in every worker
+            with an STRtree, and answers /api/geo/ and vg250 on these levels without the database; 'database'
+            queries PostGIS for all levels
+
+        geometry_engine_min_level:
+            most detailed geometry level held in memory by the 'memory' geometry engine, the levels below are
+            queried from PostGIS
+
+        geometry_store_path:
+            file the ETL writes the geometries of the 'memory' geometry engine to, mapped read-only by every
+            worker instead of loading them from the database; empty loads them in every worker
+
         """
         debug = debug.lower() == "true"
         local_runtime = local_runtime.lower() == "true"
@@ -141,20 +305,56 @@ class Application(Flask):
                     f"postgresql+pg8000://{database_user}:{database_password}@{database_host}:{database_port}/{database_database}",
                 "SQLALCHEMY_ENGINE_OPTIONS": {
                     'connect_args': {'ssl_context': ssl_context},
-                    'pool_recycle': 300,
+                    'pool_size': int(database_pool_size),
+                    'max_overflow': int(database_pool_max_overflow),
+                    'pool_timeout': float(database_pool_timeout),
+                    'pool_recycle': int(database_pool_recycle),
+                    'pool_pre_ping': database_pool_pre_ping.lower() == "true",
                 },
                 "DATABASE_USER": database_user,
                 "DATABASE_PASSWORD": database_password,
                 "DATABASE_HOST": database_host,
                 "DATABASE_PORT": database_port,
-                "DATABASE_NAME": database_database
+                "DATABASE_NAME": database_database,
+                "DATABASE_READ_URIS": [
+                    f"postgresql+pg8000://{database_user}:{database_password}@{read_host}"
+                    f"{'' if ':' in read_host else f':{database_port}'}/{database_database}"
+                    for read_host in map(str.strip, database_read_hosts.split(","))
+                    if read_host
+                ],
+                "ASYNC_DATABASE_URIS": [
+                    f"postgresql+asyncpg://{database_user}:{database_password}@{host}"
+                    f"{'' if ':' in host else f':{database_port}'}/{database_database}"
+                    for host in (
+                        [read_host for read_host in map(str.strip, database_read_hosts.split(",")) if read_host]
+                        or [database_host]
+                    )
+                ],
+                "ASYNC_ENGINE_OPTIONS": {
+                    'connect_args': {'ssl': ssl_context},
+                    'pool_size': int(async_pool_size),
+                    'max_overflow': 0,
+                    'pool_timeout': float(database_pool_timeout),
+                    'pool_recycle': int(database_pool_recycle),
+                    'pool_pre_ping': database_pool_pre_ping.lower() == "true",
+                },
             })
         elif database_type == "sqlite":
             self.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database_path}"
+        elif database_type == "snapshot":
+            # the file is replaced as a whole and never written while it is open
+            self.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///file:{database_path}?mode=ro&immutable=1&uri=true"
         else:
             self.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///:memory:"
             self.logger.critical(f"Unknown database type '{database_type}', fallback to in-memory db")
 
+        self.config["SNAPSHOT_PATH"] = database_path if database_type == "snapshot" else ""
+        self.config.setdefault("DATABASE_READ_URIS", [])
+        self.config.setdefault("ASYNC_DATABASE_URIS", [])
+        self.config["DATABASE_READ_STRATEGY"] = database_read_strategy
+        self.config["DATABASE_READ_RETRY_INTERVAL"] = float(database_read_retry_interval)
+        self.config["DATABASE_STATEMENT_TIMEOUT"] = int(database_statement_timeout)
+        self.config["DATABASE_STATEMENT_TIMEOUTS"] = json.loads(database_statement_timeouts)
         self.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = debug
 
         # Minio
@@ -172,6 +372,56 @@ class Application(Flask):
         self.config["ETL_REMOTE_SOURCES_SECRETS"] = json.loads(etl_remote_sources_secrets) \
             if etl_remote_sources_secrets else {}
 
+        # Lookups
+        self.config["LOOKUP_REFRESH_INTERVAL"] = float(lookup_refresh_interval)
+
+        # Adaptive degradation
+        self.config["ADAPTIVE_DEGRADATION"] = adaptive_degradation.lower() == "true"
+        self.config["ADAPTIVE_SATURATION"] = float(adaptive_saturation)
+        self.config["ADAPTIVE_LATENCY"] = float(adaptive_latency)
+
+        # Admission control
+        self.config["ADMISSION"] = json.loads(admission)
+        self.config["ADMISSION_DEFAULT"] = json.loads(admission_default)
+        self.config["ADMISSION_WAITING"] = int(admission_waiting)
+        self.config["ADMISSION_RETRY_AFTER"] = int(admission_retry_after)
+
+        # Single flight
+        self.config["SINGLE_FLIGHT_DIRECTORY"] = single_flight_directory
+        self.config["SINGLE_FLIGHT_TTL"] = float(single_flight_ttl)
+        self.config["SINGLE_FLIGHT_TIMEOUT"] = float(single_flight_timeout)
+
+        # Compression
+        self.config["COMPRESSION_MIN_SIZE"] = int(compression_min_size)
+        self.config["COMPRESSION_STREAM_SIZE"] = int(compression_stream_size)
+        self.config["COMPRESSION_CACHE_DIRECTORY"] = compression_cache_directory
+        self.config["COMPRESSION_CACHE_SIZE"] = int(compression_cache_size)
+
+        # Asynchronous serving mode
+        self.config["ASYNC_WSGI_THREADS"] = int(async_wsgi_threads)
+
+        # Warmer
+        self.config["WARMER_ENABLED"] = warmer_enabled.lower() == "true"
+        self.config["WARMER_DIRECTORY"] = warmer_directory
+        self.config["WARMER_SIZE"] = int(warmer_size)
+        self.config["WARMER_RATE"] = float(warmer_rate)
+        self.config["WARMER_INTERVAL"] = float(warmer_interval)
+
+        # Monitoring
+        self.config["MONITORING_BUDGETS"] = json.loads(monitoring_budgets)
+        self.config["MONITORING_CACHE_TTL"] = float(monitoring_cache_ttl)
+
+        # SVG rendering
+        self.config["SVG_PATH_CACHE_SIZE"] = int(svg_path_cache_size)
+
+        # Static maps
+        self.config["STATIC_MAP_CACHE_SIZE"] = int(static_map_cache_size)
+
+        # Geometry engine
+        self.config["GEOMETRY_ENGINE"] = geometry_engine
+        self.config["GEOMETRY_ENGINE_MIN_LEVEL"] = int(geometry_engine_min_level)
+        self.config["GEOMETRY_STORE_PATH"] = geometry_store_path
+
         # Logging
         setup_logging(runconfig_loglevel, debug=debug)
 
@@ -0,0 +1,199 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+"""
+Asynchronous serving mode, requires the 'async' extra (asyncpg, a2wsgi, uvicorn):
+
+    uvicorn geoservice.asgi:application
+
+The endpoints whose responses are built entirely by the database are served on asyncpg connections, so a
+single process keeps as many queries in flight as its pool holds connections. Every other request is passed
+to the Flask application, which runs in a thread pool
+"""
+
+import json
+from itertools import cycle
+from time import perf_counter
+from typing import Awaitable, Callable, Iterable, Iterator, Optional
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from marshmallow import Schema, ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from webargs.multidictproxy import MultiDictProxy
+from werkzeug.datastructures import MultiDict
+
+from . import app
+from .application import Application
+from .model.pool import is_statement_timeout
+from .schemas.vg250_schema import VG250ParameterSchema
+from .utils.compression import compress, negotiate
+from .utils.degradation import COARSEST_LEVEL, DEGRADATION_STEP
+from .utils.geometry_engine import geometry_engine
+from .utils.metrics import metrics
+from .utils.warmer import start_warmer
+from .utils.zoom import geometry_level_for_zoom
+
+# bytes sent per message, so large responses are compressed and sent piece by piece without blocking the loop
+CHUNK_SIZE = 65536
+
+
+def _vg250_native(args: dict) -> bool:
+    # levels held in memory by the geometry engine are answered by the Flask application without the database
+    return not geometry_engine.serves(geometry_level_for_zoom(args.get('zoom_level', 2)))
+
+
+async def _set_statement_timeout(connection: AsyncConnection, timeout: int) -> None:
+    if timeout:
+        await connection.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout:d}')
+
+
+async def _vg250(connection: AsyncConnection, args: dict, timeout: int) -> tuple[Optional[str], dict]:
+    """
+    The document of the vg250 query. Adaptive requests are retried at a coarser level when their statement
+    timed out, as fetch_adaptive does in the Flask application: the first attempt gets half of the budget,
+    every further one what is left of it
+    """
+    geometry_level = geometry_level_for_zoom(args.get('zoom_level', 2))
+    adaptive = args.get('adaptive')
+    if adaptive is None:
+        adaptive = app.config['ADAPTIVE_DEGRADATION']
+    budget = timeout // 2 if adaptive and timeout and geometry_level < COARSEST_LEVEL else timeout
+    started = perf_counter()
+    while True:
+        await _set_statement_timeout(connection, budget)
+        try:
+            result = await connection.execute(VG250ParameterSchema.statement(args, geometry_level))
+            return result.scalar(), {'X-Geometry-Level': str(geometry_level)}
+        except DBAPIError as error:
+            remaining = timeout - int((perf_counter() - started) * 1000)
+            if (not adaptive or not is_statement_timeout(error.orig)
+                    or geometry_level >= COARSEST_LEVEL or remaining <= 0):
+                raise
+            await connection.rollback()
+            metrics.increase('geoservice_database_statement_timeouts_total', endpoint='api.api_geo_vg250')
+            metrics.increase('geoservice_degraded_requests_total', endpoint='api.api_geo_vg250', reason='timeout')
+            geometry_level = min(geometry_level + DEGRADATION_STEP, COARSEST_LEVEL)
+            budget = remaining
+
+
+Handler = Callable[[AsyncConnection, dict, int], Awaitable[tuple[Optional[str], dict]]]
+
+# path: (endpoint of the Flask application, its argument schema, whether the parsed arguments are served natively,
+# handler returning the json document within the statement timeout in milliseconds). Population is answered by
+# the Flask application from the in-memory PopulationLookup
+ROUTES: dict[str, tuple[str, type[Schema], Callable[[dict], bool], Handler]] = {
+    '/api/geo/vg250/': ('api.api_geo_vg250', VG250ParameterSchema, _vg250_native, _vg250),
+}
+
+
+class AsyncApplication:
+    """
+    ASGI entrypoint serving ROUTES natively and everything else by the Flask application, as well as the requests
+    of ROUTES their predicate leaves to it. The database engines are created on startup of the event loop;
+    without them (e.g. on sqlite) all requests are passed on
+    """
+
+    def __init__(self, flask_app: Application):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config['ASYNC_WSGI_THREADS'])
+        self.engines: list[AsyncEngine] = []
+        self._round_robin: Iterator[AsyncEngine] = iter(())
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        route = ROUTES.get(scope['path']) if scope['type'] == 'http' and scope['method'] == 'GET' else None
+        if route is None or not self.engines:
+            return await self.wsgi(scope, receive, send)
+        await self._serve(scope, receive, send, *route)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.engines = [
+                    create_async_engine(uri, **self.flask_app.config['ASYNC_ENGINE_OPTIONS'])
+                    for uri in self.flask_app.config['ASYNC_DATABASE_URIS']
+                ]
+                self._round_robin = cycle(self.engines)
+                if not self.engines:
+                    self.flask_app.logger.warning("No asynchronous database configured, serving all requests by Flask")
+                start_warmer()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for engine in self.engines:
+                    await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _engine(self) -> AsyncEngine:
+        if self.flask_app.config['DATABASE_READ_STRATEGY'] == 'least_connections':
+            return min(self.engines, key=lambda engine: engine.pool.checkedout())
+        return next(self._round_robin)
+
+    async def _serve(self, scope, receive, send, endpoint: str, schema: type[Schema],
+                     native: Callable[[dict], bool], handler: Handler):
+        config = self.flask_app.config
+        headers = MultiDict((name.decode('latin-1').title(), value.decode('latin-1')) for name, value in scope['headers'])
+        query = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        try:
+            args = schema().load(MultiDictProxy(query, schema()))
+        except ValidationError as error:
+            return await self._send(send, headers, 422, _json_error(422, 'Unprocessable Entity', {'query': error.messages}))
+        if not native(args):
+            return await self.wsgi(scope, receive, send)
+        # - - - - - - - - - - - - - - - - - - - -
+        timeout = int(config['DATABASE_STATEMENT_TIMEOUTS'].get(endpoint, config['DATABASE_STATEMENT_TIMEOUT']))
+        try:
+            async with self._engine().connect() as connection:
+                document, response_headers = await handler(connection, args, timeout)
+        except PoolTimeoutError:
+            metrics.increase('geoservice_database_pool_timeouts_total', endpoint=endpoint)
+            return await self._send(send, headers, 503,
+                                    _json_error(503, 'Service Unavailable', message="Too many requests, please retry later"),
+                                    {'Retry-After': str(config['ADMISSION_RETRY_AFTER'])})
+        except DBAPIError as error:
+            if is_statement_timeout(error.orig):
+                metrics.increase('geoservice_database_statement_timeouts_total', endpoint=endpoint)
+            raise
+        await self._send(send, headers, 200, 'null' if document is None else document,
+                         response_headers)
+
+    async def _send(self, send, request_headers: MultiDict, status: int, document: str, headers: Optional[dict] = None):
+        data = document.encode()
+        headers = {'Content-Type': 'application/json', 'Vary': 'Accept-Encoding', **(headers or {})}
+        chunks: Iterable[bytes] = (data[start:start + CHUNK_SIZE] for start in range(0, len(data), CHUNK_SIZE))
+        encoding = negotiate(request_headers.get('Accept-Encoding', ''))
+        if encoding and len(data) >= self.flask_app.config['COMPRESSION_MIN_SIZE']:
+            headers['Content-Encoding'] = encoding
+            chunks = compress(chunks, encoding)
+        else:
+            headers['Content-Length'] = str(len(data))
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()],
+        })
+        for chunk in chunks:
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+def _json_error(code: int, status: str, errors: Optional[dict] = None, message: Optional[str] = None) -> str:
+    # same document as the errors of flask-smorest
+    return json.dumps({
+        'code': code,
+        'status': status,
+        **({'errors': errors} if errors else {}),
+        **({'message': message} if message else {}),
+    })
+
+
+application = AsyncApplication(app)
+
+metrics.gauge('geoservice_async_database_pool_checked_out', 'Connections in use by the asynchronous serving mode',
+              lambda: {(('database', f'async{i}'),): engine.pool.checkedout() for i, engine in enumerate(application.engines)})
@@ -1,14 +1,13 @@
 # Copyright 2025 Bundesdruckerei GmbH
 # For the license, see the accompanying file LICENSE.md.
 
-from functools import reduce
 from time import sleep
+from typing import Callable
 
 import click
-from fsspec.registry import default
 
 from .application import app
-from .controller.data_sources.data_source__base import DataSourceBase
+from .controller.data_sources import data_sources, names
 
 
 @app.cli.group(name='etl')
@@ -16,29 +15,35 @@ def etl_group():
     pass
 
 
-def decorate_multiple(decorators):
-    def decorator(func):
-        return reduce(
-            lambda agg, decorator: decorator(agg),
-            decorators[::-1],
-            func
-        )
-    return decorator
+class LazyOptionsCommand(click.Command):
+    """
+    Command whose options depend on the data sources, which are only imported once the command is parsed
+    """
 
+    def __init__(self, *args, lazy_params: Callable[[], list[click.Parameter]], **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lazy_params = lazy_params
 
-@etl_group.command()
-@click.option('-s', '--sources', type=click.Choice([
-    klass.__name__.replace('DataSource', '').lower()
-    for klass in DataSourceBase.__subclasses__()
-]), help='restrict which data sources should update', multiple=True)
-@decorate_multiple([
-    click.option(f'--{quality}')
-    for quality in set([
-        key
-        for klass in DataSourceBase.__subclasses__()
-        for key in klass.QUALITIES.keys()
-    ])
-])
+    def get_params(self, ctx):
+        if self._lazy_params:
+            self.params = self._lazy_params() + self.params
+            self._lazy_params = None
+        return super().get_params(ctx)
+
+
+def quality_options() -> list[click.Option]:
+    return [
+        click.Option([f'--{quality}'])
+        for quality in sorted(set([
+            key
+            for klass in data_sources()
+            for key in klass.QUALITIES.keys()
+        ]))
+    ]
+
+
+@etl_group.command(cls=LazyOptionsCommand, lazy_params=quality_options)
+@click.option('-s', '--sources', type=click.Choice(names), help='restrict which data sources should update', multiple=True)
 def update(*args, **kwargs):
     quality_restrictions = {
         key: kwargs[key]
@@ -47,7 +52,7 @@ def update(*args, **kwargs):
            and kwargs[key] is not None
     }
     # - - - - - - - - - - - - - - - - - - - -
-    for data_source_klass in DataSourceBase.__subclasses__():
+    for data_source_klass in data_sources():
         data_source_klass.execute_update(
             quality_restrictions=quality_restrictions,
             datasource_restrictions=kwargs['sources']
@@ -55,13 +60,50 @@ def update(*args, **kwargs):
 
 
 @etl_group.command()
-@click.option('-s', '--sources', type=click.Choice([
-    klass.__name__.replace('DataSource', '').lower()
-    for klass in DataSourceBase.__subclasses__()
-]), help='restrict which data sources should update', multiple=True)
+@click.option('-s', '--sources', type=click.Choice(names), help='restrict which data sources should update', multiple=True)
 def fetch(*args, **kwargs):
-    for data_source_klass in DataSourceBase.__subclasses__():
+    for data_source_klass in data_sources():
         data_source_klass.execute_fetch_only(
             datasource_restrictions=kwargs['sources']
         )
-        
+
+
+@etl_group.command()
+@click.argument('path', type=click.Path(dir_okay=False))
+def snapshot(path):
+    """writes a read-only snapshot of the served tables to PATH, see GEOSERVICE_DATABASE_TYPE=snapshot"""
+    from .utils.snapshot import export
+    export(path)
+    click.echo(f'snapshot written to {path}')
+
+
+@etl_group.command()
+@click.argument('path', type=click.Path(dir_okay=False), required=False)
+def store(path):
+    """writes the geometries of the memory geometry engine to PATH, by default GEOSERVICE_GEOMETRY_STORE_PATH"""
+    from .utils.geometry_store import write
+    path = path or app.config['GEOMETRY_STORE_PATH']
+    if not path:
+        raise click.UsageError('PATH or GEOSERVICE_GEOMETRY_STORE_PATH is required')
+    write(path)
+    click.echo(f'geometry store written to {path}')
+
+
+@app.cli.group(name='warm')
+def warm_group():
+    pass
+
+
+@warm_group.command()
+def replay():
+    """replays the hot API queries of this host now"""
+    from .utils.warmer import warmer
+    click.echo(f'{warmer.replay()} queries replayed')
+
+
+@warm_group.command()
+@click.argument('access_log', type=click.File('r'))
+def record(access_log):
+    """adds the API queries of a gunicorn access log to the hot queries of this host"""
+    from .utils.warmer import hot_queries
+    click.echo(f'{hot_queries.record_access_log(access_log)} queries recorded')
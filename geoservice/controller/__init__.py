@@ -1,10 +1,11 @@
 # Copyright 2025 Bundesdruckerei GmbH
 # For the license, see the accompanying file LICENSE.md.
 
-from . import api, frontend
+from . import api, frontend, monitoring
 
 
 __all__ = [
     "frontend",
     "api",
+    "monitoring",
 ]
@@ -1,10 +1,8 @@
 # Copyright 2025 Bundesdruckerei GmbH
 # For the license, see the accompanying file LICENSE.md.
 
-from flask_smorest import Blueprint
-from flask import make_response
-from io import BytesIO
-from matplotlib.colors import ListedColormap
+from flask_smorest import Blueprint, abort
+from flask import jsonify, make_response, g, request
 
 from ..application import flask_api, app
 
@@ -14,6 +12,12 @@ from ..schemas.landscan_schema import LandscanParameterSchema
 from ..schemas.vg250_schema import VG250ParameterSchema
 from ..schemas.population_schema import PopulationParameterSchema
 from ..schemas.metadata_schema import MetadataParameterSchema
+from ..schemas.static_map_schema import StaticMapParameterSchema
+from ..utils.admission import admission, bbox_cost, zoom_cost, GERMANY
+from ..utils.compression import precompressed
+from ..utils.singleflight import single_flight
+from ..utils.snapshot import ENDPOINTS as SNAPSHOT_ENDPOINTS
+from ..utils.warmer import record_hot_query, start_warmer
 
 
 blp = Blueprint(
@@ -23,8 +27,29 @@ blp = Blueprint(
 )
 
 
+@blp.after_request
+def add_geometry_level(response):
+    if 'geometry_level' in g:
+        response.headers['X-Geometry-Level'] = str(g.geometry_level)
+    return response
+
+
+@blp.before_request
+def check_snapshot_mode():
+    if app.config['SNAPSHOT_PATH'] and request.endpoint not in SNAPSHOT_ENDPOINTS:
+        abort(501, message="Not served from a snapshot")
+
+
+blp.after_request(record_hot_query)
+# gunicorn starts the warmer when a worker is ready (geoservice.workers), other servers on the first request
+blp.before_app_request(start_warmer)
+
+
 @blp.route("/geo/", methods=["GET"])
 @blp.arguments(GeoServiceArgs, location="query")
+@precompressed
+@single_flight
+@admission(zoom_cost())
 def api_geo(query_arguments):
     response = make_response(
         GeoServiceArgs.fetch(query_arguments).to_json(),
@@ -35,23 +60,11 @@ def api_geo(query_arguments):
 
 @blp.route("/geo/svg/", methods=["GET"])
 @blp.arguments(GeoServiceImageArgs, location="query")
+@precompressed
+@single_flight
+@admission(zoom_cost())
 def api_geo_svg(query_arguments):
-    dataframe = GeoServiceArgs.fetch(query_arguments).set_index('adm0_code')
-
-    dataframe["weight"] = 0.0
-    for weight in query_arguments.get("filter_image_weights", []):
-        dataframe.loc[weight["code"], "weight"] = weight["value"]
-
-    app.logger.info(dataframe)
-    image = dataframe.to_crs("EPSG:4087").plot(column="weight", cmap=ListedColormap(["#E0E0E0", "#CCE4F0", "#99C9E2", "#66ADD3", "#3392C5", "#0077B6"]))
-    image.axis('off')
-    image.margins(0, 0)
-
-    buffer = BytesIO()
-    image.get_figure().savefig(buffer, format='svg', bbox_inches='tight', pad_inches=0)
-
-    buffer.seek(0)
-    response = make_response(buffer.getvalue())
+    response = make_response(GeoServiceImageArgs.fetch_svg(query_arguments))
     response.mimetype = 'image/svg+xml'
 
     return response
@@ -59,18 +72,26 @@ def api_geo_svg(query_arguments):
 
 @blp.route("geo/vg250/", methods=["GET"])
 @blp.arguments(VG250ParameterSchema, location="query")
+@precompressed
+@single_flight
+@admission(zoom_cost(GERMANY))
 def api_geo_vg250(args):
     return VG250ParameterSchema().fetch(args)
 
 
 @blp.route("geo/population/", methods=["GET"])
 @blp.arguments(PopulationParameterSchema, location="query")
+@precompressed
+@admission()
 def api_geo_population(args):
-    return PopulationParameterSchema().fetch(args)
+    # jsonify, so no values are answered with null
+    return jsonify(PopulationParameterSchema().fetch(args))
 
 
 @blp.route("geo/metadata/", methods=["GET"])
 @blp.arguments(MetadataParameterSchema, location="query")
+@precompressed
+@admission()
 def api_geo_metadata(args):
     response = make_response(MetadataParameterSchema().fetch(args))
     response.headers['Content-Type'] = 'application/json'
@@ -79,14 +100,28 @@ def api_geo_metadata(args):
 
 @blp.route("geo/landscan", methods=["GET"])
 @blp.arguments(LandscanParameterSchema, location="query")
+@precompressed
+@single_flight
+@admission(bbox_cost)
 def api_landscan(args):
     return LandscanParameterSchema.fetch(args)
 
 
 @blp.route("geo/hillshade", methods=["GET"])
 @blp.arguments(HillshadeParameterSchema, location="query")
+@precompressed
+@single_flight
+@admission(bbox_cost)
 def api_hillshade(args):
     return HillshadeParameterSchema.fetch(args)
 
 
+@blp.route("geo/map/", methods=["GET"])
+@blp.arguments(StaticMapParameterSchema, location="query")
+@single_flight
+@admission(bbox_cost)
+def api_geo_map(args):
+    return StaticMapParameterSchema.fetch(args)
+
+
 flask_api.register_blueprint(blp)
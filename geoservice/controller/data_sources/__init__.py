@@ -4,15 +4,27 @@
 import importlib
 from os.path import dirname, basename, isfile, join
 import glob
+from typing import Type
 
 modules = glob.glob(join(dirname(__file__), "*.py"))
-module_names = (
+module_names = sorted(
     basename(f)[:-3]
     for f in modules
-    if isfile(f) and not f.endswith('__init__.py')
+    if isfile(f) and not f.endswith('__init__.py') and not f.endswith('data_source__base.py')
 )
+
+# a data source is named like its class without the 'DataSource' prefix, data_source__populated_places.py
+# holds DataSourcePopulatedPlaces named 'populatedplaces'
+names = [module_name.split('__', 1)[1].replace('_', '') for module_name in module_names]
+
+
+def data_sources() -> list[Type]:
+    """
+    All data sources. Their modules pull in the libraries of the ETL and are only imported on first use
+    """
+    for module_name in module_names:
+        importlib.import_module(f'.{module_name}', package='geoservice.controller.data_sources')
+    from .data_source__base import DataSourceBase
+    return DataSourceBase.__subclasses__()
 # - - - - - - - - - - - - - - - - - - - -
-for module_name in module_names:
-    importlib.import_module(f'.{module_name}', package='geoservice.controller.data_sources')
-# - - - - - - - - - - - - - - - - - - - -
-__all__ = [module_names]
+__all__ = ["data_sources", "names"]
@@ -37,6 +37,8 @@ class DataSourceBase(ABC):
     ENGINE: str = "pyogrio"
     MODEL: Optional[Type[Geoobject]] = None
     CUSTOM_FLOW: bool = False
+    SUBDIVIDE_MAX_VERTICES: int = 256
+    MERCATOR_MAX_LATITUDE: float = 85.0511287798
     logger = logging.getLogger('geoservice.etl')
 
     # ---------------------------------------
@@ -280,6 +282,8 @@ class DataSourceBase(ABC):
                             quality_allocation=quality_allocation,
                             quality_restrictions=quality_restrictions
                         )
+                cls._write_geometry_store()
+                cls._sql_update_data_version()
         except Exception as e:
             with logger_indent():
                 cls.logger.exception(e)
@@ -301,6 +305,34 @@ class DataSourceBase(ABC):
                                  'adaptionDate':currentdatetime})
         db.session.commit()
 
+    @classmethod
+    def _write_geometry_store(cls):
+        """
+        This function rewrites the geometry store of the workers if this data source writes its geometries. It
+        runs before the data version is increased and stamps the store with that version, so workers noticing
+        the new version find the store already written
+        """
+        from geoservice.utils.geometry_store import SOURCES, current_versions, write
+        path = geoservice.app.config['GEOMETRY_STORE_PATH']
+        source = cls.__name__.replace('DataSource', '').lower()
+        if not path or source not in SOURCES:
+            return
+        versions = current_versions()
+        write(path, {**versions, source: versions.get(source, 0) + 1})
+
+    @classmethod
+    def _sql_update_data_version(cls):
+        """
+        This function increases the data version of the data source, so workers reload their in-memory copies
+        """
+        db.session.execute(text("""INSERT INTO data_version (source, version, updated)
+                                VALUES (:source, 1, :updated)
+                                ON CONFLICT (source) DO UPDATE
+                                SET version = data_version.version + 1, updated = :updated;"""),
+                                {'source': cls.__name__.replace('DataSource', '').lower(),
+                                 'updated': datetime.datetime.now()})
+        db.session.commit()
+
     @classmethod
     def _sql_update_bbox(cls, source:str, gdf: GeoDataFrame, qualities: Optional[NamedTuple] = None):
         """
@@ -328,3 +360,68 @@ class DataSourceBase(ABC):
                                 {'source':source,
                                  'crs':crs})
         db.session.commit()
+
+    @classmethod
+    def _sql_update_part_areas(cls, table: str, simplification_level: int, **conditions):
+        """
+        This function stores the area of every polygon part (in ST_Dump order) and of the largest part
+        of the given table for one simplification level, the API uses them to drop sub-pixel polygons and parts
+        """
+        where = " AND ".join(
+            ["geometry_level = :simplification_level"] + [f"{column} = :{column}" for column in conditions]
+        )
+        db.session.execute(text(f"""
+                UPDATE {table}
+                SET part_areas = areas.part_areas, area = areas.area
+                FROM (
+                    SELECT id, array_agg(ST_Area(parts.geom) ORDER BY parts.path) AS part_areas,
+                        max(ST_Area(parts.geom)) AS area
+                    FROM {table}, ST_Dump(geometry) AS parts
+                    WHERE {where}
+                    GROUP BY id
+                ) AS areas
+                WHERE {table}.id = areas.id;"""),
+            dict(conditions, simplification_level=simplification_level))
+        db.session.commit()
+
+    @classmethod
+    def _sql_update_projected(cls, table: str, simplification_level: int, **conditions):
+        """
+        This function stores the geometries of the given table for one simplification level projected to
+        the rendering CRSs, so the map endpoints draw them without reprojecting
+        """
+        where = " AND ".join(
+            ["geometry_level = :simplification_level"] + [f"{column} = :{column}" for column in conditions]
+        )
+        db.session.execute(text(f"""
+                UPDATE {table}
+                SET geometry_4087 = ST_Transform(geometry, 4087),
+                    geometry_3857 = ST_Transform(ST_ClipByBox2D(geometry, ST_MakeEnvelope(
+                        -180, -:max_latitude, 180, :max_latitude, 4326)::box2d), 3857)
+                WHERE {where};"""),
+            dict(conditions, simplification_level=simplification_level, max_latitude=cls.MERCATOR_MAX_LATITUDE))
+        db.session.commit()
+
+    @classmethod
+    def _sql_replace_subdivided(cls, table: str, simplification_level: int, **conditions):
+        """
+        This function recreates the subdivided pieces of the given table for one simplification level,
+        the pieces are used by the API to clip geometries to a bbox without touching the whole polygon.
+        Every polygon part is subdivided on its own, so each piece carries the area of its part
+        """
+        where = " AND ".join(
+            ["geometry_level = :simplification_level"] + [f"{column} = :{column}" for column in conditions]
+        )
+        parameters = dict(conditions, simplification_level=simplification_level)
+        # - - - - - - - - - - - - - - - - - - - -
+        db.session.execute(text(f"""
+                DELETE FROM {table}_subdivided
+                WHERE parent_id IN (SELECT id FROM {table} WHERE {where});"""),
+            parameters)
+        db.session.execute(text(f"""
+                INSERT INTO {table}_subdivided(parent_id, geometry_level, part_area, geometry)
+                SELECT id, geometry_level, ST_Area(parts.geom), ST_Subdivide(parts.geom, :max_vertices) AS geometry
+                FROM {table}, ST_Dump(geometry) AS parts
+                WHERE {where};"""),
+            dict(parameters, max_vertices=cls.SUBDIVIDE_MAX_VERTICES))
+        db.session.commit()
@@ -220,6 +220,9 @@ class DataSourceGADM(DataSourceBase):
                 db.session.add_all(list(map(lambda row: model(**row[1].to_dict()), gdf.iterrows())))
                 db.session.commit()
                 cls.logger.info("adm_level adm1 with simplification_level 0 loaded in database ...")
+                cls._sql_update_part_areas('adm1', 0, source=source)
+                cls._sql_update_projected('adm1', 0, source=source)
+                cls._sql_replace_subdivided('adm1', 0, source=source)
                 cls._sql_update_bbox(source, gdf, qualities)
                 cls._sql_update_crs(source, gdf, qualities)
 
@@ -246,6 +249,12 @@ class DataSourceGADM(DataSourceBase):
                 cls._sql_replace_adm0_0(source, simp_fact, qualities)
             if qualities.simplification_level in range(1,11): 
                 cls._sql_replace_adm0_1to10(source, simp_fact, qualities)
+
+        # adm1 level 0 has already been measured, projected and subdivided right after loading it
+        if (qualities.adm_level, qualities.simplification_level) != ('adm1', 0):
+            cls._sql_update_part_areas(qualities.adm_level, qualities.simplification_level, source=source)
+            cls._sql_update_projected(qualities.adm_level, qualities.simplification_level, source=source)
+            cls._sql_replace_subdivided(qualities.adm_level, qualities.simplification_level, source=source)
         
         cls._sql_update_metadatastate(source, qualities)
 
@@ -47,6 +47,7 @@ class DataSourceHillshade(DataSourceBase):
                 '-M',  # vacuum and analyze after load
                 '-Y', '50',  # batch processing
                 '-t', 'auto',  # block size same as tif
+                '-l', '4,16,64',  # overview tables for the map renderer
                 str(cls.LOCAL_STORAGE_PATH),
                 'hillshade',  # target table name
                 '|',  # - - - - - - - - - - - - - - - - - - - -
@@ -343,6 +343,9 @@ class DataSourceVG250(DataSourceBase):
             db.session.add_all(
                 list(map(lambda row: model(**row[1].to_dict()), gdf.iterrows())))
             db.session.commit()
+            cls._sql_update_part_areas('vg250', 0, agg_level='gemeinde')
+            cls._sql_update_projected('vg250', 0, agg_level='gemeinde')
+            cls._sql_replace_subdivided('vg250', 0, agg_level='gemeinde')
             cls._sql_update_bbox("vg250", gdf, qualities)
             cls._sql_update_crs("vg250", gdf, qualities)
             cls.logger.info(
@@ -369,4 +372,10 @@ class DataSourceVG250(DataSourceBase):
         if qualities.adm_level != "gemeinde":
             cls._sql_replace_vg250_1to10(simp_fact, qualities)
 
+        # gemeinde level 0 has already been measured, projected and subdivided right after loading it
+        if (qualities.adm_level, qualities.simplification_level) != ('gemeinde', 0):
+            cls._sql_update_part_areas('vg250', qualities.simplification_level, agg_level=qualities.adm_level)
+            cls._sql_update_projected('vg250', qualities.simplification_level, agg_level=qualities.adm_level)
+            cls._sql_replace_subdivided('vg250', qualities.simplification_level, agg_level=qualities.adm_level)
+
         cls._sql_update_metadatastate("vg250", qualities)
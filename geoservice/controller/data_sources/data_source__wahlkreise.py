@@ -10,6 +10,7 @@ from geoservice.constants import RESOURCES_PATH
 from geoservice.controller.data_sources.data_source__base import DataSourceBase
 from geoservice.model import db
 from geoservice.model.geoobject import Wahlkreise, Adm1
+from geoservice.utils.lookup import link_table
 
 
 class DataSourceWahlkreise(DataSourceBase):
@@ -27,13 +28,17 @@ class DataSourceWahlkreise(DataSourceBase):
         gdf[["source", "adm1_code"]] = ["wahlkreise", None]
         # - - - - - - - - - - - - - - - - - - - -
         cls.logger.info(f"Linking districts of data wahlkreise with adm1_code")
+        # names of the link table as fallback for states named differently in gadm
         country_name_to_adm1_code = {
-            country_name: adm1_code
-            for country_name, adm1_code in
-            db.session.execute(
-                select(Adm1.name, Adm1.adm1_code)
-                .where(Adm1.source == 'gadm')
-            ).all()
+            **link_table.names('adm1', 'gadm'),
+            **{
+                country_name: adm1_code
+                for country_name, adm1_code in
+                db.session.execute(
+                    select(Adm1.name, Adm1.adm1_code)
+                    .where(Adm1.source == 'gadm')
+                ).all()
+            }
         }
         for idx, row in gdf.iterrows():
             try:
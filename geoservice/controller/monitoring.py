@@ -0,0 +1,24 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from flask import jsonify, make_response
+
+from ..application import app
+from ..utils.health import health_check
+from ..utils.metrics import metrics
+
+
+@app.route("/monitoring/")
+def monitoring():
+    result, age = health_check.result()
+    response = jsonify({'status': 'failed' if result['failed'] else 'ok', 'age': round(age, 1), **result})
+    response.status_code = 500 if result['failed'] else 200
+    response.cache_control.no_store = True
+    return response
+
+
+@app.route("/monitoring/metrics")
+def monitoring_metrics():
+    response = make_response(metrics.render())
+    response.mimetype = 'text/plain'
+    return response
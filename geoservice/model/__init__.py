@@ -2,8 +2,11 @@
 # For the license, see the accompanying file LICENSE.md.
 
 from .base import commit, db
+from .routing import read_session
+from . import pool
 
 __all__ = [
     "db",
     "commit",
+    "read_session",
 ]
@@ -13,6 +13,13 @@ class Geoobject(Base):
     geometry_level = db.Column(db.Integer, nullable=False, default=0)
     geometry = db.Column(Geometry(srid=4326))
     source = db.Column(db.Unicode, nullable=True, default="")
+    # area of the largest polygon part and of every part in ST_Dump order, in square degrees
+    area = db.Column(db.Float, nullable=True)
+    part_areas = db.Column(db.ARRAY(db.Float), nullable=True)
+    # the geometry projected to the CRSs maps are rendered in, World Equidistant Cylindrical and
+    # Web Mercator. The latter is cut at the latitudes Web Mercator covers
+    geometry_4087 = db.Column(Geometry(srid=4087, spatial_index=False), nullable=True)
+    geometry_3857 = db.Column(Geometry(srid=3857, spatial_index=False), nullable=True)
 
 
 class Adm0(Geoobject):
@@ -25,6 +32,25 @@ class Adm1(Geoobject):
     adm0_name = db.Column(db.Unicode, nullable=False, default="")
 
 
+class GeoobjectSubdivided(Base):
+    """
+    Pieces of a geoobject split by ST_Subdivide, so that bbox queries only touch the vertices near the viewport
+    """
+    __abstract__ = True
+    geometry_level = db.Column(db.Integer, nullable=False, default=0)
+    geometry = db.Column(Geometry(srid=4326))
+    # area of the polygon part the piece was cut from, in square degrees
+    part_area = db.Column(db.Float, nullable=True)
+
+
+class Adm0Subdivided(GeoobjectSubdivided):
+    parent_id = db.Column(db.Integer, db.ForeignKey('adm0.id', ondelete='CASCADE'), nullable=False, index=True)
+
+
+class Adm1Subdivided(GeoobjectSubdivided):
+    parent_id = db.Column(db.Integer, db.ForeignKey('adm1.id', ondelete='CASCADE'), nullable=False, index=True)
+
+
 class Consulates(Base):
     adm0_code = db.Column(db.Unicode, nullable=False, default="")
     sovereign_code = db.Column(db.Unicode, nullable=False, default="")
@@ -64,6 +90,14 @@ class VG250(Base):
     agg_level = db.Column(db.Unicode, nullable=False, default="")
     source = db.Column(db.Unicode, nullable=True, default="")
     geometry = db.Column(Geometry(srid=4326))
+    area = db.Column(db.Float, nullable=True)
+    part_areas = db.Column(db.ARRAY(db.Float), nullable=True)
+    geometry_4087 = db.Column(Geometry(srid=4087, spatial_index=False), nullable=True)
+    geometry_3857 = db.Column(Geometry(srid=3857, spatial_index=False), nullable=True)
+
+
+class VG250Subdivided(GeoobjectSubdivided):
+    parent_id = db.Column(db.Integer, db.ForeignKey('vg250.id', ondelete='CASCADE'), nullable=False, index=True)
 
 
 class VG250Attributes(Base):
@@ -152,3 +186,13 @@ class LinkTable(Base):
                              default="")  # GER|DEU|XXO
     # Deutschland|...
     link_to_name = db.Column(db.Unicode, nullable=False, default="")
+
+
+class DataVersion(Base):
+    """
+    Counter per data source (as named on the command line, e.g. 'nomenclature'), increased by every
+    successful ETL update, so that in-memory copies of the data know when to reload
+    """
+    source = db.Column(db.Unicode, nullable=False, unique=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.DateTime, nullable=True)
@@ -0,0 +1,44 @@
+"""subdivided side tables for 'adm0', 'adm1' and 'vg250'
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 09:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ['adm0', 'adm1', 'vg250']:
+        op.create_table(
+            f'{table}_subdivided',
+            sa.Column('parent_id', sa.Integer(), nullable=False),
+            sa.Column('geometry_level', sa.Integer(), nullable=False),
+            sa.Column('geometry', geoalchemy2.types.Geometry(srid=4326, spatial_index=False), nullable=True),
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['parent_id'], [f'{table}.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(f'ix_{table}_subdivided_parent_id', f'{table}_subdivided', ['parent_id'], unique=False)
+        op.create_index(f'idx_{table}_subdivided_geometry', f'{table}_subdivided', ['geometry'],
+                        unique=False, postgresql_using='gist')
+        # subdivide the geometries already loaded, as the ETL does from now on, the bbox queries read the pieces
+        op.execute(f"""
+            INSERT INTO {table}_subdivided(parent_id, geometry_level, geometry)
+            SELECT id, geometry_level, ST_Subdivide(geometry, 256)
+            FROM {table}
+        """)
+
+
+def downgrade():
+    for table in ['adm0', 'adm1', 'vg250']:
+        op.drop_index(f'idx_{table}_subdivided_geometry', table_name=f'{table}_subdivided')
+        op.drop_index(f'ix_{table}_subdivided_parent_id', table_name=f'{table}_subdivided')
+        op.drop_table(f'{table}_subdivided')
@@ -0,0 +1,50 @@
+"""per-part areas for 'adm0', 'adm1', 'vg250' and their subdivided pieces
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19 10:02:17.523881
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0015'
+down_revision = '0014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ['adm0', 'adm1', 'vg250']:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('area', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('part_areas', sa.ARRAY(sa.Float()), nullable=True))
+        with op.batch_alter_table(f'{table}_subdivided', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('part_area', sa.Float(), nullable=True))
+        # measure the geometries already loaded and subdivide them per part, as the ETL does from now on
+        op.execute(f"""
+            UPDATE {table}
+            SET part_areas = areas.part_areas, area = areas.area
+            FROM (
+                SELECT id, array_agg(ST_Area(parts.geom) ORDER BY parts.path) AS part_areas,
+                    max(ST_Area(parts.geom)) AS area
+                FROM {table}, ST_Dump(geometry) AS parts
+                GROUP BY id
+            ) AS areas
+            WHERE {table}.id = areas.id
+        """)
+        op.execute(f"DELETE FROM {table}_subdivided")
+        op.execute(f"""
+            INSERT INTO {table}_subdivided(parent_id, geometry_level, part_area, geometry)
+            SELECT id, geometry_level, ST_Area(parts.geom), ST_Subdivide(parts.geom, 256)
+            FROM {table}, ST_Dump(geometry) AS parts
+        """)
+
+
+def downgrade():
+    for table in ['adm0', 'adm1', 'vg250']:
+        with op.batch_alter_table(f'{table}_subdivided', schema=None) as batch_op:
+            batch_op.drop_column('part_area')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('part_areas')
+            batch_op.drop_column('area')
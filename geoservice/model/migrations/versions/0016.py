@@ -0,0 +1,30 @@
+"""data versions of the data sources
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-19 11:24:05.310442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0016'
+down_revision = '0015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'data_version',
+        sa.Column('source', sa.Unicode(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated', sa.DateTime(), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('source')
+    )
+
+
+def downgrade():
+    op.drop_table('data_version')
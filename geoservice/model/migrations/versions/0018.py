@@ -0,0 +1,34 @@
+"""geometries of 'vg250' projected to the rendering CRSs
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-19 16:12:40.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+
+revision = '0018'
+down_revision = '0017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vg250', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geometry_4087', geoalchemy2.types.Geometry(srid=4087, spatial_index=False), nullable=True))
+        batch_op.add_column(sa.Column('geometry_3857', geoalchemy2.types.Geometry(srid=3857, spatial_index=False), nullable=True))
+    # project the geometries already loaded, as the ETL does from now on
+    op.execute("""
+        UPDATE vg250
+        SET geometry_4087 = ST_Transform(geometry, 4087),
+            geometry_3857 = ST_Transform(ST_ClipByBox2D(geometry, ST_MakeEnvelope(
+                -180, -85.0511287798, 180, 85.0511287798, 4326)::box2d), 3857)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('vg250', schema=None) as batch_op:
+        batch_op.drop_column('geometry_3857')
+        batch_op.drop_column('geometry_4087')
@@ -0,0 +1,87 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from .base import db
+from .routing import RoutingSession, router
+from ..application import app
+from ..utils.metrics import metrics
+
+# SQLSTATE of a statement cancelled by statement_timeout
+QUERY_CANCELED = '57014'
+
+
+def statement_timeout() -> int:
+    """
+    Query budget in milliseconds of the current endpoint, 0 disables it. It can be lowered for the
+    following transactions of a request by setting g.statement_timeout
+    """
+    if has_app_context() and 'statement_timeout' in g:
+        return g.statement_timeout
+    endpoint = request.endpoint if has_request_context() else None
+    return int(app.config['DATABASE_STATEMENT_TIMEOUTS'].get(endpoint, app.config['DATABASE_STATEMENT_TIMEOUT']))
+
+
+def is_statement_timeout(exception) -> bool:
+    code = getattr(exception, 'pgcode', None) or getattr(exception, 'sqlstate', None)
+    if code is None and exception.args and isinstance(exception.args[0], dict):
+        # pg8000 passes the fields of the error response
+        code = exception.args[0].get('C')
+    return code == QUERY_CANCELED
+
+
+@event.listens_for(RoutingSession, 'after_begin')
+def set_statement_timeout(session, transaction, connection):
+    timeout = statement_timeout()
+    if timeout and connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout:d}')
+
+
+def _count_statement_timeouts(context):
+    if is_statement_timeout(context.original_exception):
+        metrics.increase('geoservice_database_statement_timeouts_total',
+                         endpoint=request.endpoint if has_request_context() else '')
+
+
+@app.teardown_request
+def count_pool_timeouts(exception=None):
+    if isinstance(exception, PoolTimeoutError):
+        metrics.increase('geoservice_database_pool_timeouts_total', endpoint=request.endpoint)
+
+
+def connect_pools() -> None:
+    """
+    Open a connection of every engine and return it to its pool, so the first requests and health probes of a
+    worker do not wait for connecting
+    """
+    with app.app_context():
+        for engine in [db.engine, *router.engines]:
+            try:
+                engine.connect().close()
+            except Exception as e:
+                app.logger.warning(f"Connecting to {engine.url.host or engine.url.database} failed: {e}")
+
+
+def _pool_statistics(statistic: str) -> dict:
+    def collect():
+        engines = {'primary': db.engine, **{f'replica{i}': engine for i, engine in enumerate(router.engines)}}
+        return {
+            (('database', name),): getattr(engine.pool, statistic)()
+            for name, engine in engines.items()
+            if hasattr(engine.pool, statistic)
+        }
+    return collect
+
+
+with app.app_context():
+    for engine in [db.engine, *router.engines]:
+        event.listen(engine, 'handle_error', _count_statement_timeouts)
+
+metrics.counter('geoservice_database_statement_timeouts_total', 'Statements cancelled by their statement_timeout')
+metrics.counter('geoservice_database_pool_timeouts_total', 'Requests failed waiting for a pooled connection')
+metrics.gauge('geoservice_database_pool_checked_out', 'Connections in use', _pool_statistics('checkedout'))
+metrics.gauge('geoservice_database_pool_size', 'Configured pool size', _pool_statistics('size'))
+metrics.gauge('geoservice_database_pool_checked_in', 'Idle connections', _pool_statistics('checkedin'))
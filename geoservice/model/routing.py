@@ -0,0 +1,92 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from itertools import count
+from threading import Lock
+from time import monotonic
+from typing import Optional
+
+from flask.globals import app_ctx
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+from .base import db
+from ..application import app
+
+
+class ReadRouter:
+    """
+    Chooses the database a read-only request is sent to. Replicas are taken in turns ('round_robin') or by
+    the fewest connections in use by this worker ('least_connections'). A replica whose connection failed
+    is skipped for `retry_interval` seconds. Without any available replica, the primary is used
+    """
+
+    def __init__(self, uris: list[str], strategy: str = 'round_robin', retry_interval: float = 30.0,
+                 engine_options: Optional[dict] = None):
+        self.strategy = strategy
+        self.retry_interval = retry_interval
+        self.engines: list[Engine] = [
+            create_engine(uri, **{'pool_pre_ping': True, **(engine_options or {})})
+            for uri in uris
+        ]
+        self._down_until: dict[Engine, float] = {}
+        self._turn = count()
+        self._lock = Lock()
+        for engine in self.engines:
+            event.listen(engine, 'handle_error', self._handle_error(engine))
+
+    def _handle_error(self, engine: Engine):
+        def handle_error(context):
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(engine)
+        return handle_error
+
+    def mark_down(self, engine: Engine) -> None:
+        with self._lock:
+            self._down_until[engine] = monotonic() + self.retry_interval
+        app.logger.warning(f"Read replica {engine.url.host} unavailable, "
+                           f"skipping it for {self.retry_interval:.0f} seconds")
+
+    def available(self) -> list[Engine]:
+        now = monotonic()
+        return [engine for engine in self.engines if self._down_until.get(engine, 0) <= now]
+
+    def engine(self) -> Engine:
+        engines = self.available()
+        if not engines:
+            return db.engine
+        if self.strategy == 'least_connections':
+            return min(engines, key=lambda engine: engine.pool.checkedout())
+        return engines[next(self._turn) % len(engines)]
+
+
+class RoutingSession(Session):
+    """
+    Session sending every statement to the database chosen by the ReadRouter when it is first used,
+    so one request stays on one replica
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if 'read_engine' not in self.info:
+            self.info['read_engine'] = router.engine()
+        return self.info['read_engine']
+
+
+router = ReadRouter(
+    app.config['DATABASE_READ_URIS'],
+    strategy=app.config['DATABASE_READ_STRATEGY'],
+    retry_interval=app.config['DATABASE_READ_RETRY_INTERVAL'],
+    engine_options=app.config.get('SQLALCHEMY_ENGINE_OPTIONS'),
+)
+
+# read-only session for the API, scoped like db.session to the application context
+read_session = scoped_session(
+    sessionmaker(class_=RoutingSession),
+    scopefunc=lambda: id(app_ctx._get_current_object()),
+)
+
+
+@app.teardown_appcontext
+def remove_read_session(exception=None):
+    read_session.remove()
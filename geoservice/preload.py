@@ -0,0 +1,67 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+"""
+gunicorn configuration of the preload mode (run.sh webserver with GEOSERVICE_WEBWORKER_PRELOAD=true):
+
+    gunicorn --config python:geoservice.preload geoservice:app
+
+The master imports the application with its heavy modules and loads the read-only lookups before it forks,
+so the workers start at once and share these pages copy-on-write. No database connection is inherited by
+the workers: the engines are disposed in the master after loading and again in every worker after fork
+"""
+
+import gc
+import importlib
+
+from geoservice import app
+from geoservice.model import db
+from geoservice.model.routing import router
+from geoservice.utils.geometry_engine import geometry_engine
+from geoservice.utils.lookup import data_versions, link_table, metadata_tables, population_table
+# the hooks of the workers, which start the cache warmer
+from geoservice.workers import post_worker_init  # noqa: F401
+
+preload_app = True
+
+# imported by the workers only on their first request otherwise
+HEAVY_MODULES = [
+    'geopandas',
+    'shapely',
+    'pyogrio',
+    'rasterio',
+    's3fs',
+    'minio',
+]
+
+LOOKUPS = [link_table, data_versions, metadata_tables, population_table, geometry_engine]
+
+
+def _engines():
+    return [db.engine, *router.engines]
+
+
+def when_ready(server):
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+    with app.app_context():
+        for lookup in LOOKUPS:
+            try:
+                lookup.refresh()
+            except Exception as e:
+                # the workers load the lookup on first use instead
+                db.session.rollback()
+                server.log.warning(f"Preloading {type(lookup).__name__} failed: {e}")
+    # the session of the context above has returned its connection by now
+    with app.app_context():
+        for engine in _engines():
+            engine.dispose()
+    # objects created so far are never collected, so the collector does not write to the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    with app.app_context():
+        for engine in _engines():
+            # connections of the master are left to it instead of being closed
+            engine.dispose(close=False)
@@ -4,15 +4,25 @@
 from enum import Enum
 
 from marshmallow import Schema, fields, validates_schema, ValidationError
-from sqlalchemy import select
+from sqlalchemy import select, case, column, literal, all_
+from geoalchemy2 import Geometry
 from geoalchemy2.elements import WKTElement
 import geopandas
+import pandas
 from pandas import concat
+import numpy
+import shapely
 from shapely.geometry import box
 from shapely.wkt import dumps
 
-from ..model import db
-from ..model.geoobject import Adm0, Adm1, Consulates, Population, PopulatedPlaces, LinkTable
+from ..application import app
+from ..model import db, read_session
+from ..model.geoobject import Adm0, Adm1, Adm0Subdivided, Adm1Subdivided, Consulates, Population, PopulatedPlaces
+from ..utils.degradation import fetch_adaptive
+from ..utils.geometry_engine import geometry_engine
+from ..utils import snapshot, svg
+from ..utils.lookup import data_versions, link_table, population_table
+from ..utils.zoom import geometry_level_for_zoom, minimum_area_for_zoom
 
 
 class GeoobjectArgsSchema(Schema):
@@ -59,6 +69,11 @@ class GeoServiceArgs(Schema):
     feature_population = fields.Boolean()
     feature_consulates = fields.Boolean()
     feature_cities = fields.Boolean()
+    clip = fields.Boolean(load_default=True, metadata={
+        "description": "Clip geometries to the bounding box, otherwise whole features intersecting it are returned"})
+    adaptive = fields.Boolean(metadata={
+        "description": "Serve a coarser geometry level under load or when the query times out, "
+                       "the level served is returned in the X-Geometry-Level header"})
 
     @validates_schema
     def validate_method(self, args, **kwargs):
@@ -75,75 +90,168 @@ class GeoServiceArgs(Schema):
         if not codes:
             return []
 
-        return [x[0] for x in db.session.query(
-                LinkTable.link_to_code
-            ).where(
-                LinkTable.link_to_aerial_level == level,
-                LinkTable.link_to_source == source,
-                LinkTable.iso_3166_1_a3.in_(codes),
-            ).all()
-        ]
+        return link_table.codes(level, source, codes)
 
     @classmethod
-    def fetch(cls, query_arguments):
-        aerial_codes = query_arguments.get('filter_aerial_code', [])
-        source = {
+    def _is_global_bbox(cls, query_arguments) -> bool:
+        return (
+            query_arguments.get('filter_boundingbox_southwest_lng', -180) <= -180
+            and query_arguments.get('filter_boundingbox_southwest_lat', -90) <= -90
+            and query_arguments.get('filter_boundingbox_northeast_lng', 180) >= 180
+            and query_arguments.get('filter_boundingbox_northeast_lat', 90) >= 90
+        )
+
+    @classmethod
+    def _clip(cls, geometry, bbox, exact=True):
+        """
+        Clip geometry to bbox. Geometries whose bounding box lies within bbox are covered by it (equivalent to
+        ST_CoveredBy for a rectangle) and are returned unchanged. Without exact, ST_ClipByBox2D is used, which
+        is faster but may return invalid geometries
+        """
+        return case(
+            (geometry.op('@')(bbox), geometry),
+            else_=(
+                db.func.ST_Intersection(geometry, bbox)
+                if exact else
+                db.func.ST_ClipByBox2D(geometry, db.func.Box2D(bbox))
+            )
+        )
+
+    @classmethod
+    def _drop_small_parts(cls, model, min_area):
+        """
+        Remove the polygon parts smaller than min_area from the geometries of model, using the part areas
+        precomputed by the ETL. Geometries without such parts are returned unchanged without being dumped
+        """
+        parts = db.func.ST_Dump(model.geometry).table_valued(
+            column('path', db.ARRAY(db.Integer)),
+            column('geom', Geometry(srid=4326)),
+        ).render_derived(name='parts')
+        return case(
+            (literal(min_area) <= all_(model.part_areas), model.geometry),
+            else_=select(db.func.ST_Collect(parts.c.geom)).where(
+                model.part_areas[db.func.coalesce(parts.c.path[1], 1)] >= min_area
+            ).scalar_subquery()
+        )
+
+    @classmethod
+    def _select_geometries(cls, model, subdivided_model, columns, filters, bbox=None, clip=True, exact=True,
+                           min_area=None):
+        """
+        Select the given columns and the geometries intersecting bbox, clipped to it if clip is set. Without bbox
+        all geometries are returned unchanged. The bbox is tested against the pieces of the subdivided side table
+        and partially covered geometries are reassembled from their clipped pieces, so huge polygons are only
+        processed near the viewport. With min_area, geometries and polygon parts smaller than it are dropped
+        """
+        geometry = model.geometry
+        pieces_filters = [subdivided_model.parent_id == model.id]
+        if min_area is not None:
+            filters = [*filters, model.area >= min_area]
+            geometry = cls._drop_small_parts(model, min_area)
+            pieces_filters.append(subdivided_model.part_area >= min_area)
+        if bbox is None:
+            return select(*columns, geometry.label('geometry')).filter(*filters)
+        # - - - - - - - - - - - - - - - - - - - -
+        pieces_filters.append(db.func.ST_Intersects(subdivided_model.geometry, bbox))
+        if clip:
+            geometry = case(
+                (model.geometry.op('@')(bbox), geometry),
+                else_=select(
+                    db.func.ST_Union(cls._clip(subdivided_model.geometry, bbox, exact))
+                ).where(*pieces_filters).scalar_subquery()
+            )
+        return select(*columns, geometry.label('geometry')).filter(*[
+            *filters,
+            select(subdivided_model.id).where(*pieces_filters).exists()
+        ])
+
+    @classmethod
+    def fetch(cls, query_arguments, exact_clip=True):
+        fetch = cls._fetch_snapshot if app.config['SNAPSHOT_PATH'] else cls._fetch
+        return fetch_adaptive(
+            geometry_level_for_zoom(query_arguments.get('zoom_level', 2)),
+            lambda simplification_level: fetch(query_arguments, simplification_level, exact_clip),
+            query_arguments.get('adaptive'),
+        )
+
+    @classmethod
+    def _source(cls, query_arguments):
+        return {
             "naturalearth": "naturalearth"
         }.get(query_arguments.get("source"), "gadm")
-        bbox = WKTElement(dumps(box(
+
+    @classmethod
+    def _bbox_bounds(cls, query_arguments):
+        return (
             query_arguments.get('filter_boundingbox_southwest_lng', -180),
             query_arguments.get('filter_boundingbox_southwest_lat', -90),
             query_arguments.get('filter_boundingbox_northeast_lng', 180),
             query_arguments.get('filter_boundingbox_northeast_lat', 90),
-        )), srid=4326)
-        simplification_level = 10 - int(query_arguments.get('zoom_level', 2) - 1) // 1.1
+        )
 
-        if simplification_level < 0: simplification_level = 0
-        if simplification_level > 10: simplification_level = 10
+    @classmethod
+    def _bbox(cls, query_arguments):
+        return WKTElement(dumps(box(*cls._bbox_bounds(query_arguments))), srid=4326)
 
+    @classmethod
+    def _select_areas(cls, query_arguments, simplification_level, clip=True, exact_clip=True):
+        """
+        Model of the aerial level and the select of the codes and geometries of its areas matching the query
+        """
+        source = cls._source(query_arguments)
+        # geometries and parts below a pixel are only dropped when the client tells its zoom level
+        min_area = (minimum_area_for_zoom(query_arguments['zoom_level'])
+                    if 'zoom_level' in query_arguments else None)
+        # every geometry lies within the world, so neither filtering nor clipping is needed for it
+        geometries_bbox = None if cls._is_global_bbox(query_arguments) else cls._bbox(query_arguments)
+        geom_aerial_codes = cls._get_aerial_codes("adm0", source, query_arguments.get('filter_aerial_code', []))
+        if query_arguments.get('filter_aerial_level', AdmLevel("ADM0")).value == 'ADM0':
+            return Adm0, cls._select_geometries(Adm0, Adm0Subdivided, [
+                Adm0.adm0_code,
+            ], [
+                *([Adm0.adm0_code.in_(geom_aerial_codes)] if len(geom_aerial_codes) > 0 else []),
+                Adm0.geometry_level == simplification_level,
+                Adm0.source == source,
+            ], geometries_bbox, clip, exact_clip, min_area)
+        return Adm1, cls._select_geometries(Adm1, Adm1Subdivided, [
+            Adm1.adm0_code,
+            Adm1.adm1_code,
+        ], [
+            *([Adm1.adm0_code.in_(geom_aerial_codes)] if len(geom_aerial_codes) > 0 else []),
+            Adm1.geometry_level == simplification_level,
+            Adm1.source == source,
+        ], geometries_bbox, clip, exact_clip, min_area)
+
+    @classmethod
+    def _fetch(cls, query_arguments, simplification_level, exact_clip=True):
+        aerial_codes = query_arguments.get('filter_aerial_code', [])
+        bbox = cls._bbox(query_arguments)
         aerial_level = query_arguments.get('filter_aerial_level', [])
 
         gpds = [geopandas.GeoDataFrame()]
         # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
         # Geometries
         # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-        if query_arguments.get('feature_geometries', True):
-            geom_aerial_codes = cls._get_aerial_codes("adm0", source, aerial_codes)
-            if query_arguments.get('filter_aerial_level', AdmLevel("ADM0")).value == 'ADM0':
-                geometries = select(
-                    Adm0.adm0_code,
-                    db.func.ST_Intersection(Adm0.geometry, bbox).label('geometry')
+        if query_arguments.get('feature_geometries', True) and geometry_engine.serves(simplification_level):
+            gpds.append(cls._shaped_areas(query_arguments, simplification_level, exact_clip))
+        elif query_arguments.get('feature_geometries', True):
+            _, geometries = cls._select_areas(query_arguments, simplification_level,
+                                              query_arguments.get('clip', True), exact_clip)
+            if (query_arguments.get('filter_aerial_level', AdmLevel("ADM0")).value == 'ADM0'
+                    and query_arguments.get('feature_population', False)):
+                population_aerial_codes = cls._get_aerial_codes("adm0", "population", aerial_codes)
+                population = select(
+                    Population.adm0_code.label("adm0_code"),
+                    Population.value.label("population"),
                 ).filter(*[
-                    *([Adm0.adm0_code.in_(geom_aerial_codes)] if len(geom_aerial_codes) > 0 else []),
-                    Adm0.geometry_level == simplification_level,
-                    Adm0.source == source,
-                    db.func.ST_Intersects(Adm0.geometry, bbox)
-                ])
-                if query_arguments.get('feature_population', False):
-                    population_aerial_codes = cls._get_aerial_codes("adm0", "population", aerial_codes)
-                    population = select(
-                        Population.adm0_code.label("adm0_code"),
-                        Population.value.label("population"),
-                    ).filter(*[
-                        *([Population.adm0_code.in_(population_aerial_codes)] if len(population_aerial_codes) > 0 else []),
-                        Population.year == 2021
-                    ]).subquery()
-                    geometries = geometries.join(population, population.c.adm0_code == Adm0.adm0_code)
-                    geometries = geometries.add_columns(
-                        population.c.population.label("population")
-                    )
-            else:
-                geometries = select(
-                    Adm1.adm0_code,
-                    Adm1.adm1_code,
-                    db.func.ST_Intersection(Adm1.geometry, bbox).label('geometry')
-                ).filter(*[
-                    *([Adm1.adm0_code.in_(geom_aerial_codes)] if len(geom_aerial_codes) > 0 else []),
-                    Adm1.geometry_level == simplification_level,
-                    Adm1.source == source,
-                    db.func.ST_Intersects(Adm1.geometry, bbox)
-                ])
-            g_gpd = geopandas.read_postgis(geometries, con=db.engine, geom_col='geometry')
+                    *([Population.adm0_code.in_(population_aerial_codes)] if len(population_aerial_codes) > 0 else []),
+                    Population.year == 2021
+                ]).subquery()
+                geometries = geometries.join(population, population.c.adm0_code == Adm0.adm0_code)
+                geometries = geometries.add_columns(
+                    population.c.population.label("population")
+                )
+            g_gpd = geopandas.read_postgis(geometries, con=read_session.connection(), geom_col='geometry')
             gpds.append(g_gpd)
 
         # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -158,12 +266,12 @@ class GeoServiceArgs(Schema):
                     "name", Consulates.name_de,
                     "url", Consulates.url
                 ).label("consulate"),
-                db.func.ST_Intersection(Consulates.geometry, bbox).label("geometry")
+                Consulates.geometry.label("geometry")
             ).filter(*[
                 *([Consulates.adm0_code.in_(aerial_codes)] if len(aerial_codes) > 0 else []),
                 db.func.ST_Intersects(Consulates.geometry, bbox)
             ])
-            c_gpd = geopandas.read_postgis(consulates, con=db.engine, geom_col='geometry')
+            c_gpd = geopandas.read_postgis(consulates, con=read_session.connection(), geom_col='geometry')
             gpds.append(c_gpd)
 
         # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -179,7 +287,7 @@ class GeoServiceArgs(Schema):
                     PopulatedPlaces.name_en,
                     PopulatedPlaces.name_fr,
                     PopulatedPlaces.population,
-                    db.func.ST_Intersection(PopulatedPlaces.geometry, bbox).label('geometry')
+                    PopulatedPlaces.geometry.label('geometry')
                 ).filter(*[
                     *([PopulatedPlaces.adm0_code.in_(aerial_codes)] if len(aerial_codes) > 0 else []),
                     PopulatedPlaces.capital_level == aerial_level.value.lower(),
@@ -194,18 +302,114 @@ class GeoServiceArgs(Schema):
                     PopulatedPlaces.name_en,
                     PopulatedPlaces.name_fr,
                     PopulatedPlaces.population,
-                    db.func.ST_Intersection(PopulatedPlaces.geometry, bbox).label('geometry')
+                    PopulatedPlaces.geometry.label('geometry')
                 ).filter(*[
                     *([PopulatedPlaces.adm0_code.in_(aerial_codes)] if len(aerial_codes) > 0 else []),
                     db.func.ST_Intersects(PopulatedPlaces.geometry, bbox)
                 ])
-            p_gpd = geopandas.read_postgis(populated_places, con=db.engine, geom_col='geometry')
+            p_gpd = geopandas.read_postgis(populated_places, con=read_session.connection(), geom_col='geometry')
             gpds.append(p_gpd)
 
         gpd = concat(gpds, ignore_index=True)
 
         return gpd
 
+    @classmethod
+    def _shaped_areas(cls, query_arguments, simplification_level, exact_clip=True):
+        """
+        Codes and geometries of the areas matching the query, with their population if requested, read from the
+        snapshot file or the geometry engine. shapely drops their small parts and clips them instead of PostGIS
+        """
+        source = cls._source(query_arguments)
+        min_area = (minimum_area_for_zoom(query_arguments['zoom_level'])
+                    if 'zoom_level' in query_arguments else None)
+        bounds = None if cls._is_global_bbox(query_arguments) else cls._bbox_bounds(query_arguments)
+        clip = query_arguments.get('clip', True)
+        geom_aerial_codes = cls._get_aerial_codes("adm0", source, query_arguments.get('filter_aerial_code', []))
+        is_adm0 = query_arguments.get('filter_aerial_level', AdmLevel("ADM0")).value == 'ADM0'
+        table, columns = ('adm0', ['adm0_code']) if is_adm0 else ('adm1', ['adm0_code', 'adm1_code'])
+        if app.config['SNAPSHOT_PATH']:
+            areas, _ = snapshot.shape(snapshot.read(table, [*columns, 'part_areas'], [
+                *(['adm0_code IN :codes'] if len(geom_aerial_codes) > 0 else []),
+                *(['area >= :min_area'] if min_area is not None else []),
+                'geometry_level = :geometry_level',
+                'source = :source',
+            ], {
+                **({'codes': geom_aerial_codes} if len(geom_aerial_codes) > 0 else {}),
+                **({'min_area': min_area} if min_area is not None else {}),
+                'geometry_level': simplification_level,
+                'source': source,
+            }, bounds), bounds, clip, exact_clip, min_area)
+        else:
+            areas, _ = geometry_engine.query(
+                table, source, simplification_level, bounds,
+                'adm0_code' if len(geom_aerial_codes) > 0 else None, geom_aerial_codes, min_area, clip, exact_clip,
+            )
+        areas = areas[[*columns, 'geometry']]
+        # - - - - - - - - - - - - - - - - - - - -
+        if is_adm0 and query_arguments.get('feature_population', False):
+            population_aerial_codes = cls._get_aerial_codes(
+                "adm0", "population", query_arguments.get('filter_aerial_code', []))
+            population = pandas.DataFrame([
+                row
+                for population_source in population_table.data
+                for row in population_table.values(population_aerial_codes, [2021], population_source)
+            ], columns=['adm0_code', 'value', 'year'])
+            areas = areas.merge(population[['adm0_code', 'value']].rename(columns={'value': 'population'}),
+                                on='adm0_code')
+        return areas
+
+    @classmethod
+    def _fetch_snapshot(cls, query_arguments, simplification_level, exact_clip=True):
+        """
+        _fetch answered from the snapshot file: the rows are found by its R*Trees, shapely drops the small
+        parts and clips the geometries
+        """
+        aerial_codes = query_arguments.get('filter_aerial_code', [])
+        bounds = cls._bbox_bounds(query_arguments)
+        aerial_level = query_arguments.get('filter_aerial_level', None)
+
+        gpds = [geopandas.GeoDataFrame()]
+        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        # Geometries
+        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        if query_arguments.get('feature_geometries', True):
+            gpds.append(cls._shaped_areas(query_arguments, simplification_level, exact_clip))
+
+        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        # Consulates
+        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        if query_arguments.get('feature_consulates', False):
+            consulates, _ = snapshot.shape(snapshot.read('consulates', [
+                'adm0_code', 'sovereign_code', 'consulate_code', 'name_de', 'url',
+            ], ['adm0_code IN :codes'] if len(aerial_codes) > 0 else [], {
+                'codes': aerial_codes,
+            } if len(aerial_codes) > 0 else {}, bounds), bounds, clip=False)
+            consulates.insert(1, 'consulate', [
+                {"sovereign_code": sovereign_code, "code": code, "name": name, "url": url}
+                for sovereign_code, code, name, url in consulates[
+                    ['sovereign_code', 'consulate_code', 'name_de', 'url']
+                ].itertuples(index=False)
+            ])
+            gpds.append(consulates[['adm0_code', 'consulate', 'geometry']])
+
+        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        # Populated places
+        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        if query_arguments.get('feature_cities', True):
+            populated_places, _ = snapshot.shape(snapshot.read('populated_places', [
+                'adm0_code', 'capital_level', 'nameascii', 'name_de', 'name_en', 'name_fr', 'population',
+            ], [
+                *(['adm0_code IN :codes'] if len(aerial_codes) > 0 else []),
+                *(['capital_level = :capital_level'] if aerial_level else []),
+            ], {
+                **({'codes': aerial_codes} if len(aerial_codes) > 0 else {}),
+                **({'capital_level': aerial_level.value.lower()} if aerial_level else {}),
+            }, bounds), bounds, clip=False)
+            gpds.append(populated_places)
+
+        return concat(gpds, ignore_index=True)
+
 
 class Weight(Schema):
     code = fields.Str()
@@ -214,3 +418,75 @@ class Weight(Schema):
 
 class GeoServiceImageArgs(GeoServiceArgs):
     filter_image_weights = fields.List(fields.Nested(Weight))
+
+    @classmethod
+    def fetch_svg(cls, query_arguments):
+        return fetch_adaptive(
+            geometry_level_for_zoom(query_arguments.get('zoom_level', 2)),
+            lambda simplification_level: cls._fetch_svg(query_arguments, simplification_level),
+            query_arguments.get('adaptive'),
+        )
+
+    @classmethod
+    def _area_paths(cls, query_arguments, simplification_level):
+        """
+        Country codes and path data of the areas matching the query. Only the codes are selected from the
+        database, the projected geometries of the areas not in the path cache are loaded unclipped and cached
+        """
+        model, areas = cls._select_areas(query_arguments, simplification_level, clip=False)
+        code = Adm0.adm0_code if model is Adm0 else Adm1.adm1_code
+        source = cls._source(query_arguments)
+        aerial_level = query_arguments.get('filter_aerial_level', AdmLevel("ADM0")).value
+        adm0_codes = {
+            (source, aerial_level, simplification_level, area_code): adm0_code
+            for adm0_code, area_code in read_session.execute(areas.with_only_columns(model.adm0_code, code)).all()
+        }
+        tag = data_versions.tag
+        paths = svg.path_cache.get_many(tag, adm0_codes)
+        missing = [key[3] for key in adm0_codes if key not in paths]
+        if missing:
+            # the geometries projected by the ETL, rows it has not projected yet are projected by the database
+            geometries = geopandas.read_postgis(select(
+                code.label('code'),
+                db.func.coalesce(model.geometry_4087, db.func.ST_Transform(model.geometry, 4087)).label('geometry'),
+            ).filter(
+                code.in_(missing),
+                model.geometry_level == simplification_level,
+                model.source == source,
+            ), con=read_session.connection(), geom_col='geometry')
+            loaded = dict(zip(
+                [(source, aerial_level, simplification_level, area_code) for area_code in geometries['code']],
+                svg.paths(svg.scale(numpy.asarray(geometries.geometry), simplification_level)),
+            ))
+            svg.path_cache.put_many(tag, loaded)
+            paths.update(loaded)
+        keys = [key for key in adm0_codes if key in paths]
+        return [adm0_codes[key] for key in keys], [paths[key] for key in keys]
+
+    @classmethod
+    def _fetch_svg(cls, query_arguments, simplification_level):
+        adm0_codes, paths = [], []
+        if query_arguments.get('feature_geometries', True):
+            adm0_codes, paths = cls._area_paths(query_arguments, simplification_level)
+        points = geopandas.GeoDataFrame({'adm0_code': [], 'geometry': []})
+        if query_arguments.get('feature_cities', True) or query_arguments.get('feature_consulates', False):
+            points = cls._fetch({**query_arguments, 'feature_geometries': False}, simplification_level)
+        point_coordinates = shapely.get_coordinates(svg.project(numpy.asarray(points.geometry), simplification_level))
+        # - - - - - - - - - - - - - - - - - - - -
+        weight_classes = svg.classes(
+            concat([pandas.Series(adm0_codes, dtype=object), points['adm0_code'].astype(object)], ignore_index=True),
+            query_arguments.get('filter_image_weights', []),
+        )
+        bounds = [bounds for _, bounds in paths] + [(x, y, x, y) for x, y in point_coordinates.tolist()]
+        view_box = svg.project(box(*cls._bbox_bounds(query_arguments)), simplification_level).bounds
+        if bounds:
+            min_x, min_y, max_x, max_y = numpy.array(bounds).T
+            data_box = (min_x.min(), min_y.min(), max_x.max(), max_y.max())
+            # like the geometries of the JSON endpoint, the map is clipped to the bounding box
+            view_box = (max(data_box[0], view_box[0]), max(data_box[1], view_box[1]),
+                        min(data_box[2], view_box[2]), min(data_box[3], view_box[3])) \
+                if query_arguments.get('clip', True) else data_box
+        return svg.document(
+            [data for data, _ in paths], weight_classes[:len(paths)],
+            point_coordinates, weight_classes[len(paths):], view_box,
+        )
@@ -7,7 +7,7 @@ from sqlalchemy import text
 from marshmallow import Schema, fields
 from flask import send_file
 
-from geoservice.model import db
+from geoservice.model import read_session
 
 
 class HillshadeParameterSchema(Schema):
@@ -19,7 +19,7 @@ class HillshadeParameterSchema(Schema):
     @classmethod
     def fetch(cls, args):
         return send_file(
-            BytesIO(db.session.execute(text(f'''
+            BytesIO(read_session.execute(text(f'''
                 WITH raster_selection AS (
                     SELECT ST_Clip(
                         rast, 
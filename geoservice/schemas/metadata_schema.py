@@ -3,11 +3,9 @@
 
 
 from marshmallow import Schema, fields
-from sqlalchemy import select, distinct
 import pandas
 
-from ..model import db
-from ..model.geoobject import Metadata, Metadatakeywords, Metadataorigin
+from ..utils.lookup import metadata_tables
 
 
 class MetadataParameterSchema(Schema):
@@ -23,31 +21,11 @@ class MetadataParameterSchema(Schema):
         """
         This function loads keywords and origins of metadata
         """
-        select_keywords = select(
-            Metadatakeywords.keywords, Metadatakeywords.source)
-
-        select_origin = select(
-            Metadataorigin.originName,
-            Metadataorigin.originSource,
-            Metadataorigin.originAttribution,
-            Metadataorigin.originLicence,
-            Metadataorigin.originLicenceSource,
-            Metadataorigin.originVersion,
-            Metadataorigin.source)
-
-        keywords_metadata = pandas.read_sql(
-            select_keywords.filter(Metadatakeywords.source.in_(sources)
-                                   ),
-            con=db.engine
-        )
+        keywords_metadata = metadata_tables.keywords[metadata_tables.keywords.source.isin(sources)]
         keywords_metadata = keywords_metadata.groupby(
             'source')['keywords'].apply(list).reset_index()
 
-        origin_metadata = pandas.read_sql(
-            select_origin.filter(Metadataorigin.source.in_(sources)
-                                 ),
-            con=db.engine
-        )
+        origin_metadata = metadata_tables.origins[metadata_tables.origins.source.isin(sources)].copy()
         origin_metadata['origin'] = origin_metadata.apply(
             lambda row: dict(row[[
                 'originName',
@@ -63,97 +41,41 @@ class MetadataParameterSchema(Schema):
 
         return additional_metadata
 
+    @classmethod
+    def _intersects_bbox(cls, geo_box, args) -> bool:
+        """
+        Whether the geoBox (xmin, ymin, xmax, ymax) of a source intersects the bounding box of args
+        """
+        if geo_box is None or len(geo_box) < 4:
+            return False
+        return (geo_box[3] > args.get('filter_boundingbox_southwest_lat', 0)
+                and geo_box[1] < args.get('filter_boundingbox_northeast_lat', 0)
+                and geo_box[2] > args.get('filter_boundingbox_southwest_lng', 0)
+                and geo_box[0] < args.get('filter_boundingbox_northeast_lng', 0))
+
     @classmethod
     def fetch(cls, args):
         # Return only the available sources
         if args.get('available_sources', False):
-            return pandas.read_sql(
-                select(
-                    distinct(Metadata.source)
-                ),
-                con=db.engine
-            ).to_json(orient="columns")
+            return pandas.DataFrame({
+                'source': metadata_tables.metadata.source.drop_duplicates().reset_index(drop=True)
+            }).to_json(orient="columns")
 
-        select_all_variables = select(
-            Metadata.title,
-            Metadata.abstract,
-            Metadata.lineage,
-            Metadata.responsibleParty,
-            Metadata.crs,
-            Metadata.format,
-            Metadata.geoBox,
-            Metadata.datatype,
-            Metadata.adaptionDate,
-            Metadata.source
-        )
+        base_metadata = metadata_tables.metadata
 
-        # Return all data
-        if args.get('source', [""]) == [""]:
-            # Return all data intersecting with bbox
-            if all([type(args.get('filter_boundingbox_southwest_lat', False)) is not bool,
-                    type(args.get('filter_boundingbox_northeast_lat', False)) is not bool,
-                    type(args.get('filter_boundingbox_southwest_lng', False)) is not bool,
-                    type(args.get('filter_boundingbox_northeast_lng', False)) is not bool]):
-                select_all_variables = select_all_variables.filter(
-                    Metadata.geoBox[4] > args.get(
-                        'filter_boundingbox_southwest_lat', 0)
-                ).filter(
-                    Metadata.geoBox[2] < args.get(
-                        'filter_boundingbox_northeast_lat', 0)
-                ).filter(
-                    Metadata.geoBox[3] > args.get(
-                        'filter_boundingbox_southwest_lng', 0)
-                ).filter(
-                    Metadata.geoBox[1] < args.get(
-                        'filter_boundingbox_northeast_lng', 0)
-                )
-            base_metadata = pandas.read_sql(
-                select_all_variables,
-                con=db.engine
-            )
-            return base_metadata.merge(
-                cls._load_additional_metadata(
-                    base_metadata.source.to_list()),
-                how='left',
-                on='source').to_json(orient="records", date_format="iso")
+        # Return selected data
+        if args.get('source', [""]) != [""]:
+            base_metadata = base_metadata[base_metadata.source.isin(args.get('source', [""]))]
 
-        # Return selected data intersecting with bbox
+        # Return data intersecting with bbox
         if all([type(args.get('filter_boundingbox_southwest_lat', False)) is not bool,
                 type(args.get('filter_boundingbox_northeast_lat', False)) is not bool,
                 type(args.get('filter_boundingbox_southwest_lng', False)) is not bool,
                 type(args.get('filter_boundingbox_northeast_lng', False)) is not bool]):
-            base_metadata = pandas.read_sql(
-                select_all_variables.filter(
-                    Metadata.source.in_(args.get('source', [""]))
-                ).filter(
-                    Metadata.geoBox[4] > args.get(
-                        'filter_boundingbox_southwest_lat', 0)
-                ).filter(
-                    Metadata.geoBox[2] < args.get(
-                        'filter_boundingbox_northeast_lat', 0)
-                ).filter(
-                    Metadata.geoBox[3] > args.get(
-                        'filter_boundingbox_southwest_lng', 0)
-                ).filter(
-                    Metadata.geoBox[1] < args.get(
-                        'filter_boundingbox_northeast_lng', 0)
-                ),
-                con=db.engine
-            )
-            return base_metadata.merge(
-                cls._load_additional_metadata(
-                    base_metadata.source.to_list()),
-                how='left',
-                on='source').to_json(orient="records", date_format="iso")
-
-        # Return selected data
-        base_metadata = pandas.read_sql(
-            select_all_variables.filter(Metadata.source.in_(args.get('source', [""]))
-                                        ),
-            con=db.engine
-        )
+            base_metadata = base_metadata[base_metadata.geoBox.map(
+                lambda geo_box: cls._intersects_bbox(geo_box, args)).astype(bool)]
 
-        return base_metadata.merge(
+        return base_metadata.reset_index(drop=True).merge(
             cls._load_additional_metadata(
                 base_metadata.source.to_list()),
             how='left',
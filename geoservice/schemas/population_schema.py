@@ -3,86 +3,7 @@
 
 from marshmallow import Schema, fields, validates_schema, ValidationError
 
-from sqlalchemy import text, bindparam
-
-from ..model.base import db
-
-
-def check_years_limit(source = "WPP2022") -> list:
-    """
-    Check min and max of years in population data
-    """
-    
-    query = "SELECT MIN(year), MAX(year) FROM population WHERE source = :source;"
-
-    ret_val = db.session.execute(text(query).bindparams(
-                bindparam('source', value=source)))
-                    
-    return ret_val.all()
-
-def query_population(adm0_codes:list, years:list, source = "WPP2022") -> list:
-    """
-    Get population data from dataset
-    """
-
-    if (len(adm0_codes) == 0) & (len(years) == 0):
-        query = """
-            SELECT ARRAY_TO_JSON(ARRAY_AGG(sel))
-            FROM (SELECT adm0_code, value, year
-                FROM population
-                WHERE source = :source) 
-                AS sel;
-        """
-
-        ret_val = db.session.execute(text(query).bindparams(
-                bindparam('source', value=source)))
-        
-        return ret_val.all()
-    
-    if (len(adm0_codes) == 0) & (len(years) != 0):
-        query = """
-            SELECT ARRAY_TO_JSON(ARRAY_AGG(sel))
-            FROM (SELECT adm0_code, value, year
-                FROM population
-                WHERE year IN :years AND source = :source) 
-                AS sel;
-        """
-
-        ret_val = db.session.execute(text(query).bindparams(
-                bindparam('years', value = years, expanding=True),
-                bindparam('source', value=source)))
-                        
-        return ret_val.all()
-    
-    if (len(adm0_codes) != 0) & (len(years) == 0):
-        query = """
-            SELECT ARRAY_TO_JSON(ARRAY_AGG(sel))
-            FROM (SELECT adm0_code, value, year
-                FROM population
-                WHERE adm0_code IN :adm0_codes AND source = :source) 
-                AS sel;
-        """
-
-        ret_val = db.session.execute(text(query).bindparams(
-                bindparam('adm0_codes', value = adm0_codes, expanding=True),
-                bindparam('source', value=source)))
-                        
-        return ret_val.all()
-
-    query = """
-        SELECT ARRAY_TO_JSON(ARRAY_AGG(sel))
-        FROM (SELECT adm0_code, value, year
-            FROM population
-            WHERE adm0_code IN :adm0_codes AND year IN :years AND source = :source) 
-            AS sel;
-    """
-
-    ret_val = db.session.execute(text(query).bindparams(
-            bindparam('adm0_codes', value = adm0_codes, expanding=True),
-            bindparam('years', value = years, expanding=True),
-            bindparam('source', value=source)))
-                    
-    return ret_val.all()
+from ..utils.lookup import population_table
 
 
 class PopulationParameterSchema(Schema):
@@ -102,7 +23,17 @@ class PopulationParameterSchema(Schema):
         
 
     @classmethod
-    def fetch(cls,args):
+    def needs_years_limit(cls, args) -> bool:
+        """
+        Whether the years selected by args depend on the years available in the population data
+        """
+        return (args.get('years_from', None) == None) != (args.get('years_to', None) == None)
+
+    @classmethod
+    def years(cls, args, years_limit=None) -> list:
+        """
+        Years selected by args, years_limit is [(min, max)] of the years of the source if needs_years_limit
+        """
         years = args.get('years', [])
         if (args.get('years_from', None)!= None) & (args.get('years_to', None)!= None):
             new_years = list(range(args.get('years_from', None),args.get('years_to', None) + 1))
@@ -110,15 +41,23 @@ class PopulationParameterSchema(Schema):
             years = list(set(years))
         
         if (args.get('years_from', None)!= None) & (args.get('years_to', None)== None):
-            new_years = list(range(args.get('years_from', None),check_years_limit(args.get('source', ""))[0][1] + 1))
+            new_years = list(range(args.get('years_from', None),years_limit[0][1] + 1))
             years.extend(new_years)
             years = list(set(years))
         
         if (args.get('years_from', None)== None) & (args.get('years_to', None)!= None):
-            new_years = list(range(check_years_limit(args.get('source', ""))[0][0],args.get('years_to', None) + 1))
+            new_years = list(range(years_limit[0][0],args.get('years_to', None) + 1))
             years.extend(new_years)
             years = list(set(years))
 
-        return query_population(args.get('filter_aerial_code', []),
-                         years,
-                         args.get('source', ""))[0][0]
+        return years
+
+    @classmethod
+    def fetch(cls,args):
+        source = args.get('source', "")
+        years_limit = population_table.years_limit(source) if cls.needs_years_limit(args) else None
+
+        # None without values, like the aggregation of the database
+        return population_table.values(args.get('filter_aerial_code', []),
+                                       cls.years(args, years_limit),
+                                       source) or None
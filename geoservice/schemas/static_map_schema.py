@@ -0,0 +1,162 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from enum import Enum
+from math import log2
+
+import numpy
+import shapely
+from flask import make_response
+from marshmallow import Schema, fields, validate
+from sqlalchemy import select, text
+
+from geoservice.model import db, read_session
+from geoservice.model.geoobject import Adm0, Adm0Subdivided, Adm1, Adm1Subdivided, VG250, VG250Subdivided
+from geoservice.utils import static_map
+from geoservice.utils.degradation import fetch_adaptive
+from geoservice.utils.lookup import data_versions, rasters
+from geoservice.utils.zoom import TILE_SIZE, geometry_level_for_zoom
+
+# pixels the boundaries are clipped beyond the image, so the edges of the clipping are not drawn
+CLIP_MARGIN = 8
+
+
+class MapBackground(Enum):
+    LANDSCAN = "landscan"
+    HILLSHADE = "hillshade"
+    NONE = "none"
+
+
+class MapBoundaries(Enum):
+    ADM0 = "adm0"
+    ADM1 = "adm1"
+    VG250 = "vg250"
+    NONE = "none"
+
+
+class MapFormat(Enum):
+    PNG = "png"
+    WEBP = "webp"
+
+
+class StaticMapParameterSchema(Schema):
+    filter_boundingbox_southwest_lat = fields.Float(load_default=-static_map.MERCATOR_MAX_LATITUDE)
+    filter_boundingbox_southwest_lng = fields.Float(load_default=-180)
+    filter_boundingbox_northeast_lat = fields.Float(load_default=static_map.MERCATOR_MAX_LATITUDE)
+    filter_boundingbox_northeast_lng = fields.Float(load_default=180)
+    width = fields.Int(load_default=800, validate=validate.Range(16, 2048))
+    height = fields.Int(load_default=600, validate=validate.Range(16, 2048))
+    format = fields.Enum(MapFormat, by_value=True, load_default=MapFormat.PNG)
+    background = fields.Enum(MapBackground, by_value=True, load_default=MapBackground.HILLSHADE)
+    boundaries = fields.Enum(MapBoundaries, by_value=True, load_default=MapBoundaries.ADM0)
+    source = fields.Str(load_default="gadm", validate=validate.OneOf(["gadm", "naturalearth"]))
+    agg_level = fields.Str(load_default="land", metadata={"description": "Level of the vg250 boundaries"},
+                           validate=validate.OneOf(["land", "regierungsbezirk", "kreis", "verwaltungsgemeinschaft",
+                                                    "gemeinde", "nuts1", "nuts2", "nuts3"]))
+    adaptive = fields.Boolean(metadata={
+        "description": "Draw coarser boundaries under load or when the query times out, "
+                       "the level drawn is returned in the X-Geometry-Level header"})
+
+    @classmethod
+    def _raster(cls, raster, map_extent, width, height):
+        west, south, east, north = static_map.bounds(map_extent)
+        pixel_size = (map_extent[2] - map_extent[0]) / width
+        # the raster is read from the coarsest overview still as detailed as the image
+        table = rasters.table(raster, (east - west) / width)
+        row = read_session.execute(text(f'''
+            WITH raster_selection AS (
+                SELECT ST_Clip(rast, ST_MakeEnvelope(:west, :south, :east, :north, 4326)) AS rast
+                FROM {table}
+                WHERE ST_Intersects(rast, ST_MakeEnvelope(:west, :south, :east, :north, 4326))
+            ),
+            unified_raster AS (
+                SELECT ST_Transform(ST_Union(rast, 'MAX'), ST_MakeEmptyRaster(
+                    :width, :height, :min_x, :max_y, :pixel_size, -:pixel_size, 0, 0, 3857
+                ), 'Bilinear') AS rast
+                FROM raster_selection
+            )
+            SELECT ST_UpperLeftX(rast), ST_UpperLeftY(rast), ST_DumpValues(rast, 1)
+            FROM unified_raster
+            WHERE rast IS NOT NULL
+        '''), {
+            'west': west, 'south': south, 'east': east, 'north': north, 'width': width, 'height': height,
+            'min_x': map_extent[0], 'max_y': map_extent[3], 'pixel_size': pixel_size,
+        }).first()
+        values = numpy.full((height, width), numpy.nan)
+        if row is not None:
+            values = static_map.place(numpy.array(row[2], dtype=float), (row[0], row[1]), map_extent, width, height)
+        return static_map.raster_layer(values, raster)
+
+    @classmethod
+    def _boundaries(cls, args, layer, map_extent, simplification_level):
+        margin = CLIP_MARGIN * (map_extent[2] - map_extent[0]) / args['width']
+        west, south, east, north = static_map.bounds(map_extent)
+        bbox = db.func.ST_MakeEnvelope(west, south, east, north, 4326)
+        clip_box = db.func.Box2D(db.func.ST_MakeEnvelope(
+            map_extent[0] - margin, map_extent[1] - margin, map_extent[2] + margin, map_extent[3] + margin, 3857))
+        if layer == 'vg250':
+            model, subdivided_model = VG250, VG250Subdivided
+            filters = [VG250.agg_level == args['agg_level']]
+        else:
+            model, subdivided_model = (Adm0, Adm0Subdivided) if layer == 'adm0' else (Adm1, Adm1Subdivided)
+            filters = [model.source == args['source']]
+        # the geometries projected by the ETL, rows it has not projected yet are projected by the database
+        geometry = db.func.coalesce(model.geometry_3857, db.func.ST_Transform(db.func.ST_ClipByBox2D(
+            model.geometry, db.func.Box2D(db.func.ST_MakeEnvelope(
+                -180, -static_map.MERCATOR_MAX_LATITUDE, 180, static_map.MERCATOR_MAX_LATITUDE, 4326))
+        ), 3857))
+        # the subdivided pieces decide which geometries reach into the map, so whole polygons are not tested
+        filters += [model.geometry_level == simplification_level, select(subdivided_model.id).where(
+            subdivided_model.parent_id == model.id, db.func.ST_Intersects(subdivided_model.geometry, bbox)
+        ).exists()]
+        rows = read_session.execute(
+            select(db.func.ST_AsBinary(db.func.ST_ClipByBox2D(geometry, clip_box))).filter(*filters)
+        ).scalars().all()
+        geometries = shapely.from_wkb([bytes(row) for row in rows if row is not None])
+        return static_map.boundary_layer(geometries, layer, map_extent, args['width'], args['height'])
+
+    @classmethod
+    def _layer(cls, key, render):
+        tag = data_versions.tag
+        layer = static_map.layer_cache.get(tag, key)
+        if layer is None:
+            layer = render()
+            static_map.layer_cache.put(tag, key, layer)
+        return layer
+
+    @classmethod
+    def fetch(cls, args):
+        width, height = args['width'], args['height']
+        map_extent = static_map.extent(
+            args['filter_boundingbox_southwest_lng'], args['filter_boundingbox_southwest_lat'],
+            args['filter_boundingbox_northeast_lng'], args['filter_boundingbox_northeast_lat'],
+            width, height,
+        )
+        layers = []
+        # - - - - - - - - - - - - - - - - - - - -
+        background = args['background'].value
+        if background != 'none':
+            layers.append(cls._layer(
+                ('raster', background, map_extent, width, height),
+                lambda: cls._raster(background, map_extent, width, height),
+            ))
+        # - - - - - - - - - - - - - - - - - - - -
+        boundaries = args['boundaries'].value
+        if boundaries != 'none':
+            west, _, east, _ = static_map.bounds(map_extent)
+            zoom = log2(360 / (TILE_SIZE * (east - west) / width))
+            layers.append(fetch_adaptive(
+                geometry_level_for_zoom(zoom),
+                lambda simplification_level: cls._layer(
+                    ('boundaries', boundaries, args['source'], args['agg_level'], simplification_level,
+                     map_extent, width, height),
+                    lambda: cls._boundaries(args, boundaries, map_extent, simplification_level),
+                ),
+                args.get('adaptive'),
+            ))
+        # - - - - - - - - - - - - - - - - - - - -
+        image_format = args['format'].value
+        response = make_response(static_map.encode(static_map.composite(layers, width, height), image_format))
+        response.mimetype = f'image/{image_format}'
+        response.cache_control.max_age = 600
+        return response
@@ -1,12 +1,19 @@
 # Copyright 2025 Bundesdruckerei GmbH
 # For the license, see the accompanying file LICENSE.md.
 
+import numpy
+from flask import make_response
 from marshmallow import Schema, fields, validates_schema, ValidationError
 
 from sqlalchemy import text, bindparam
 
-from geoservice.model.base import db
+from geoservice.application import app
+from geoservice.model import read_session
 from geoservice.exceptions import GeoserviceInputException
+from geoservice.utils import snapshot
+from geoservice.utils.degradation import fetch_adaptive
+from geoservice.utils.geometry_engine import geometry_engine
+from geoservice.utils.zoom import geometry_level_for_zoom, minimum_area_for_zoom
 
 
 _levels = {
@@ -53,6 +60,11 @@ class VG250ParameterSchema(Schema):
     filter_boundingbox_southwest_lng = fields.Float()
     filter_boundingbox_northeast_lat = fields.Float()
     filter_boundingbox_northeast_lng = fields.Float()
+    clip = fields.Boolean(load_default=True, metadata={
+        "description": "Clip geometries to the bounding box, otherwise whole features intersecting it are returned"})
+    adaptive = fields.Boolean(metadata={
+        "description": "Serve a coarser geometry level under load or when the query times out, "
+                       "the level served is returned in the X-Geometry-Level header"})
 
     @classmethod
     def _query_no_filters(cls) -> str:
@@ -61,9 +73,9 @@ class VG250ParameterSchema(Schema):
         """
         return ("""
             WITH selection AS(
-                SELECT code, name, geometry_level, agg_level, source, geometry
+                SELECT id, code, name, geometry_level, agg_level, source, geometry, part_areas
                 FROM vg250
-                WHERE geometry_level = :geometry_level AND agg_level = :agg_level
+                WHERE geometry_level = :geometry_level AND agg_level = :agg_level AND area >= :min_area
             )
             """)
 
@@ -74,12 +86,12 @@ class VG250ParameterSchema(Schema):
         """
         return (f"""
                 WITH selection AS(
-                    SELECT code,name,geometry_level,agg_level,source,geometry
+                    SELECT id,code,name,geometry_level,agg_level,source,geometry,part_areas
                     FROM vg250
                     WHERE code IN (
                         SELECT {agg_sp}
                         FROM vg250_attributes
-                        WHERE {filt_sp_n} IN :filter_names) AND geometry_level = :geometry_level
+                        WHERE {filt_sp_n} IN :filter_names) AND geometry_level = :geometry_level AND area >= :min_area
                 )
                 """)
 
@@ -90,39 +102,74 @@ class VG250ParameterSchema(Schema):
         """
         return (f"""
                 WITH selection AS(
-                    SELECT code,name,geometry_level,agg_level,source,geometry
+                    SELECT id,code,name,geometry_level,agg_level,source,geometry,part_areas
                     FROM vg250
                     WHERE code IN (
                         SELECT {agg_sp}
                         FROM vg250_attributes
-                        WHERE {filt_sp_c} IN :filter_codes) AND geometry_level = :geometry_level
+                        WHERE {filt_sp_c} IN :filter_codes) AND geometry_level = :geometry_level AND area >= :min_area
                 )
                 """)
 
+    @classmethod
+    def _query_drop_small_parts(cls) -> str:
+        """
+        Create query chunk for the selected geometries without the polygon parts smaller than min_area,
+        using the part areas precomputed by the ETL
+        """
+        return ("""
+                    CASE WHEN :min_area <= ALL(selection.part_areas) THEN selection.geometry
+                    ELSE (
+                        SELECT ST_Collect(parts.geom)
+                        FROM ST_Dump(selection.geometry) AS parts
+                        WHERE selection.part_areas[coalesce(parts.path[1], 1)] >= :min_area
+                    ) END""")
+
     @classmethod
     def _query_create_json_output(cls) -> str:
         """
         Create query chunk to create a FeatureCollection json output
         """
-        return ("""
+        return (f"""
             SELECT json_build_object(
                 'type', 'FeatureCollection',
-                'features', json_agg(ST_AsGeoJSON(selection.*)::json)
+                'features', json_agg(ST_AsGeoJSON(features.*)::json)
                 )
-            FROM selection;
+            FROM (
+                SELECT code, name, geometry_level, agg_level, source,{cls._query_drop_small_parts()} as geometry
+                FROM selection
+            ) AS features;
             """)
 
     @classmethod
-    def _query_clip_bbox_create_json_output(cls) -> str:
+    def _query_clip_bbox_create_json_output(cls, clip: bool = True) -> str:
         """
-        Create query chunk to to select geometries by Bounding Box and create a FeatureCollection json output
+        Create query chunk to to select geometries by Bounding Box and create a FeatureCollection json output.
+        The Bounding Box is tested against the pieces of vg250_subdivided. Geometries within the Bounding Box
+        are returned unchanged, the others are reassembled from their clipped pieces, so large polygons are only
+        processed near the Bounding Box. Without clip, whole geometries are returned
         """
-        return ("""
+        geometry = (f"""
+                    CASE WHEN selection.geometry @ ST_MakeEnvelope(:xmin, :ymin, :xmax,:ymax, :crs) THEN{cls._query_drop_small_parts()}
+                    ELSE (
+                        SELECT ST_Union(ST_Intersection(pieces.geometry, ST_MakeEnvelope(:xmin, :ymin, :xmax,:ymax, :crs)))
+                        FROM vg250_subdivided AS pieces
+                        WHERE pieces.parent_id = selection.id
+                            AND pieces.part_area >= :min_area
+                            AND ST_Intersects(pieces.geometry, ST_MakeEnvelope(:xmin, :ymin, :xmax,:ymax, :crs))
+                    ) END""" if clip else cls._query_drop_small_parts())
+        return (f"""
             ,
             clipped AS (
-                SELECT code, name, geometry_level, agg_level, source, ST_Intersection(geometry, ST_MakeEnvelope(:xmin, :ymin, :xmax,:ymax, :crs)) as geometry
+                SELECT selection.code, selection.name, selection.geometry_level, selection.agg_level, selection.source,{geometry} as geometry
                 FROM selection
-                WHERE ST_Intersects(geometry, ST_MakeEnvelope(:xmin, :ymin, :xmax,:ymax, :crs))
+                WHERE EXISTS (
+                    SELECT 1
+                    FROM vg250_subdivided AS pieces
+                    WHERE pieces.parent_id = selection.id
+                        AND pieces.part_area >= :min_area
+                        AND ST_Intersects(pieces.geometry, ST_MakeEnvelope(:xmin, :ymin, :xmax,:ymax, :crs))
+                )
             )
             SELECT json_build_object(
                 'type', 'FeatureCollection',
@@ -132,100 +179,90 @@ class VG250ParameterSchema(Schema):
             """)
 
     @classmethod
-    def _query_execute_filter_names_bbox(cls, query: str, filter_names: str, geometry_level: str, xmin: float, ymin: float, xmax: float, ymax: float, crs: int):
+    def _query_bind_filter_names_bbox(cls, query: str, filter_names: str, geometry_level: str, xmin: float, ymin: float, xmax: float, ymax: float, crs: int, min_area: float = 0):
         """
-        Execute a query based on filter names (land = 'Niedersachsen' ...), geometry level (0-10) and bounding box 
+        Bind the parameters of a query based on filter names (land = 'Niedersachsen' ...), geometry level (0-10) and bounding box 
         """
-        return (db.session.execute(
-            text(query).bindparams(
-                bindparam('filter_names', value=filter_names,
-                          expanding=True),
-                bindparam('geometry_level', value=geometry_level),
-                bindparam('xmin', value=xmin),
-                bindparam('ymin', value=ymin),
-                bindparam('xmax', value=xmax),
-                bindparam('ymax', value=ymax),
-                bindparam('crs', value=crs)
-            )
-        ))
+        return text(query).bindparams(
+            bindparam('filter_names', value=filter_names, expanding=True),
+            bindparam('geometry_level', value=geometry_level),
+            bindparam('min_area', value=min_area),
+            bindparam('xmin', value=xmin),
+            bindparam('ymin', value=ymin),
+            bindparam('xmax', value=xmax),
+            bindparam('ymax', value=ymax),
+            bindparam('crs', value=crs)
+        )
 
     @classmethod
-    def _query_execute_filter_codes_bbox(cls, query: str, filter_codes: str, geometry_level: str, xmin: float, ymin: float, xmax: float, ymax: float, crs: int):
+    def _query_bind_filter_codes_bbox(cls, query: str, filter_codes: str, geometry_level: str, xmin: float, ymin: float, xmax: float, ymax: float, crs: int, min_area: float = 0):
         """
-        Execute a query based on filter codes (land = '03' ...), geometry level (0-10) and bounding box 
+        Bind the parameters of a query based on filter codes (land = '03' ...), geometry level (0-10) and bounding box 
         """
-        return (db.session.execute(
-            text(query).bindparams(
-                bindparam('filter_codes', value=filter_codes,
-                          expanding=True),
-                bindparam('geometry_level', value=geometry_level),
-                bindparam('xmin', value=xmin),
-                bindparam('ymin', value=ymin),
-                bindparam('xmax', value=xmax),
-                bindparam('ymax', value=ymax),
-                bindparam('crs', value=crs)
-            )
-        ))
+        return text(query).bindparams(
+            bindparam('filter_codes', value=filter_codes, expanding=True),
+            bindparam('geometry_level', value=geometry_level),
+            bindparam('min_area', value=min_area),
+            bindparam('xmin', value=xmin),
+            bindparam('ymin', value=ymin),
+            bindparam('xmax', value=xmax),
+            bindparam('ymax', value=ymax),
+            bindparam('crs', value=crs)
+        )
 
     @classmethod
-    def _query_execute_filter_names(cls, query: str, filter_names: str, geometry_level: str):
+    def _query_bind_filter_names(cls, query: str, filter_names: str, geometry_level: str, min_area: float = 0):
         """
-        Execute a query based on filter names (land = 'Niedersachsen' ...) and geometry level (0-10)
+        Bind the parameters of a query based on filter names (land = 'Niedersachsen' ...) and geometry level (0-10)
         """
-        return (db.session.execute(
-            text(query).bindparams(
-                bindparam('filter_names', value=filter_names,
-                          expanding=True),
-                bindparam('geometry_level', value=geometry_level)
-            )
-        ))
+        return text(query).bindparams(
+            bindparam('filter_names', value=filter_names, expanding=True),
+            bindparam('geometry_level', value=geometry_level),
+            bindparam('min_area', value=min_area)
+        )
 
     @classmethod
-    def _query_execute_filter_codes(cls, query: str, filter_codes: str, geometry_level: str):
+    def _query_bind_filter_codes(cls, query: str, filter_codes: str, geometry_level: str, min_area: float = 0):
         """
-        Execute a query based on filter codes (land = '03' ...) and geometry level (0-10)
+        Bind the parameters of a query based on filter codes (land = '03' ...) and geometry level (0-10)
         """
-        return (db.session.execute(
-            text(query).bindparams(
-                bindparam('filter_codes', value=filter_codes,
-                          expanding=True),
-                bindparam('geometry_level', value=geometry_level)
-            )
-        ))
+        return text(query).bindparams(
+            bindparam('filter_codes', value=filter_codes, expanding=True),
+            bindparam('geometry_level', value=geometry_level),
+            bindparam('min_area', value=min_area)
+        )
 
     @classmethod
-    def _query_execute_filter_bbox(cls, query: str, agg_level: str, geometry_level: str, xmin: float, ymin: float, xmax: float, ymax: float, crs: int):
+    def _query_bind_filter_bbox(cls, query: str, agg_level: str, geometry_level: str, xmin: float, ymin: float, xmax: float, ymax: float, crs: int, min_area: float = 0):
         """
-        Execute a query based on geometry level (0-10), agg level (land, gemeinde, ...) and bounding box
+        Bind the parameters of a query based on geometry level (0-10), agg level (land, gemeinde, ...) and bounding box
         """
-        return (db.session.execute(
-                text(query).bindparams(
-                    bindparam('agg_level', value=agg_level),
-                    bindparam('geometry_level', value=geometry_level),
-                    bindparam('xmin', value=xmin),
-                    bindparam('ymin', value=ymin),
-                    bindparam('xmax', value=xmax),
-                    bindparam('ymax', value=ymax),
-                    bindparam('crs', value=crs)
-                )
-                ))
+        return text(query).bindparams(
+            bindparam('agg_level', value=agg_level),
+            bindparam('geometry_level', value=geometry_level),
+            bindparam('min_area', value=min_area),
+            bindparam('xmin', value=xmin),
+            bindparam('ymin', value=ymin),
+            bindparam('xmax', value=xmax),
+            bindparam('ymax', value=ymax),
+            bindparam('crs', value=crs)
+        )
 
     @classmethod
-    def _query_execute_no_filter(cls, query: str, agg_level: str, geometry_level: str):
+    def _query_bind_no_filter(cls, query: str, agg_level: str, geometry_level: str, min_area: float = 0):
         """
-        Execute a query based on geometry level (0-10) and agg level (land, gemeinde, ...)
+        Bind the parameters of a query based on geometry level (0-10) and agg level (land, gemeinde, ...)
         """
-        return (db.session.execute(
-                text(query).bindparams(
-                    bindparam('geometry_level', value=geometry_level),
-                    bindparam('agg_level', value=agg_level)
-                )
-                ))
+        return text(query).bindparams(
+            bindparam('geometry_level', value=geometry_level),
+            bindparam('min_area', value=min_area),
+            bindparam('agg_level', value=agg_level)
+        )
 
     @classmethod
-    def _get_vg250(cls, agg_level="", geometry_level=0, filter_level="", filter_names=[""], filter_codes=[""], xmin=0, ymin=0, xmax=0, ymax=0, crs=4326) -> list:
+    def _vg250_statement(cls, agg_level="", geometry_level=0, filter_level="", filter_names=[""], filter_codes=[""], xmin=0, ymin=0, xmax=0, ymax=0, crs=4326, clip=True, min_area=0):
         """
-        Query vg250 and vg250_attributes to return geojson file
+        Query of vg250 and vg250_attributes returning the geojson file
         """
         valid_levels = ['land', 'regierungsbezirk', 'kreis',
                         'verwaltungsgemeinschaft', 'gemeinde', 'nuts1', 'nuts2', 'nuts3']
@@ -264,32 +301,32 @@ class VG250ParameterSchema(Schema):
         if condition_no_bbox:
             selection2 = cls._query_create_json_output()
         else:
-            selection2 = cls._query_clip_bbox_create_json_output()
+            selection2 = cls._query_clip_bbox_create_json_output(clip)
 
         query = selection + selection2
 
         if condition_filters_selected and condition_bbox_selected:
             if condition_filter_names_available:
-                ret_val = cls._query_execute_filter_names_bbox(
-                    query, filter_names, geometry_level, xmin, ymin, xmax, ymax, crs)
+                ret_val = cls._query_bind_filter_names_bbox(
+                    query, filter_names, geometry_level, xmin, ymin, xmax, ymax, crs, min_area)
             else:
-                ret_val = cls._query_execute_filter_codes_bbox(
-                    query, filter_codes, geometry_level, xmin, ymin, xmax, ymax, crs)
+                ret_val = cls._query_bind_filter_codes_bbox(
+                    query, filter_codes, geometry_level, xmin, ymin, xmax, ymax, crs, min_area)
         elif condition_filters_selected and condition_no_bbox:
             if condition_filter_names_available:
-                ret_val = cls._query_execute_filter_names(
-                    query, filter_names, geometry_level)
+                ret_val = cls._query_bind_filter_names(
+                    query, filter_names, geometry_level, min_area)
             else:
-                ret_val = cls._query_execute_filter_codes(
-                    query, filter_codes, geometry_level)
+                ret_val = cls._query_bind_filter_codes(
+                    query, filter_codes, geometry_level, min_area)
         elif condition_no_filters and condition_bbox_selected:
-            ret_val = cls._query_execute_filter_bbox(
-                query, agg_level, geometry_level, xmin, ymin, xmax, ymax, crs)
+            ret_val = cls._query_bind_filter_bbox(
+                query, agg_level, geometry_level, xmin, ymin, xmax, ymax, crs, min_area)
         else:
-            ret_val = cls._query_execute_no_filter(
-                query, agg_level, geometry_level)
+            ret_val = cls._query_bind_no_filter(
+                query, agg_level, geometry_level, min_area)
 
-        return ret_val.all()
+        return ret_val
 
     @validates_schema
     def validate_method(self, args, **kwargs):
@@ -313,20 +350,93 @@ class VG250ParameterSchema(Schema):
             raise ValidationError(
                 f"Unknown filter_level {args['filter_level']}: must be land, regierungsbezirk, kreis, verwaltungsgemeinschaft, gemeinde, nuts1, nuts2 or nuts3")
 
+    @classmethod
+    def statement(cls, args, geometry_level: int):
+        """
+        Query of the parsed arguments on geometry_level, shared by the synchronous and the asynchronous API
+        """
+        return cls._vg250_statement(
+            args['agg_level'],
+            geometry_level,
+            args.get('filter_level', ""),
+            args.get('filter_names', []),
+            args.get('filter_codes', []),
+            args.get('filter_boundingbox_southwest_lng', 0),
+            args.get('filter_boundingbox_southwest_lat', 0),
+            args.get('filter_boundingbox_northeast_lng', 0),
+            args.get('filter_boundingbox_northeast_lat', 0),
+            clip=args.get('clip', True),
+            min_area=minimum_area_for_zoom(args.get('zoom_level', 2)))
+
+    @classmethod
+    def _shaped_features(cls, args, geometry_level):
+        """
+        The FeatureCollection of statement read from the snapshot file or the geometry engine, shapely drops the
+        small parts and clips instead of PostGIS. Features left unchanged are served as serialized before
+        """
+        agg_level = args['agg_level']
+        filter_level = args.get('filter_level', "")
+        filter_names, filter_codes = args.get('filter_names', []), args.get('filter_codes', [])
+        min_area = minimum_area_for_zoom(args.get('zoom_level', 2))
+        clip = args.get('clip', True)
+        if len(filter_names) == 0 and len(filter_codes) == 0:
+            filter_level = ""
+        if agg_level not in _levels:
+            raise GeoserviceInputException("Selected agg_level not in defined list")
+        if filter_level != "" and filter_level not in _levels:
+            raise GeoserviceInputException("Selected filter_level not in defined list")
+        filter_column, values = (_names.get(filter_level), filter_names) if len(filter_names) > 0 \
+            else (_codes.get(filter_level), filter_codes)
+        bounds = (
+            args.get('filter_boundingbox_southwest_lng', 0),
+            args.get('filter_boundingbox_southwest_lat', 0),
+            args.get('filter_boundingbox_northeast_lng', 0),
+            args.get('filter_boundingbox_northeast_lat', 0),
+        )
+        if sum(bounds) == 0:
+            bounds = None
+        # - - - - - - - - - - - - - - - - - - - -
+        if app.config['SNAPSHOT_PATH']:
+            conditions = ['geometry_level = :geometry_level', 'area >= :min_area']
+            params = {'geometry_level': geometry_level, 'min_area': min_area}
+            if filter_level == "":
+                conditions.append('agg_level = :agg_level')
+                params['agg_level'] = agg_level
+            else:
+                conditions.append(
+                    f'code IN (SELECT {_levels[agg_level]} FROM vg250_attributes WHERE {filter_column} IN :values)')
+                params['values'] = values
+            features, unchanged = snapshot.shape(snapshot.read(
+                'vg250', [*snapshot.VG250_PROPERTIES, 'part_areas', 'feature'], conditions, params, bounds
+            ), bounds, clip, min_area=min_area)
+        else:
+            codes = [] if filter_level == "" else geometry_engine.vg250_codes(_levels[agg_level], filter_column, values)
+            features, unchanged = geometry_engine.query(
+                'vg250', agg_level, geometry_level, bounds, None if filter_level == "" else 'code', codes,
+                min_area, clip,
+            )
+        # - - - - - - - - - - - - - - - - - - - -
+        serialized = features['feature'].to_numpy(dtype=object, copy=True)
+        serialized[~unchanged] = snapshot.features(
+            numpy.asarray(features.geometry)[~unchanged], features[snapshot.VG250_PROPERTIES][~unchanged])
+        response = make_response(
+            '{"type": "FeatureCollection", "features": '
+            + (f'[{", ".join(serialized)}]' if len(serialized) > 0 else 'null') + '}'
+        )
+        response.mimetype = 'application/json'
+        return response
+
+    @classmethod
+    def _fetch(cls, args, geometry_level):
+        if geometry_engine.serves(geometry_level):
+            return cls._shaped_features(args, geometry_level)
+        return read_session.execute(cls.statement(args, geometry_level)).all()[0][0]
+
     @classmethod
     def fetch(cls, args):
-        geometry_level = 10 - int(args.get('zoom_level', 2) - 1) // 1.1
-        if geometry_level < 0:
-            geometry_level = 0
-        if geometry_level > 10:
-            geometry_level = 10
-
-        return cls._get_vg250(args['agg_level'],
-                              geometry_level,
-                              args.get('filter_level', ""),
-                              args.get('filter_names', []),
-                              args.get('filter_codes', []),
-                              args.get('filter_boundingbox_southwest_lng', 0),
-                              args.get('filter_boundingbox_southwest_lat', 0),
-                              args.get('filter_boundingbox_northeast_lng', 0),
-                              args.get('filter_boundingbox_northeast_lat', 0))[0][0]
+        fetch = cls._shaped_features if app.config['SNAPSHOT_PATH'] else cls._fetch
+        return fetch_adaptive(
+            geometry_level_for_zoom(args.get('zoom_level', 2)),
+            lambda geometry_level: fetch(args, geometry_level),
+            args.get('adaptive'),
+        )
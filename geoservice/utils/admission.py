@@ -0,0 +1,156 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from contextlib import contextmanager
+from functools import wraps
+from math import ceil
+from threading import Condition, Lock
+from time import monotonic
+from typing import Callable, Optional
+
+from flask import request
+from flask_smorest import abort
+
+from ..application import app
+from .metrics import metrics
+from .zoom import geometry_level_for_zoom
+
+COARSEST_LEVEL = 10
+# cost of a full resolution request covering the whole extent, on top of the base cost of 1
+COST_SCALE = 10
+WORLD = (-180, -90, 180, 90)
+GERMANY = (5.8, 47.2, 15.1, 55.1)
+
+
+class Overloaded(Exception):
+    pass
+
+
+class WaitingLimit:
+    """
+    Requests of a worker waiting for admission across all endpoints. Each holds a thread while it waits, so
+    at most `limit` of them wait and the other threads keep serving the endpoints with free units
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.waiting = 0
+        self._lock = Lock()
+
+    def enter(self) -> bool:
+        with self._lock:
+            if self.waiting >= self.limit:
+                return False
+            self.waiting += 1
+            return True
+
+    def leave(self) -> None:
+        with self._lock:
+            self.waiting -= 1
+
+
+class AdmissionController:
+    """
+    Weighted semaphore of one endpoint within a worker. Requests take as many units as they cost, at most the
+    capacity; they wait up to `timeout` seconds for free units, but no more than `queue_size` of them at a time
+    and only while `waiting_limit` lets another request of the worker wait
+    """
+
+    def __init__(self, capacity: int, queue_size: int, timeout: float, waiting_limit: WaitingLimit):
+        self.capacity = capacity
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.waiting_limit = waiting_limit
+        self.in_use = 0
+        self.waiting = 0
+        self._condition = Condition()
+
+    @contextmanager
+    def admit(self, cost: int):
+        cost = min(max(cost, 1), self.capacity)
+        with self._condition:
+            if self.in_use + cost > self.capacity:
+                if self.waiting >= self.queue_size or not self.waiting_limit.enter():
+                    raise Overloaded()
+                self.waiting += 1
+                deadline = monotonic() + self.timeout
+                try:
+                    while self.in_use + cost > self.capacity:
+                        remaining = deadline - monotonic()
+                        if remaining <= 0 or not self._condition.wait(remaining):
+                            if self.in_use + cost > self.capacity:
+                                raise Overloaded()
+                finally:
+                    self.waiting -= 1
+                    self.waiting_limit.leave()
+            self.in_use += cost
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_use -= cost
+                self._condition.notify_all()
+
+
+_controllers: dict[str, AdmissionController] = {}
+_waiting_limit = WaitingLimit(app.config['ADMISSION_WAITING'])
+
+
+def _controller(endpoint: str) -> AdmissionController:
+    if endpoint not in _controllers:
+        settings = {**app.config['ADMISSION_DEFAULT'], **app.config['ADMISSION'].get(endpoint, {})}
+        _controllers.setdefault(endpoint, AdmissionController(
+            int(settings['capacity']), int(settings['queue']), float(settings['timeout']), _waiting_limit
+        ))
+    return _controllers[endpoint]
+
+
+def bbox_cost(args: dict, geometry_level: int = 0, extent: tuple = WORLD) -> int:
+    """
+    Cost of a request growing with the share of the extent its bounding box covers and with the detail
+    of its geometry level. Requests without bounding box cover the whole extent
+    """
+    xmin, ymin, xmax, ymax = extent
+    bbox = [args.get(f'filter_boundingbox_{corner}') for corner in
+            ['southwest_lng', 'southwest_lat', 'northeast_lng', 'northeast_lat']]
+    # vg250 takes all zeros as no bounding box
+    if not any(bbox):
+        bbox = list(extent)
+    west, south, east, north = [extent[i] if value is None else value for i, value in enumerate(bbox)]
+    covered = max(min(east, xmax) - max(west, xmin), 0) * max(min(north, ymax) - max(south, ymin), 0)
+    share = covered / ((xmax - xmin) * (ymax - ymin))
+    detail = (COARSEST_LEVEL + 1 - geometry_level) / (COARSEST_LEVEL + 1)
+    return 1 + ceil(COST_SCALE * share * detail)
+
+
+def zoom_cost(extent: tuple = WORLD) -> Callable[[dict], int]:
+    return lambda args: bbox_cost(args, geometry_level_for_zoom(args.get('zoom_level', 2)), extent)
+
+
+def admission(cost: Optional[Callable[[dict], int]] = None):
+    """
+    Decorator limiting the concurrent cost of an endpoint per worker, cost is computed from the parsed arguments.
+    Requests which cannot be admitted are answered with 503 and Retry-After
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            controller = _controller(request.endpoint)
+            try:
+                with controller.admit(cost(*args) if cost else 1):
+                    return view(*args, **kwargs)
+            except Overloaded:
+                metrics.increase('geoservice_rejected_requests_total', endpoint=request.endpoint)
+                abort(503, message="Too many expensive requests, please retry later",
+                      headers={'Retry-After': str(app.config['ADMISSION_RETRY_AFTER'])})
+        return wrapper
+    return decorator
+
+
+metrics.counter('geoservice_rejected_requests_total', 'Requests rejected by admission control')
+metrics.gauge('geoservice_admission_in_use', 'Cost units in use per endpoint', lambda: {
+    (('endpoint', endpoint),): controller.in_use for endpoint, controller in _controllers.items()
+})
+metrics.gauge('geoservice_admission_waiting', 'Requests waiting for admission per endpoint', lambda: {
+    (('endpoint', endpoint),): controller.waiting for endpoint, controller in _controllers.items()
+})
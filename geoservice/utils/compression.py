@@ -0,0 +1,197 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import json
+import zlib
+from functools import wraps
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from flask import g, request
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.wsgi import wrap_file
+
+from ..application import app
+from .disk_cache import DiskCache
+from .lookup import data_versions
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/geo+json',
+    'application/javascript',
+    'image/svg+xml',
+    'image/tif',
+    'image/tiff',
+}
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+# available encodings in order of preference
+COMPRESSORS = {
+    **({'zstd': _Zstd} if zstandard else {}),
+    **({'br': _Brotli} if brotli else {}),
+    'gzip': _Gzip,
+}
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """
+    Preferred available encoding with the highest quality in an Accept-Encoding header
+    """
+    qualities = {}
+    for part in accept_encoding.split(','):
+        encoding, _, parameters = part.strip().partition(';')
+        quality = 1.0
+        if parameters.strip().startswith('q='):
+            try:
+                quality = float(parameters.strip()[2:])
+            except ValueError:
+                continue
+        qualities[encoding.strip().lower()] = quality
+    candidates = [
+        (qualities.get(encoding, qualities.get('*', 0)), -position, encoding)
+        for position, encoding in enumerate(COMPRESSORS)
+    ]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+def compress(chunks: Iterable[bytes], encoding: str, sink: Optional[BinaryIO] = None) -> Iterator[bytes]:
+    compressor = COMPRESSORS[encoding]()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            if sink:
+                sink.write(data)
+            yield data
+    data = compressor.flush()
+    if sink:
+        sink.write(data)
+    yield data
+
+
+precompressed_cache = DiskCache(
+    Path(app.config['COMPRESSION_CACHE_DIRECTORY']),
+    max_bytes=app.config['COMPRESSION_CACHE_SIZE'],
+)
+
+
+def precompressed(view):
+    """
+    Decorator for endpoints whose response only depends on their query and the data. Their compressed
+    responses are stored per data version, query and encoding and served from disk afterwards
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        encoding = negotiate(request.headers.get('Accept-Encoding', ''))
+        if not encoding:
+            return view(*args, **kwargs)
+        try:
+            key = json.dumps([
+                request.endpoint, sorted(request.args.items(multi=True)), data_versions.tag, encoding
+            ])
+        except SQLAlchemyError:
+            app.logger.warning("Data versions unavailable, response is not stored")
+            return view(*args, **kwargs)
+        path = precompressed_cache.get(key)
+        if path is None:
+            g.precompressed_key = key
+            return view(*args, **kwargs)
+        # - - - - - - - - - - - - - - - - - - - -
+        file = open(path, 'rb')
+        header = file.readline()
+        response = app.response_class(
+            wrap_file(request.environ, file), headers=json.loads(header), direct_passthrough=True
+        )
+        response.headers['Content-Length'] = str(path.stat().st_size - len(header))
+        return response
+    return wrapper
+
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code < 200 or response.status_code >= 300 or request.method == 'HEAD'
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.headers.get('Accept-Encoding', ''))
+    if not encoding:
+        return response
+    if response.content_length is not None and response.content_length < app.config['COMPRESSION_MIN_SIZE']:
+        return response
+    # - - - - - - - - - - - - - - - - - - - -
+    chunks = response.iter_encoded()
+    # degraded responses are served at a coarser level than the query asks for and must not be kept
+    key = g.pop('precompressed_key', None) if response.status_code == 200 and not g.get('degraded') else None
+    response.headers['Content-Encoding'] = encoding
+    response.direct_passthrough = False
+    if response.content_length and response.content_length < app.config['COMPRESSION_STREAM_SIZE']:
+        if key:
+            with precompressed_cache.put(key) as file:
+                file.write(_stored_headers(response))
+                data = b''.join(compress(chunks, encoding, file))
+        else:
+            data = b''.join(compress(chunks, encoding))
+        response.set_data(data)
+        return response
+    # - - - - - - - - - - - - - - - - - - - -
+    # large responses are compressed while they are sent
+    def stream():
+        if key:
+            with precompressed_cache.put(key) as file:
+                file.write(_stored_headers(response))
+                yield from compress(chunks, encoding, file)
+        else:
+            yield from compress(chunks, encoding)
+
+    response.headers.pop('Content-Length', None)
+    response.response = stream()
+    return response
+
+
+def _stored_headers(response) -> bytes:
+    return json.dumps([
+        [name, value] for name, value in response.headers.items() if name != 'Content-Length'
+    ]).encode() + b'\n'
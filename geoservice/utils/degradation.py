@@ -0,0 +1,103 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from collections import defaultdict, deque
+from statistics import quantiles
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+from flask import g, has_request_context, request
+from sqlalchemy.exc import DBAPIError
+
+from ..application import app
+from ..model import read_session
+from ..model.pool import is_statement_timeout, statement_timeout
+from .metrics import metrics
+
+COARSEST_LEVEL = 10
+# levels skipped when a request is degraded
+DEGRADATION_STEP = 2
+# number of recent durations per endpoint the latency percentile is computed from
+LATENCY_WINDOW = 200
+
+_latencies: dict[Optional[str], deque] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+_latencies_lock = Lock()
+
+
+def _endpoint() -> Optional[str]:
+    return request.endpoint if has_request_context() else None
+
+
+def pool_saturation() -> float:
+    pool = read_session.get_bind().pool
+    if not hasattr(pool, 'checkedout'):
+        return 0.0
+    capacity = pool.size() + app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).get('max_overflow', 0)
+    return pool.checkedout() / capacity if capacity else 0.0
+
+
+def _latency_p95() -> float:
+    with _latencies_lock:
+        latencies = list(_latencies[_endpoint()])
+    return quantiles(latencies, n=20)[-1] if len(latencies) >= 20 else 0.0
+
+
+def _preselect(geometry_level: int) -> int:
+    """
+    Coarser level to start with while the pool is saturated or queries of the endpoint run close to their budget
+    """
+    budget = statement_timeout() / 1000
+    if pool_saturation() >= app.config['ADAPTIVE_SATURATION']:
+        reason = 'saturation'
+    elif budget and _latency_p95() >= app.config['ADAPTIVE_LATENCY'] * budget:
+        reason = 'latency'
+    else:
+        return geometry_level
+    metrics.increase('geoservice_degraded_requests_total', endpoint=_endpoint(), reason=reason)
+    return min(geometry_level + DEGRADATION_STEP, COARSEST_LEVEL)
+
+
+def fetch_adaptive(geometry_level: int, fetch: Callable[[int], Any], adaptive: Optional[bool] = None) -> Any:
+    """
+    Call fetch with the geometry level to serve. In adaptive mode the level may be coarser than requested
+    depending on the load, and fetch is retried at a coarser level when its statement timed out; the first
+    attempt then only gets half of the query budget. The level served is kept in g.geometry_level, g.degraded
+    tells whether it differs from the requested one
+    """
+    if adaptive is None:
+        adaptive = app.config['ADAPTIVE_DEGRADATION']
+    if not adaptive:
+        g.geometry_level = geometry_level
+        return fetch(geometry_level)
+    # - - - - - - - - - - - - - - - - - - - -
+    requested_level = geometry_level
+    geometry_level = _preselect(geometry_level)
+    budget = statement_timeout()
+    if budget and geometry_level < COARSEST_LEVEL:
+        g.statement_timeout = budget // 2
+    started = perf_counter()
+    try:
+        while True:
+            start = perf_counter()
+            try:
+                result = fetch(geometry_level)
+            except DBAPIError as e:
+                remaining = budget - int((perf_counter() - started) * 1000)
+                if not is_statement_timeout(e.orig) or geometry_level >= COARSEST_LEVEL or remaining <= 0:
+                    raise
+                read_session.rollback()
+                metrics.increase('geoservice_degraded_requests_total', endpoint=_endpoint(), reason='timeout')
+                geometry_level = min(geometry_level + DEGRADATION_STEP, COARSEST_LEVEL)
+                g.statement_timeout = remaining
+                continue
+            with _latencies_lock:
+                _latencies[_endpoint()].append(perf_counter() - start)
+            g.geometry_level = geometry_level
+            g.degraded = geometry_level != requested_level
+            return result
+    finally:
+        g.pop('statement_timeout', None)
+
+
+metrics.counter('geoservice_degraded_requests_total', 'Requests served at a coarser geometry level than requested')
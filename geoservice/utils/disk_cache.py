@@ -0,0 +1,82 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import os
+import tempfile
+from contextlib import contextmanager
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Iterator, Optional
+
+
+class DiskCache:
+    """
+    Files addressed by the sha256 of their key, shared by all workers of a host. Entries are written to a
+    temporary file and renamed when complete; reading an entry refreshes its modification time, and the
+    least recently used entries are removed once the directory holds more than `max_bytes`
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ''):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._written = 0
+        self._lock = Lock()
+
+    def path(self, key: str) -> Path:
+        digest = sha256(key.encode()).hexdigest()
+        return self.directory / digest[:2] / f'{digest}{self.suffix}'
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    @contextmanager
+    def put(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Open the entry for writing, it only becomes visible when the block completes without error
+        """
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # every put writes a file of its own, threads and processes may store the same key at once
+        descriptor, name = tempfile.mkstemp(prefix=f'.{path.name}.', dir=path.parent)
+        temporary_path = Path(name)
+        try:
+            with open(descriptor, 'wb') as file:
+                yield file
+            size = temporary_path.stat().st_size
+            temporary_path.replace(path)
+        finally:
+            temporary_path.unlink(missing_ok=True)
+        self._account(size)
+
+    def _account(self, size: int) -> None:
+        # the directory is only scanned after roughly a tenth of the capacity has been written by this process
+        with self._lock:
+            self._written += size
+            if self._written < self.max_bytes / 10:
+                return
+            self._written = 0
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for path in self.directory.glob('*/*'):
+            if path.name.startswith('.'):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,113 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, Optional
+
+import geopandas
+import numpy
+import pandas
+import shapely
+
+from ..application import app
+from .geometry_store import (TABLES, current_versions, database_partitions, database_vg250_attributes, modified,
+                             open_store)
+from .lookup import VersionedLookup
+from .snapshot import Bounds, features, shape
+
+
+class _Partition:
+    """
+    The geometries of one table, source or agg_level and level with their STRtree
+    """
+
+    def __init__(self, frame: pandas.DataFrame, columns: list[str], with_features: bool):
+        geometries = shapely.from_wkb([None if wkb is None else bytes(wkb) for wkb in frame['geometry']])
+        self._frame = geopandas.GeoDataFrame(
+            frame[[*columns, 'area', 'part_areas']].reset_index(drop=True), geometry=geometries, crs=4326
+        )
+        if with_features:
+            # unchanged features are served as they are serialized here
+            self._frame['feature'] = features(geometries, self._frame[columns])
+        self.rows = len(self._frame)
+        self.tree = shapely.STRtree(geometries)
+
+    def candidates(self, bounds: Bounds) -> numpy.ndarray:
+        selected = numpy.zeros(self.rows, dtype=bool)
+        selected[self.tree.query(shapely.box(*bounds))] = True
+        return selected
+
+    def column(self, name: str) -> numpy.ndarray:
+        return self._frame[name].to_numpy()
+
+    def frame(self, indices: numpy.ndarray) -> geopandas.GeoDataFrame:
+        return self._frame.iloc[indices]
+
+
+class GeometryEngine(VersionedLookup):
+    """
+    The adm0, adm1 and vg250 geometries from GEOMETRY_ENGINE_MIN_LEVEL on, held in memory by every worker as
+    shapely arrays with an STRtree per table, source or agg_level and level, or mapped with a packed R-tree
+    from the geometry store at GEOMETRY_STORE_PATH shared by all workers. Queries of these levels are answered like the PostGIS queries
+    of the schemas; the more detailed levels stay in the database
+    """
+
+    def enabled(self) -> bool:
+        return app.config['GEOMETRY_ENGINE'] == 'memory' and not app.config['SNAPSHOT_PATH']
+
+    def serves(self, geometry_level: int) -> bool:
+        return self.enabled() and geometry_level >= app.config['GEOMETRY_ENGINE_MIN_LEVEL']
+
+    def _current_version(self) -> Any:
+        if not self.enabled():
+            return None
+        # only the sources of the geometries, and the store, so a store replaced after falling back to the
+        # database is mapped on the next check
+        return tuple(sorted(current_versions().items())), modified(app.config['GEOMETRY_STORE_PATH'])
+
+    def _load(self) -> Mapping:
+        if not self.enabled():
+            return MappingProxyType({})
+        if app.config['GEOMETRY_STORE_PATH']:
+            stored = open_store(app.config['GEOMETRY_STORE_PATH'], current_versions())
+            if stored is not None:
+                return MappingProxyType(stored)
+        partitions = {
+            (table, partition, geometry_level): _Partition(frame, TABLES[table][2], table == 'vg250')
+            for (table, partition, geometry_level), frame in database_partitions(
+                app.config['GEOMETRY_ENGINE_MIN_LEVEL'])
+        }
+        partitions['vg250_attributes'] = database_vg250_attributes()
+        return MappingProxyType(partitions)
+
+    def vg250_codes(self, agg_level_column: str, filter_column: str, values: Iterable[str]) -> list[str]:
+        """
+        Codes in agg_level_column of vg250_attributes of the rows whose filter_column is one of values
+        """
+        attributes = self.data['vg250_attributes']
+        return attributes.loc[attributes[filter_column].isin(list(values)), agg_level_column].unique().tolist()
+
+    def query(self, table: str, partition: str, geometry_level: int, bounds: Optional[Bounds] = None,
+              code_column: Optional[str] = None, codes: Iterable[str] = (), min_area: Optional[float] = None,
+              clip: bool = True, exact: bool = True) -> tuple[geopandas.GeoDataFrame, numpy.ndarray]:
+        """
+        Geometries of table in partition (the source, or agg_level of vg250) on geometry_level whose code_column
+        is one of codes, if given, and which intersect bounds, shaped like the snapshot does. Returns them with
+        the columns of the table and whether each geometry is unchanged
+        """
+        _, _, columns = TABLES[table]
+        found = self.data.get((table, partition, geometry_level))
+        if found is None:
+            empty = [*columns, 'area', 'part_areas', *(['feature'] if table == 'vg250' else [])]
+            return geopandas.GeoDataFrame({column: [] for column in empty}, geometry=[], crs=4326), \
+                numpy.zeros(0, dtype=bool)
+        # candidates by their envelope, shape tests the geometries
+        selected = numpy.ones(found.rows, dtype=bool) if bounds is None else found.candidates(bounds)
+        if code_column is not None:
+            selected &= pandas.Series(found.column(code_column)).isin(list(codes)).to_numpy()
+        if min_area is not None:
+            selected &= found.column('area') >= min_area
+        return shape(found.frame(numpy.flatnonzero(selected)), bounds, clip, exact, min_area)
+
+
+geometry_engine = GeometryEngine()
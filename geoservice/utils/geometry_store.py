@@ -0,0 +1,313 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import json
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, Mapping, Optional
+
+import geopandas
+import numpy
+import pandas
+import shapely
+from sqlalchemy import select
+
+from ..application import app
+from ..model import db
+from ..model.geoobject import Adm0, Adm1, DataVersion, VG250, VG250Attributes
+from .snapshot import VG250_PROPERTIES, features
+
+# increased whenever the layout of the store changes
+FORMAT_VERSION = 2
+MAGIC = b'GEOSTORE'
+# magic and the position of the header, which follows the arrays
+PREAMBLE = struct.Struct(f'<{len(MAGIC)}sQ')
+# tables of the geometry engine with the column their geometries are partitioned by besides the level, and the
+# columns returned with them
+TABLES = {
+    'adm0': (Adm0, 'source', ['adm0_code']),
+    'adm1': (Adm1, 'source', ['adm0_code', 'adm1_code']),
+    'vg250': (VG250, 'agg_level', VG250_PROPERTIES),
+}
+# data sources writing these tables, only their data versions make a store outdated
+SOURCES = ['gadm', 'naturalearth', 'vg250']
+# entries per node of the packed R-tree of a partition
+NODE_SIZE = 16
+
+Key = tuple[str, str, int]
+
+
+def current_versions() -> dict[str, int]:
+    """
+    Data versions of SOURCES, as written by the ETL
+    """
+    return dict(db.session.execute(
+        select(DataVersion.source, DataVersion.version).where(DataVersion.source.in_(SOURCES))
+    ).all())
+
+
+def modified(path: str) -> Optional[int]:
+    """
+    Modification time of the store file path in nanoseconds, None if there is none
+    """
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def database_partitions(min_level: int) -> Iterator[tuple[Key, pandas.DataFrame]]:
+    """
+    Rows of the tables of the geometry engine from min_level on per table, partition and level, with the
+    columns of the table, area, part_areas and the geometry as WKB
+    """
+    connection = db.session.connection()
+    for table, (model, partition_column, columns) in TABLES.items():
+        frame = pandas.read_sql(select(
+            getattr(model, partition_column).label('partition'),
+            *[getattr(model, column) for column in dict.fromkeys(['geometry_level', *columns])],
+            model.area,
+            model.part_areas,
+            db.func.ST_AsBinary(model.geometry).label('geometry'),
+        ).filter(model.geometry_level >= min_level), con=connection)
+        for (partition, geometry_level), group in frame.groupby(['partition', 'geometry_level']):
+            yield (table, partition, int(geometry_level)), group.reset_index(drop=True)
+
+
+def database_vg250_attributes() -> pandas.DataFrame:
+    return pandas.read_sql(select(*VG250Attributes.__table__.columns), con=db.session.connection())
+
+
+def _blobs(values: list[Optional[bytes]]) -> dict[str, numpy.ndarray]:
+    """
+    Variable length values as their concatenation and the offsets of each value, None is stored empty
+    """
+    lengths = [0 if value is None else len(value) for value in values]
+    return {
+        'data': numpy.frombuffer(b''.join(value or b'' for value in values), dtype=numpy.uint8),
+        'offsets': numpy.concatenate([[0], numpy.cumsum(lengths, dtype=numpy.int64)]).astype(numpy.int64),
+    }
+
+
+def _encode_columns(frame: pandas.DataFrame, columns: list[str]) -> dict[str, numpy.ndarray]:
+    """
+    Integer columns as they are, the others as UTF-8 text with a mask of their null values
+    """
+    arrays = {}
+    for column in columns:
+        if pandas.api.types.is_integer_dtype(frame[column]):
+            arrays[column] = frame[column].to_numpy(dtype=numpy.int64)
+            continue
+        values = [None if pandas.isna(value) else str(value).encode() for value in frame[column]]
+        arrays.update({f'{column}.{name}': array for name, array in _blobs(values).items()})
+        arrays[f'{column}.null'] = numpy.array([value is None for value in values], dtype=bool)
+    return arrays
+
+
+def _packed_index(bounds: numpy.ndarray) -> dict[str, numpy.ndarray]:
+    """
+    Packed R-tree of the rows with a geometry: the rows sorted into leaves of NODE_SIZE by Sort-Tile-Recursive
+    and the bounding boxes of the nodes level by level from the leaves up, with the offset of every level
+    """
+    order = numpy.flatnonzero(~numpy.isnan(bounds).any(axis=1))
+    leaves = -(-len(order) // NODE_SIZE)
+    # vertical slices of about the square root of the leaves, each sorted by y
+    slice_size = max(int(numpy.ceil(numpy.sqrt(leaves))), 1) * NODE_SIZE
+    order = order[numpy.argsort((bounds[order, 0] + bounds[order, 2]) / 2, kind='stable')]
+    order = order[numpy.lexsort((
+        (bounds[order, 1] + bounds[order, 3]) / 2,
+        numpy.arange(len(order)) // slice_size,
+    ))]
+    levels = []
+    boxes = bounds[order]
+    while len(boxes) > 0 and (not levels or len(boxes) > 1):
+        starts = numpy.arange(0, len(boxes), NODE_SIZE)
+        boxes = numpy.hstack([
+            numpy.minimum.reduceat(boxes[:, :2], starts),
+            numpy.maximum.reduceat(boxes[:, 2:], starts),
+        ])
+        levels.append(boxes)
+    return {
+        'index.order': order.astype(numpy.int64),
+        'index.nodes': numpy.concatenate(levels) if levels else numpy.zeros((0, 4)),
+        'index.levels': numpy.concatenate([[0], numpy.cumsum([len(level) for level in levels])]).astype(numpy.int64),
+    }
+
+
+def _intersects(boxes: numpy.ndarray, bounds) -> numpy.ndarray:
+    return ((boxes[:, 0] <= bounds[2]) & (boxes[:, 2] >= bounds[0])
+            & (boxes[:, 1] <= bounds[3]) & (boxes[:, 3] >= bounds[1]))
+
+
+def _encode(frame: pandas.DataFrame, columns: list[str], with_features: bool) -> dict[str, numpy.ndarray]:
+    wkb = [None if value is None else bytes(value) for value in frame['geometry']]
+    geometries = shapely.from_wkb(wkb)
+    part_areas = [list(value or []) for value in frame['part_areas']]
+    bounds = shapely.bounds(geometries).astype(numpy.float64)
+    arrays = {
+        'bounds': bounds,
+        **_packed_index(bounds),
+        'area': frame['area'].to_numpy(dtype=numpy.float64, na_value=numpy.nan),
+        'part_areas.data': numpy.array([area for areas in part_areas for area in areas], dtype=numpy.float64),
+        'part_areas.offsets': numpy.concatenate([[0], numpy.cumsum([len(areas) for areas in part_areas])])
+                                   .astype(numpy.int64),
+        **{f'geometry.{name}': array for name, array in _blobs(wkb).items()},
+        **_encode_columns(frame, columns),
+    }
+    if with_features:
+        arrays.update({f'feature.{name}': array for name, array in _blobs([
+            feature.encode() for feature in features(geometries, frame[columns])
+        ]).items()})
+    return arrays
+
+
+def write(path: str, versions: Optional[dict[str, int]] = None) -> None:
+    """
+    Write the geometries of the geometry engine from GEOMETRY_ENGINE_MIN_LEVEL on into the store file path,
+    stamped with versions, by default the current data versions of SOURCES
+    """
+    write_partitions(
+        path,
+        current_versions() if versions is None else versions,
+        database_partitions(app.config['GEOMETRY_ENGINE_MIN_LEVEL']),
+        database_vg250_attributes(),
+    )
+
+
+def write_partitions(path: str, versions: dict[str, int], partitions: Iterable[tuple[Key, pandas.DataFrame]],
+                     vg250_attributes: pandas.DataFrame) -> None:
+    """
+    Write partitions as database_partitions returns them into the store file path: per table, partition and
+    level the bounding boxes with a packed R-tree, areas and codes as arrays, the geometries as WKB and the
+    vg250 features as GeoJSON with offset tables, so workers map the file instead of loading it. The file is
+    written next to path and renamed when complete
+    """
+    header = {'format': FORMAT_VERSION, 'data_versions': versions, 'partitions': []}
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary_path, 'wb') as file:
+            file.write(PREAMBLE.pack(MAGIC, 0))
+
+            def write_arrays(arrays: dict[str, numpy.ndarray]) -> dict[str, list]:
+                layout = {}
+                for name, array in arrays.items():
+                    # every array starts at a multiple of 8 bytes, so it is aligned in the mapping
+                    file.write(b'\0' * (-file.tell() % 8))
+                    layout[name] = [file.tell(), array.dtype.str, list(array.shape)]
+                    file.write(numpy.ascontiguousarray(array).tobytes())
+                return layout
+
+            for (table, partition, geometry_level), frame in partitions:
+                _, _, columns = TABLES[table]
+                header['partitions'].append({
+                    'key': [table, partition, geometry_level],
+                    'rows': len(frame),
+                    'arrays': write_arrays(_encode(frame, columns, table == 'vg250')),
+                })
+            header['vg250_attributes'] = {
+                'rows': len(vg250_attributes),
+                'columns': list(vg250_attributes.columns),
+                'arrays': write_arrays(_encode_columns(vg250_attributes, list(vg250_attributes.columns))),
+            }
+            header_position = file.tell()
+            file.write(json.dumps(header).encode())
+            file.seek(0)
+            file.write(PREAMBLE.pack(MAGIC, header_position))
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+class StoredPartition:
+    """
+    A partition of the store, read from the mapping. Only the text columns are decoded when it is opened, the
+    geometries and features of the rows a query selects are decoded per query
+    """
+
+    def __init__(self, buffer: mmap.mmap, rows: int, layout: dict[str, list], columns: list[str]):
+        self.rows = rows
+        self._arrays = {
+            name: numpy.frombuffer(buffer, dtype=dtype, count=int(numpy.prod(shape)), offset=offset).reshape(shape)
+            for name, (offset, dtype, shape) in layout.items()
+        }
+        self.columns = {column: self._decode(column) for column in columns}
+        self.has_features = 'feature.data' in self._arrays
+
+    def _values(self, name: str, indices: numpy.ndarray) -> list[bytes]:
+        data, offsets = self._arrays[f'{name}.data'], self._arrays[f'{name}.offsets']
+        return [data[offsets[i]:offsets[i + 1]].tobytes() for i in indices]
+
+    def _decode(self, column: str) -> numpy.ndarray:
+        if column in self._arrays:
+            return self._arrays[column]
+        nulls = self._arrays[f'{column}.null']
+        return numpy.array([None if null else value.decode()
+                            for value, null in zip(self._values(column, range(self.rows)), nulls)], dtype=object)
+
+    def candidates(self, bounds) -> numpy.ndarray:
+        """
+        Rows whose bounding box intersects bounds, found by descending the packed R-tree from its root. Rows
+        without a geometry are not in the tree
+        """
+        order, nodes = self._arrays['index.order'], self._arrays['index.nodes']
+        levels = self._arrays['index.levels']
+        ids = numpy.arange(levels[-1] - levels[-2]) if len(levels) > 1 else numpy.zeros(0, dtype=numpy.int64)
+        for level in range(len(levels) - 2, -1, -1):
+            ids = ids[_intersects(nodes[levels[level] + ids], bounds)]
+            children = levels[level] - levels[level - 1] if level > 0 else len(order)
+            ids = (ids[:, None] * NODE_SIZE + numpy.arange(NODE_SIZE)).ravel()
+            ids = ids[ids < children]
+        rows = order[ids]
+        selected = numpy.zeros(self.rows, dtype=bool)
+        selected[rows[_intersects(self._arrays['bounds'][rows], bounds)]] = True
+        return selected
+
+    def column(self, name: str) -> numpy.ndarray:
+        return self._arrays['area'] if name == 'area' else self.columns[name]
+
+    def frame(self, indices: numpy.ndarray) -> geopandas.GeoDataFrame:
+        part_areas = self._arrays['part_areas.data']
+        part_area_offsets = self._arrays['part_areas.offsets']
+        frame = pandas.DataFrame({
+            **{column: values[indices] for column, values in self.columns.items()},
+            'area': self._arrays['area'][indices],
+            'part_areas': [part_areas[part_area_offsets[i]:part_area_offsets[i + 1]].tolist() for i in indices],
+        })
+        if self.has_features:
+            frame['feature'] = [value.decode() for value in self._values('feature', indices)]
+        return geopandas.GeoDataFrame(
+            frame, geometry=shapely.from_wkb([wkb or None for wkb in self._values('geometry', indices)]), crs=4326
+        )
+
+
+def open_store(path: str, versions: dict[str, int]) -> Optional[Mapping]:
+    """
+    Partitions of the store file path by their key and the vg250 attributes, None unless the store exists and
+    was written for versions or later ones: the ETL writes the store before it increases the data version of
+    its source. The file is mapped read-only, so all workers of a host share its pages through the page cache
+    """
+    try:
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    magic, header_position = PREAMBLE.unpack_from(buffer)
+    if magic != MAGIC:
+        raise RuntimeError(f"{path} is not a geometry store")
+    header = json.loads(buffer[header_position:])
+    if header['format'] != FORMAT_VERSION or any(
+            header['data_versions'].get(source, 0) < version for source, version in versions.items()):
+        app.logger.warning(f"Geometry store {path} is outdated, loading the geometries from the database")
+        return None
+    partitions = {}
+    for partition in header['partitions']:
+        table, name, geometry_level = partition['key']
+        partitions[(table, name, geometry_level)] = StoredPartition(
+            buffer, partition['rows'], partition['arrays'], TABLES[table][2])
+    attributes = header['vg250_attributes']
+    stored_attributes = StoredPartition(buffer, attributes['rows'], attributes['arrays'], attributes['columns'])
+    partitions['vg250_attributes'] = pandas.DataFrame(stored_attributes.columns)
+    return partitions
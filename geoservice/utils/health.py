@@ -0,0 +1,123 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import Any, Optional
+
+from flask import g
+from sqlalchemy import text
+
+from ..application import app
+from ..model import read_session
+
+# a point and a small envelope in Berlin, covered by every source
+POINT = 'ST_SetSRID(ST_Point(13.4, 52.5), 4326)'
+ENVELOPE = 'ST_MakeEnvelope(13.3, 52.4, 13.5, 52.6, 4326)'
+
+# probe whose budget includes checking out its connection from the pool, the others only time their query
+POOL_PROBE = 'pool'
+
+# name: (query, latency budget in milliseconds). The geometry queries use the spatial index of their table
+# and stop at the first row, the raster queries read a single block
+PROBES: dict[str, tuple[str, int]] = {
+    'pool': ('SELECT 1', 50),
+    'gadm': (f"SELECT 1 FROM adm0 WHERE source = 'gadm' AND geometry && {ENVELOPE} LIMIT 1", 100),
+    'naturalearth': (f"SELECT 1 FROM adm0 WHERE source = 'naturalearth' AND geometry && {ENVELOPE} LIMIT 1", 100),
+    'vg250': (f"SELECT 1 FROM vg250 WHERE geometry && {ENVELOPE} LIMIT 1", 100),
+    'populatedplaces': (f"SELECT 1 FROM populated_places WHERE geometry && {ENVELOPE} LIMIT 1", 100),
+    'consulates': (f"SELECT 1 FROM consulates WHERE geometry && {ENVELOPE} LIMIT 1", 100),
+    'wahlkreise': (f"SELECT 1 FROM wahlkreise WHERE geometry && {ENVELOPE} LIMIT 1", 100),
+    'landscan': (f"SELECT ST_Value(rast, {POINT}) FROM landscan WHERE ST_Intersects(rast, {POINT}) LIMIT 1", 200),
+    'hillshade': (f"SELECT ST_Value(rast, {POINT}) FROM hillshade WHERE ST_Intersects(rast, {POINT}) LIMIT 1", 200),
+}
+
+# the envelope as a condition of the R*Tree tables of the snapshot
+RTREE_ENVELOPE = 'minx <= 13.5 AND maxx >= 13.3 AND miny <= 52.6 AND maxy >= 52.4'
+
+# probes in snapshot mode: the sources the snapshot holds, found by the R*Tree of their table
+SNAPSHOT_PROBES: dict[str, tuple[str, int]] = {
+    'pool': ('SELECT 1', 50),
+    'gadm': (f"SELECT 1 FROM adm0 WHERE source = 'gadm' "
+             f"AND id IN (SELECT id FROM adm0_rtree WHERE {RTREE_ENVELOPE}) LIMIT 1", 100),
+    'naturalearth': (f"SELECT 1 FROM adm0 WHERE source = 'naturalearth' "
+                     f"AND id IN (SELECT id FROM adm0_rtree WHERE {RTREE_ENVELOPE}) LIMIT 1", 100),
+    'vg250': (f"SELECT 1 FROM vg250_rtree WHERE {RTREE_ENVELOPE} LIMIT 1", 100),
+    'populatedplaces': (f"SELECT 1 FROM populated_places_rtree WHERE {RTREE_ENVELOPE} LIMIT 1", 100),
+    'consulates': (f"SELECT 1 FROM consulates_rtree WHERE {RTREE_ENVELOPE} LIMIT 1", 100),
+}
+
+
+class HealthCheck:
+    """
+    Runs the probes against the read database, each in its own transaction cancelled after twice its budget.
+    Every probe reports the time it took to check out its connection; only the pool probe counts it against
+    its budget, and fails at once when the pool has no connection left instead of waiting for one.
+    The result is kept for `ttl` seconds, so frequent polling does not load the database; concurrent requests
+    of a worker wait for the probes of the first
+    """
+
+    def __init__(self, probes: dict[str, tuple[str, int]], ttl: float):
+        self.probes = probes
+        self.ttl = ttl
+        self._result: Optional[dict[str, Any]] = None
+        self._checked = 0.0
+        self._lock = Lock()
+
+    @staticmethod
+    def _pool_exhausted() -> bool:
+        pool = read_session.get_bind().pool
+        # only a QueuePool limits its connections, a negative max_overflow lifts the limit
+        max_overflow = getattr(pool, '_max_overflow', -1)
+        return max_overflow >= 0 and pool.checkedin() == 0 and pool.overflow() >= max_overflow
+
+    def _probe(self, query: str, budget: int, checkout: bool = False) -> dict[str, Any]:
+        g.statement_timeout = 2 * budget
+        started = perf_counter()
+        checked_out = None
+        try:
+            if checkout and self._pool_exhausted():
+                raise RuntimeError("no connection left in the pool")
+            read_session.connection()
+            checked_out = perf_counter()
+            read_session.execute(text(query)).all()
+            error = None
+        except Exception as e:
+            error = f'{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ""}'
+        finally:
+            read_session.rollback()
+        finished = perf_counter()
+        checkout_ms = ((checked_out or finished) - started) * 1000
+        duration = (finished - (started if checkout or checked_out is None else checked_out)) * 1000
+        return {
+            'ok': error is None and duration <= budget,
+            'duration_ms': round(duration, 1),
+            'checkout_ms': round(checkout_ms, 1),
+            'budget_ms': budget,
+            **({'error': error} if error else {}),
+        }
+
+    def run(self) -> dict[str, Any]:
+        budgets = app.config['MONITORING_BUDGETS']
+        probes = {
+            name: self._probe(query, int(budgets.get(name, budget)), checkout=name == POOL_PROBE)
+            for name, (query, budget) in self.probes.items()
+        }
+        return {
+            'failed': [name for name, probe in probes.items() if not probe['ok']],
+            'probes': probes,
+        }
+
+    def result(self) -> tuple[dict[str, Any], float]:
+        """
+        Result of the latest probes and its age in seconds
+        """
+        with self._lock:
+            if self._result is None or monotonic() - self._checked > self.ttl:
+                self._result = self.run()
+                self._checked = monotonic()
+            return self._result, monotonic() - self._checked
+
+
+health_check = HealthCheck(SNAPSHOT_PROBES if app.config['SNAPSHOT_PATH'] else PROBES,
+                           ttl=app.config['MONITORING_CACHE_TTL'])
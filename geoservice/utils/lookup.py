@@ -0,0 +1,236 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import json
+from abc import ABC, abstractmethod
+from threading import Lock
+from time import monotonic
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, Optional
+
+import pandas
+from sqlalchemy import select, text
+
+from ..application import app
+from ..model import db
+from ..model.geoobject import DataVersion, LinkTable, Metadata, Metadatakeywords, Metadataorigin, Population
+
+
+class VersionedLookup(ABC):
+    """
+    Read-only table held in memory by every worker. The table is loaded on first use and replaced as a whole
+    once the data version of SOURCE changed, which is checked at most every LOOKUP_REFRESH_INTERVAL seconds.
+    Without SOURCE, the table is replaced once any data source changed
+    """
+    SOURCE: Optional[str] = None
+
+    def __init__(self):
+        self._lock = Lock()
+        self._data: Optional[Mapping] = None
+        self._version: Any = None
+        self._checked: float = 0.0
+
+    @abstractmethod
+    def _load(self) -> Mapping:
+        ...
+
+    def _current_version(self) -> Any:
+        if self.SOURCE is None:
+            return tuple(
+                tuple(row) for row in
+                db.session.execute(select(DataVersion.source, DataVersion.version).order_by(DataVersion.source)).all()
+            )
+        return db.session.execute(
+            select(DataVersion.version).where(DataVersion.source == self.SOURCE)
+        ).scalar()
+
+    def refresh(self) -> None:
+        with self._lock:
+            version = self._current_version()
+            self._data = self._load()
+            self._version = version
+            self._checked = monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._data = None
+
+    @property
+    def data(self) -> Mapping:
+        if self._data is None:
+            self.refresh()
+        elif monotonic() - self._checked > app.config['LOOKUP_REFRESH_INTERVAL']:
+            self._checked = monotonic()
+            if self._current_version() != self._version:
+                self.refresh()
+        return self._data
+
+
+class LinkTableLookup(VersionedLookup):
+    """
+    Translation of ISO 3166-1 alpha-3 codes into the codes of the other sources, as written by DataSourceNomenclature
+    """
+    SOURCE = 'nomenclature'
+
+    def _load(self) -> Mapping:
+        mapping: dict[tuple[str, str], dict[str, Any]] = {}
+        for level, source, iso_code, code, name in db.session.execute(
+            select(
+                LinkTable.link_to_aerial_level,
+                LinkTable.link_to_source,
+                LinkTable.iso_3166_1_a3,
+                LinkTable.link_to_code,
+                LinkTable.link_to_name,
+            )
+        ).all():
+            entry = mapping.setdefault((level, source), {'codes': {}, 'names': {}})
+            entry['codes'][iso_code] = entry['codes'].get(iso_code, ()) + (code,)
+            entry['names'].setdefault(name, code)
+        return MappingProxyType({
+            key: MappingProxyType({
+                'codes': MappingProxyType(entry['codes']),
+                'names': MappingProxyType(entry['names']),
+            })
+            for key, entry in mapping.items()
+        })
+
+    def codes(self, level: str, source: str, iso_codes: Iterable[str]) -> list[str]:
+        """
+        Codes of source on aerial level (adm0|adm1) linked to the given ISO 3166-1 alpha-3 codes
+        """
+        codes = self.data.get((level, source), {}).get('codes', {})
+        return [code for iso_code in iso_codes for code in codes.get(iso_code, ())]
+
+    def names(self, level: str, source: str) -> Mapping[str, str]:
+        """
+        Codes of source on aerial level (adm0|adm1) by their name
+        """
+        return self.data.get((level, source), {}).get('names', MappingProxyType({}))
+
+
+class DataVersionLookup(VersionedLookup):
+    """
+    Versions of all data sources. Together they identify the state of the data served, so anything derived
+    from the data can be cached under their tag
+    """
+
+    def _load(self) -> Mapping:
+        return MappingProxyType(dict(self._current_version()))
+
+    @property
+    def tag(self) -> str:
+        return ','.join(f'{source}:{version}' for source, version in self.data.items())
+
+
+class MetadataLookup(VersionedLookup):
+    """
+    The metadata of all sources with their keywords and origins. Every data source updates its metadata
+    """
+
+    def _load(self) -> Mapping:
+        connection = db.session.connection()
+        metadata = pandas.read_sql(select(
+            Metadata.title,
+            Metadata.abstract,
+            Metadata.lineage,
+            Metadata.responsibleParty,
+            Metadata.crs,
+            Metadata.format,
+            Metadata.geoBox,
+            Metadata.datatype,
+            Metadata.adaptionDate,
+            Metadata.source,
+        ), con=connection)
+        if app.config['SNAPSHOT_PATH']:
+            # arrays are stored as JSON in the snapshot
+            metadata['geoBox'] = metadata['geoBox'].map(lambda geo_box: geo_box and json.loads(geo_box))
+        return MappingProxyType({
+            'metadata': metadata,
+            'keywords': pandas.read_sql(select(Metadatakeywords.keywords, Metadatakeywords.source), con=connection),
+            'origins': pandas.read_sql(select(
+                Metadataorigin.originName,
+                Metadataorigin.originSource,
+                Metadataorigin.originAttribution,
+                Metadataorigin.originLicence,
+                Metadataorigin.originLicenceSource,
+                Metadataorigin.originVersion,
+                Metadataorigin.source,
+            ), con=connection),
+        })
+
+    @property
+    def metadata(self) -> pandas.DataFrame:
+        return self.data['metadata']
+
+    @property
+    def keywords(self) -> pandas.DataFrame:
+        return self.data['keywords']
+
+    @property
+    def origins(self) -> pandas.DataFrame:
+        return self.data['origins']
+
+
+class PopulationLookup(VersionedLookup):
+    """
+    Population values per country and year by source, as written by DataSourcePopulation
+    """
+    SOURCE = 'population'
+
+    def _load(self) -> Mapping:
+        rows: dict[str, list[dict[str, Any]]] = {}
+        for adm0_code, value, year, source in db.session.execute(
+            select(Population.adm0_code, Population.value, Population.year, Population.source)
+        ).all():
+            rows.setdefault(source, []).append({'adm0_code': adm0_code, 'value': value, 'year': year})
+        return MappingProxyType({source: tuple(values) for source, values in rows.items()})
+
+    def years_limit(self, source: str) -> list[tuple[Optional[int], Optional[int]]]:
+        """
+        Min and max of the years of source, as a list of one row
+        """
+        years = [row['year'] for row in self.data.get(source, ())]
+        return [(min(years), max(years)) if years else (None, None)]
+
+    def values(self, adm0_codes: Iterable[str], years: Iterable[int], source: str) -> list[dict[str, Any]]:
+        """
+        Values of source for the given countries and years, all of them if none are given
+        """
+        adm0_codes, years = set(adm0_codes), set(years)
+        return [
+            row for row in self.data.get(source, ())
+            if (not adm0_codes or row['adm0_code'] in adm0_codes) and (not years or row['year'] in years)
+        ]
+
+
+class RasterLookup(VersionedLookup):
+    """
+    Tables of the raster sources and of their overviews with their pixel size in degrees, as loaded by
+    raster2pgsql with raster constraints
+    """
+
+    def _load(self) -> Mapping:
+        overviews = dict(db.session.execute(text("SELECT o_table_name, r_table_name FROM raster_overviews")).all())
+        tables: dict[str, list[tuple[float, str]]] = {}
+        for table, pixel_size in db.session.execute(text(
+            "SELECT r_table_name, abs(scale_x) FROM raster_columns WHERE scale_x IS NOT NULL"
+        )).all():
+            tables.setdefault(overviews.get(table, table), []).append((pixel_size, table))
+        return MappingProxyType({raster: tuple(sorted(sizes, reverse=True)) for raster, sizes in tables.items()})
+
+    def table(self, raster: str, pixel_size: float) -> str:
+        """
+        Coarsest table of the raster whose pixels are not larger than pixel_size, the raster table itself
+        if all are
+        """
+        for table_pixel_size, table in self.data.get(raster, ()):
+            if table_pixel_size <= pixel_size:
+                return table
+        return raster
+
+
+link_table = LinkTableLookup()
+data_versions = DataVersionLookup()
+metadata_tables = MetadataLookup()
+population_table = PopulationLookup()
+rasters = RasterLookup()
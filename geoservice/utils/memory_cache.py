@@ -0,0 +1,56 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, Iterable, Mapping, Optional
+
+
+class MemoryCache:
+    """
+    Values derived from the data, held by every worker under the tag of the data versions. The least recently
+    used values are dropped beyond `max_bytes` as measured by `size`, all values once the tag changed
+    """
+
+    def __init__(self, max_bytes: int, size: Callable[[Any], int]):
+        self.max_bytes = max_bytes
+        self.size = size
+        self._values: OrderedDict[Hashable, Any] = OrderedDict()
+        self._bytes = 0
+        self._tag: Optional[str] = None
+        self._lock = Lock()
+
+    def _check_tag(self, tag: str) -> None:
+        if tag != self._tag:
+            self._values.clear()
+            self._bytes = 0
+            self._tag = tag
+
+    def get_many(self, tag: str, keys: Iterable[Hashable]) -> dict[Hashable, Any]:
+        with self._lock:
+            self._check_tag(tag)
+            found = {}
+            for key in keys:
+                value = self._values.get(key)
+                if value is not None:
+                    self._values.move_to_end(key)
+                    found[key] = value
+            return found
+
+    def get(self, tag: str, key: Hashable) -> Any:
+        return self.get_many(tag, [key]).get(key)
+
+    def put_many(self, tag: str, values: Mapping[Hashable, Any]) -> None:
+        with self._lock:
+            self._check_tag(tag)
+            for key, value in values.items():
+                if key in self._values:
+                    continue
+                self._values[key] = value
+                self._bytes += self.size(value)
+            while self._bytes > self.max_bytes and self._values:
+                _, value = self._values.popitem(last=False)
+                self._bytes -= self.size(value)
+
+    def put(self, tag: str, key: Hashable, value: Any) -> None:
+        self.put_many(tag, {key: value})
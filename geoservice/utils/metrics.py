@@ -0,0 +1,51 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from collections import defaultdict
+from threading import Lock
+from typing import Callable, Optional
+
+
+class Metrics:
+    """
+    Counters and gauges of the current worker process, rendered in the Prometheus text format.
+    Gauges are callables evaluated when the metrics are rendered
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._help: dict[str, tuple[str, str]] = {}
+        self._counters: dict[str, dict[tuple, float]] = defaultdict(dict)
+        self._gauges: dict[str, Callable[[], dict[tuple, float]]] = {}
+
+    def counter(self, name: str, description: str) -> None:
+        self._help[name] = ('counter', description)
+
+    def gauge(self, name: str, description: str, collect: Callable[[], dict[tuple, float]]) -> None:
+        """
+        collect returns the current values by their label pairs, e.g. {(('database', 'primary'),): 3}
+        """
+        self._help[name] = ('gauge', description)
+        self._gauges[name] = collect
+
+    def increase(self, name: str, value: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._counters[name][key] = self._counters[name].get(key, 0) + value
+
+    def value(self, name: str, **labels) -> Optional[float]:
+        return self._counters[name].get(tuple(sorted(labels.items())))
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, description) in sorted(self._help.items()):
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+            with self._lock:
+                values = dict(self._gauges[name]() if kind == 'gauge' else self._counters[name])
+            for labels, value in values.items():
+                label_text = ','.join(f'{label}="{label_value}"' for label, label_value in labels)
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
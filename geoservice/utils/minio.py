@@ -4,13 +4,11 @@
 import logging
 
 from attr import dataclass
-from minio import Minio
-
-import pyarrow.parquet as pq
-import s3fs
 
 from ..application import app
 
+# minio, s3fs and pyarrow are only imported for remote extraction, they take long to import
+
 
 @dataclass
 class MinioConfig(object):
@@ -33,6 +31,8 @@ class MinioHelper:
         self.logger = logging.getLogger('geoservice.minio_helper')
 
     def __enter__(self):
+        from minio import Minio
+
         client = Minio(
             self.config.server,
             self.config.access_key,
@@ -63,6 +63,9 @@ class MinioParquetHelper:
         self.config = config
 
     def __enter__(self):
+        import pyarrow.parquet as pq
+        import s3fs
+
         storage_options = {
             'anon': False,
             'client_kwargs': {
@@ -0,0 +1,192 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import fcntl
+import json
+import os
+from functools import wraps
+from hashlib import sha256
+from pathlib import Path
+from threading import Event, Lock
+from time import monotonic, sleep, time
+from typing import Any, Callable, Optional
+
+from flask import g, make_response, request
+
+from ..application import app
+from .metrics import metrics
+
+SWEEP_INTERVAL = 60
+# seconds between two attempts of a waiting worker to take the lock or read the result
+POLL_INTERVAL = 0.02
+
+# the body of a response and its status, headers and further values as JSON
+Result = tuple[bytes, dict[str, Any]]
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result: Optional[Result] = None
+        self.error: Exception | None = None
+
+
+class SingleFlight:
+    """
+    Runs a computation only once for concurrent calls with the same key. Within a worker the other threads
+    wait for the result of the first; across the workers of a host the computation is serialised by a file
+    lock. Workers waiting for the lock announce themselves by a marker file, and only then the result is
+    handed over by a file, which is kept for `ttl` seconds. Nobody waits longer than `timeout` seconds,
+    afterwards the request is computed again
+    """
+
+    def __init__(self, directory: Path, ttl: float, timeout: float):
+        self.directory = directory
+        self.ttl = ttl
+        self.timeout = timeout
+        self._calls: dict[str, _Call] = {}
+        self._lock = Lock()
+        self._swept = monotonic()
+
+    def do(self, key: str, compute: Callable[[], Result]) -> Result:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            metrics.increase('geoservice_coalesced_requests_total', scope='worker')
+            if not call.done.wait(self.timeout):
+                return compute()
+            if call.error:
+                raise call.error
+            return call.result
+        # - - - - - - - - - - - - - - - - - - - -
+        try:
+            call.result = self._do_across_workers(key, compute)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _do_across_workers(self, key: str, compute: Callable[[], Result]) -> Result:
+        digest = sha256(key.encode()).hexdigest()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        result_path = self.directory / f'{digest}.result'
+        waiting_path = self.directory / f'{digest}.waiting'
+        started = time()
+        deadline = monotonic() + self.timeout
+        with open(self.directory / f'{digest}.lock', 'w') as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    pass
+                result = self._read(result_path, started)
+                if result is not None:
+                    metrics.increase('geoservice_coalesced_requests_total', scope='host')
+                    return result
+                if monotonic() > deadline:
+                    return compute()
+                waiting_path.touch()
+                sleep(POLL_INTERVAL)
+            # - - - - - - - - - - - - - - - - - - - -
+            try:
+                # the previous holder of the lock may have finished after the last poll
+                result = self._read(result_path, started)
+                if result is not None:
+                    metrics.increase('geoservice_coalesced_requests_total', scope='host')
+                    return result
+                waiting_path.unlink(missing_ok=True)
+                result = compute()
+                if waiting_path.exists():
+                    self._write(result_path, result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._sweep()
+
+    @staticmethod
+    def _write(path: Path, result: Result) -> None:
+        """
+        Hand result over in a file: a line of JSON with the time it was computed and the values, then the body
+        """
+        body, values = result
+        temporary_path = path.with_suffix(f'.{os.getpid()}')
+        with open(temporary_path, 'wb') as file:
+            file.write(json.dumps({'finished': time(), 'values': values}).encode() + b'\n')
+            file.write(body)
+        temporary_path.replace(path)
+
+    @staticmethod
+    def _read(path: Path, started: float) -> Optional[Result]:
+        """
+        The result handed over in path if it was computed after started
+        """
+        try:
+            with open(path, 'rb') as file:
+                header = json.loads(file.readline())
+                if header['finished'] < started:
+                    return None
+                return file.read(), header['values']
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _sweep(self) -> None:
+        """
+        Remove the results, markers and locks nobody waits for anymore
+        """
+        if monotonic() - self._swept < SWEEP_INTERVAL:
+            return
+        self._swept = monotonic()
+        for path in self.directory.iterdir():
+            try:
+                age = time() - path.stat().st_mtime
+                if ((path.suffix == '.result' and age > self.ttl)
+                        or (path.suffix in ('.lock', '.waiting') and age > SWEEP_INTERVAL)):
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+single_flight_calls = SingleFlight(
+    Path(app.config['SINGLE_FLIGHT_DIRECTORY']),
+    ttl=app.config['SINGLE_FLIGHT_TTL'],
+    timeout=app.config['SINGLE_FLIGHT_TIMEOUT'],
+)
+
+
+def single_flight(view):
+    """
+    Decorator coalescing concurrent requests of an endpoint with the same parsed arguments
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = json.dumps([request.endpoint, args, kwargs], sort_keys=True, default=str)
+
+        def compute():
+            response = make_response(view(*args, **kwargs))
+            response.direct_passthrough = False
+            return response.get_data(), {
+                'status': response.status_code,
+                'headers': list(response.headers.items()),
+                'geometry_level': g.get('geometry_level'),
+                'degraded': g.get('degraded', False),
+            }
+
+        data, values = single_flight_calls.do(key, compute)
+        if values['geometry_level'] is not None:
+            g.geometry_level = values['geometry_level']
+        # a degraded response of the leader must not be stored by the followers either
+        g.degraded = values['degraded']
+        return app.response_class(data, status=values['status'], headers=values['headers'])
+    return wrapper
+
+
+metrics.counter('geoservice_coalesced_requests_total',
+                'Requests answered with the result of an identical concurrent request')
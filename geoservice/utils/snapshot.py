@@ -0,0 +1,219 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Iterable, Optional
+
+import geopandas
+import numpy
+import pandas
+import shapely
+from geoalchemy2 import Geometry
+from sqlalchemy import bindparam, select, text
+
+from ..application import app
+from ..model import db, read_session
+from ..model.geoobject import (Adm0, Adm1, Consulates, DataVersion, LinkTable, Metadata, Metadatakeywords,
+                               Metadataorigin, PopulatedPlaces, Population, VG250, VG250Attributes)
+from .lookup import data_versions
+
+# increased whenever the layout of the snapshot file changes
+FORMAT_VERSION = 1
+# endpoints served in snapshot mode, the others need PostGIS
+ENDPOINTS = {'api.api_geo', 'api.api_geo_vg250', 'api.api_geo_population', 'api.api_geo_metadata'}
+# tables copied as they are, the lookups read them through their models
+PLAIN_MODELS = [DataVersion, LinkTable, Population, Metadata, Metadatakeywords, Metadataorigin, VG250Attributes]
+# tables whose geometries are stored as WKB with an R*Tree of their bounding boxes
+GEOMETRY_MODELS = [Adm0, Adm1, VG250, Consulates, PopulatedPlaces]
+# properties of the vg250 features, in the order of the PostGIS query
+VG250_PROPERTIES = ['code', 'name', 'geometry_level', 'agg_level', 'source']
+# rows copied at a time
+BATCH_SIZE = 5000
+
+Bounds = tuple[float, float, float, float]
+
+
+def _value(value: Any) -> Any:
+    """
+    Value of a database column as stored by SQLite; arrays are stored as JSON
+    """
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (list, tuple)):
+        return json.dumps([_value(item) for item in value])
+    return value
+
+
+def features(geometries: numpy.ndarray, properties: pandas.DataFrame) -> list[str]:
+    """
+    GeoJSON features of the geometries with the columns of properties as their properties
+    """
+    return [
+        f'{{"type": "Feature", "geometry": {geometry or "null"}, "properties": {json.dumps(row)}}}'
+        for geometry, row in zip(shapely.to_geojson(geometries), properties.to_dict('records'))
+    ]
+
+
+def _create_table(connection: sqlite3.Connection, name: str, columns: list[str]) -> None:
+    definitions = ['id INTEGER PRIMARY KEY' if column == 'id' else f'"{column}"' for column in columns]
+    connection.execute(f'CREATE TABLE {name} ({", ".join(definitions)})')
+
+
+def _copy_plain(connection: sqlite3.Connection, model) -> None:
+    columns = list(model.__table__.columns)
+    _create_table(connection, model.__tablename__, [column.name for column in columns])
+    insert = f'INSERT INTO {model.__tablename__} VALUES ({", ".join("?" * len(columns))})'
+    for rows in db.session.execute(select(*columns).execution_options(yield_per=BATCH_SIZE)).partitions():
+        connection.executemany(insert, [[_value(value) for value in row] for row in rows])
+
+
+def _copy_geometries(connection: sqlite3.Connection, model) -> None:
+    table = model.__tablename__
+    columns = [column for column in model.__table__.columns if not isinstance(column.type, Geometry)]
+    names = [column.name for column in columns]
+    stored = [*names, 'geometry', *(['feature'] if model is VG250 else [])]
+    _create_table(connection, table, stored)
+    connection.execute(f'CREATE VIRTUAL TABLE {table}_rtree USING rtree(id, minx, maxx, miny, maxy)')
+    if 'geometry_level' in names:
+        connection.execute(f'CREATE INDEX {table}_geometry_level ON {table} (geometry_level, source)')
+    insert = f'INSERT INTO {table} VALUES ({", ".join("?" * len(stored))})'
+    # - - - - - - - - - - - - - - - - - - - -
+    for rows in db.session.execute(
+        select(*columns, db.func.ST_AsBinary(model.geometry)).execution_options(yield_per=BATCH_SIZE)
+    ).partitions():
+        frame = pandas.DataFrame([row[:-1] for row in rows], columns=names)
+        wkb = [None if row[-1] is None else bytes(row[-1]) for row in rows]
+        geometries = shapely.from_wkb(wkb)
+        values = [[_value(value) for value in row[:-1]] + [geometry] for row, geometry in zip(rows, wkb)]
+        if model is VG250:
+            # unclipped features are served as they are stored
+            values = [row + [feature]
+                      for row, feature in zip(values, features(geometries, frame[VG250_PROPERTIES]))]
+        connection.executemany(insert, values)
+        connection.executemany(f'INSERT INTO {table}_rtree VALUES (?, ?, ?, ?, ?)', [
+            (row_id, min_x, max_x, min_y, max_y)
+            for row_id, (min_x, min_y, max_x, max_y) in zip(frame['id'].tolist(), shapely.bounds(geometries).tolist())
+            if not numpy.isnan(min_x)
+        ])
+
+
+def export(path: str) -> None:
+    """
+    Write the served tables of the database into the SQLite file path, with every geometry level, the GeoJSON
+    of the vg250 features and R*Tree indexes. The file is written next to path and renamed when complete,
+    so a running service never sees a partial snapshot
+    """
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    connection = sqlite3.connect(temporary_path)
+    try:
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.execute('CREATE TABLE snapshot (key TEXT PRIMARY KEY, value TEXT)')
+        connection.executemany('INSERT INTO snapshot VALUES (?, ?)', [
+            ('format', str(FORMAT_VERSION)),
+            ('created', datetime.now(timezone.utc).isoformat()),
+            ('data_versions', data_versions.tag),
+        ])
+        for model in PLAIN_MODELS:
+            _copy_plain(connection, model)
+        for model in GEOMETRY_MODELS:
+            _copy_geometries(connection, model)
+        connection.commit()
+        connection.execute('ANALYZE')
+        connection.close()
+        os.replace(temporary_path, path)
+    except BaseException:
+        connection.close()
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+def check(path: str) -> None:
+    """
+    Fail unless path is a snapshot of the format this version serves
+    """
+    try:
+        connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    except sqlite3.OperationalError as e:
+        raise RuntimeError(f"{path} is not a geoservice snapshot: {e}") from e
+    try:
+        version = connection.execute("SELECT value FROM snapshot WHERE key = 'format'").fetchone()
+    except sqlite3.DatabaseError as e:
+        raise RuntimeError(f"{path} is not a geoservice snapshot: {e}") from e
+    finally:
+        connection.close()
+    if version is None or int(version[0]) != FORMAT_VERSION:
+        raise RuntimeError(f"{path} is a snapshot of format {version and version[0]}, expected {FORMAT_VERSION}")
+
+
+def read(table: str, columns: Iterable[str], conditions: Iterable[str] = (), params: Optional[dict] = None,
+         bounds: Optional[Bounds] = None) -> geopandas.GeoDataFrame:
+    """
+    Columns and geometries of the rows of table matching the SQL conditions with their named params. With
+    bounds (west, south, east, north), only rows whose bounding box intersects them are read, found by the
+    R*Tree of the table
+    """
+    conditions, params = list(conditions), dict(params or {})
+    if bounds is not None:
+        conditions.append(f'id IN (SELECT id FROM {table}_rtree '
+                          f'WHERE minx <= :east AND maxx >= :west AND miny <= :north AND maxy >= :south)')
+        params.update(zip(['west', 'south', 'east', 'north'], bounds))
+    statement = text(
+        f'SELECT {", ".join([*columns, "geometry"])} FROM {table}'
+        + (f' WHERE {" AND ".join(conditions)}' if conditions else '')
+    ).bindparams(*[
+        bindparam(name, value=value, expanding=isinstance(value, (list, tuple)))
+        for name, value in params.items()
+    ])
+    frame = pandas.read_sql(statement, con=read_session.connection())
+    return geopandas.GeoDataFrame(
+        frame.drop(columns='geometry'), geometry=shapely.from_wkb(frame['geometry'].to_numpy()), crs=4326
+    )
+
+
+def shape(frame: geopandas.GeoDataFrame, bounds: Optional[Bounds] = None, clip: bool = True, exact: bool = True,
+          min_area: Optional[float] = None) -> tuple[geopandas.GeoDataFrame, numpy.ndarray]:
+    """
+    The geometries of frame as the PostGIS queries of the schemas return them: polygon parts smaller than
+    min_area are dropped using the part areas of the ETL, rows not intersecting bounds are removed and the
+    others are clipped to them if clip is set, by clip_by_rect without exact. Returns the frame and whether
+    each geometry is unchanged
+    """
+    geometries = numpy.asarray(frame.geometry).copy()
+    unchanged = numpy.ones(len(frame), dtype=bool)
+    if min_area is not None:
+        for i, part_areas in enumerate(frame['part_areas']):
+            # JSON in the snapshot, a list when read from PostGIS
+            part_areas = json.loads(part_areas) if isinstance(part_areas, str) else part_areas or []
+            if all(min_area <= part_area for part_area in part_areas):
+                continue
+            kept = [part for part, part_area in zip(shapely.get_parts(geometries[i]), part_areas)
+                    if part_area >= min_area]
+            geometries[i] = shapely.multipolygons(kept) if kept else None
+            unchanged[i] = False
+    # - - - - - - - - - - - - - - - - - - - -
+    if bounds is not None:
+        rectangle = shapely.box(*bounds)
+        intersecting = shapely.intersects(geometries, rectangle)
+        frame, geometries, unchanged = frame[intersecting], geometries[intersecting], unchanged[intersecting]
+        if clip:
+            min_x, min_y, max_x, max_y = shapely.bounds(geometries).T
+            # like the @ operator of PostGIS: geometries whose bounding box lies within bounds stay unchanged
+            covered = (min_x >= bounds[0]) & (min_y >= bounds[1]) & (max_x <= bounds[2]) & (max_y <= bounds[3])
+            geometries[~covered] = (shapely.intersection(geometries[~covered], rectangle) if exact
+                                    else shapely.clip_by_rect(geometries[~covered], *bounds))
+            unchanged &= covered
+    return geopandas.GeoDataFrame(
+        frame.drop(columns='geometry').reset_index(drop=True), geometry=geometries, crs=frame.crs
+    ), unchanged
+
+
+if app.config['SNAPSHOT_PATH']:
+    check(app.config['SNAPSHOT_PATH'])
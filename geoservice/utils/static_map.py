@@ -0,0 +1,130 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from io import BytesIO
+from math import atan, degrees, exp, log, pi, radians, tan
+from typing import Any, Iterable
+
+import numpy
+import shapely
+from PIL import Image, ImageDraw
+
+from ..application import app
+from .memory_cache import MemoryCache
+from .svg import PALETTE
+
+# metres of Web Mercator from the centre to the edge of the world, and the latitude its square ends at
+MERCATOR_EXTENT = 20037508.342789244
+MERCATOR_MAX_LATITUDE = 85.0511287798
+# boundaries are drawn at this multiple of the size and scaled down, so they are antialiased
+SUPERSAMPLING = 2
+BACKGROUND = (255, 255, 255, 255)
+# people per cell at the end of the LandScan colour ramp, which is logarithmic
+LANDSCAN_MAX = 100000
+# line colour and width in pixels of the boundary layers
+BOUNDARY_STYLES = {
+    'adm0': ((51, 51, 51, 255), 1.5),
+    'adm1': ((102, 102, 102, 255), 1.0),
+    'vg250': ((102, 102, 102, 255), 1.0),
+}
+# PIL format and encoder options per image format
+FORMATS = {
+    'png': ('PNG', {'compress_level': 3}),
+    'webp': ('WEBP', {'quality': 90, 'method': 2}),
+}
+
+# min x, min y, max x, max y in Web Mercator
+Extent = tuple[float, float, float, float]
+
+
+def _mercator(lng: float, lat: float) -> tuple[float, float]:
+    lat = min(max(lat, -MERCATOR_MAX_LATITUDE), MERCATOR_MAX_LATITUDE)
+    return (MERCATOR_EXTENT * lng / 180,
+            MERCATOR_EXTENT * log(tan(pi / 4 + radians(lat) / 2)) / pi)
+
+
+def _wgs84(x: float, y: float) -> tuple[float, float]:
+    return 180 * x / MERCATOR_EXTENT, degrees(2 * atan(exp(pi * y / MERCATOR_EXTENT)) - pi / 2)
+
+
+def extent(west: float, south: float, east: float, north: float, width: int, height: int) -> Extent:
+    """
+    Web Mercator extent of a bounding box, widened around its centre to the aspect ratio of the image
+    """
+    min_x, min_y = _mercator(west, south)
+    max_x, max_y = _mercator(east, north)
+    pixel_size = max((max_x - min_x) / width, (max_y - min_y) / height)
+    centre_x, centre_y = (min_x + max_x) / 2, (min_y + max_y) / 2
+    return (centre_x - pixel_size * width / 2, centre_y - pixel_size * height / 2,
+            centre_x + pixel_size * width / 2, centre_y + pixel_size * height / 2)
+
+
+def bounds(map_extent: Extent) -> tuple[float, float, float, float]:
+    """
+    WGS84 bounding box of a Web Mercator extent
+    """
+    return (*_wgs84(map_extent[0], map_extent[1]), *_wgs84(map_extent[2], map_extent[3]))
+
+
+def raster_layer(values: numpy.ndarray, raster: str) -> numpy.ndarray:
+    """
+    RGBA pixels of raster values, cells without value are transparent
+    """
+    valid = ~numpy.isnan(values)
+    values = numpy.nan_to_num(values)
+    if raster == 'landscan':
+        ramp = numpy.array([[int(colour[i:i + 2], 16) for i in (1, 3, 5)] for colour in PALETTE], dtype=float)
+        position = numpy.clip(numpy.log1p(numpy.maximum(values, 0)) / log(1 + LANDSCAN_MAX), 0, 1) * (len(ramp) - 1)
+        rgb = numpy.stack([numpy.interp(position, range(len(ramp)), ramp[:, channel]) for channel in range(3)], axis=-1)
+    else:
+        rgb = numpy.repeat(numpy.clip(values, 0, 255)[..., None], 3, axis=-1)
+    return numpy.dstack([rgb, valid * 255]).astype(numpy.uint8)
+
+
+def place(values: numpy.ndarray, upper_left: tuple[float, float], map_extent: Extent,
+          width: int, height: int) -> numpy.ndarray:
+    """
+    Values of a raster aligned to the pixel grid of the image, at their position within an image of NaN
+    """
+    pixel_size = (map_extent[2] - map_extent[0]) / width
+    column = round((upper_left[0] - map_extent[0]) / pixel_size)
+    row = round((map_extent[3] - upper_left[1]) / pixel_size)
+    image = numpy.full((height, width), numpy.nan)
+    top, left = max(row, 0), max(column, 0)
+    bottom, right = min(row + values.shape[0], height), min(column + values.shape[1], width)
+    if top < bottom and left < right:
+        image[top:bottom, left:right] = values[top - row:bottom - row, left - column:right - column]
+    return image
+
+
+def boundary_layer(geometries: Iterable[Any], layer: str, map_extent: Extent, width: int, height: int) -> numpy.ndarray:
+    """
+    RGBA pixels of the outlines of Web Mercator polygons
+    """
+    colour, line_width = BOUNDARY_STYLES[layer]
+    image = Image.new('RGBA', (width * SUPERSAMPLING, height * SUPERSAMPLING), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    scale = SUPERSAMPLING * width / (map_extent[2] - map_extent[0])
+    parts = shapely.get_parts(numpy.asarray(list(geometries), dtype=object))
+    for ring in shapely.get_rings(parts[shapely.get_type_id(parts) == shapely.GeometryType.POLYGON]):
+        coordinates = (shapely.get_coordinates(ring) - [map_extent[0], map_extent[3]]) * [scale, -scale]
+        draw.line(coordinates.ravel().tolist(), fill=colour, width=round(line_width * SUPERSAMPLING), joint='curve')
+    return numpy.asarray(image.resize((width, height), Image.Resampling.BOX))
+
+
+def composite(layers: Iterable[numpy.ndarray], width: int, height: int) -> Image.Image:
+    image = Image.new('RGBA', (width, height), BACKGROUND)
+    for layer in layers:
+        image.alpha_composite(Image.fromarray(layer, 'RGBA'))
+    return image.convert('RGB')
+
+
+def encode(image: Image.Image, image_format: str) -> bytes:
+    pil_format, options = FORMATS[image_format]
+    buffer = BytesIO()
+    image.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+# RGBA pixels of the raster and boundary layers per extent and size
+layer_cache = MemoryCache(app.config['STATIC_MAP_CACHE_SIZE'], size=lambda layer: layer.nbytes)
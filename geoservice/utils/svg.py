@@ -0,0 +1,127 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from typing import Any, Iterable, Mapping
+
+import numpy
+import pandas
+import shapely
+from pyproj import Transformer
+
+from ..application import app
+from .degradation import COARSEST_LEVEL
+from .memory_cache import MemoryCache
+from .zoom import TILE_SIZE
+
+# fills of the weight classes, from the lowest to the highest weight
+PALETTE = ["#E0E0E0", "#CCE4F0", "#99C9E2", "#66ADD3", "#3392C5", "#0077B6"]
+# metres of the equator in EPSG:4087
+EQUATOR = 40075016.686
+# radius of the points in units of the path data
+POINT_RADIUS = 2
+
+_to_equidistant = Transformer.from_crs('EPSG:4326', 'EPSG:4087', always_xy=True)
+
+# source, aerial level, geometry level, code
+PathKey = tuple[str, str, int, str]
+# path data and bounds (min x, min y, max x, max y)
+Path = tuple[str, tuple[float, float, float, float]]
+
+
+def unit(geometry_level: int) -> float:
+    """
+    Metres of EPSG:4087 per unit of the path data, a pixel at the finest zoom level the geometry level is served for
+    """
+    zoom = (COARSEST_LEVEL - geometry_level) * 1.1 + 2
+    return EQUATOR / (TILE_SIZE * 2 ** zoom)
+
+
+def scale(geometries: Any, geometry_level: int) -> Any:
+    """
+    Scale EPSG:4087 geometries to units of the path data, with the y axis pointing down like in SVG
+    """
+    return shapely.transform(geometries, lambda coordinates: coordinates * [1, -1] / unit(geometry_level))
+
+
+def project(geometries: Any, geometry_level: int) -> Any:
+    """
+    Project WGS84 geometries to EPSG:4087 in units of the path data. The areas are stored projected by the ETL,
+    this is left to the few points and the bounding box
+    """
+    return scale(shapely.transform(geometries, lambda coordinates: numpy.column_stack(
+        _to_equidistant.transform(coordinates[:, 0], coordinates[:, 1])
+    )), geometry_level)
+
+
+def _numbers(values: numpy.ndarray) -> str:
+    # a minus sign separates two numbers just like a space
+    return ' '.join(map(str, values.tolist())).replace(' -', '-')
+
+
+def path_data(geometry: Any) -> str:
+    """
+    Path data of the polygons of a projected geometry with relative integer coordinates. Rings collapsing to
+    less than three points at this precision are left out
+    """
+    parts = shapely.get_parts(geometry)
+    rings = shapely.get_rings(parts[shapely.get_type_id(parts) == shapely.GeometryType.POLYGON])
+    data = []
+    for ring in rings:
+        points = numpy.rint(shapely.get_coordinates(ring)[:-1]).astype(numpy.int64)
+        steps = numpy.diff(points, axis=0)
+        steps = steps[steps.any(axis=1)]
+        if len(steps) >= 2:
+            data.append(f'M{_numbers(points[0])}l{_numbers(steps.ravel())}z')
+    return ''.join(data)
+
+
+def paths(geometries: Any) -> list[Path]:
+    """
+    Path data and bounds of projected geometries
+    """
+    return [
+        (path_data(geometry), tuple(bounds))
+        for geometry, bounds in zip(geometries, shapely.bounds(geometries).tolist())
+    ]
+
+
+def classes(codes: pandas.Series, weights: Iterable[Mapping[str, Any]]) -> numpy.ndarray:
+    """
+    Palette class of each country code, the weights are classified linearly between their minimum and maximum.
+    Countries without a weight have the weight 0
+    """
+    weight = codes.map({weight['code']: weight['value'] for weight in weights}).fillna(0.0).to_numpy(float)
+    if len(weight) == 0 or weight.min() == weight.max():
+        return numpy.zeros(len(weight), dtype=int)
+    normalized = (weight - weight.min()) / (weight.max() - weight.min())
+    return numpy.minimum((normalized * len(PALETTE)).astype(int), len(PALETTE) - 1)
+
+
+def document(area_paths: list[str], area_classes: numpy.ndarray, points: numpy.ndarray,
+             point_classes: numpy.ndarray, view_box: tuple[float, float, float, float]) -> str:
+    """
+    SVG document of the area paths and the points (x, y) filled by their classes. The paths of a class are
+    joined into a single path element
+    """
+    min_x, min_y, max_x, max_y = (numpy.floor(view_box[0]), numpy.floor(view_box[1]),
+                                  numpy.ceil(view_box[2]), numpy.ceil(view_box[3]))
+    style = ''.join(f'.c{i}{{fill:{colour}}}' for i, colour in enumerate(PALETTE))
+    parts = [
+        '<svg xmlns="http://www.w3.org/2000/svg" '
+        f'viewBox="{min_x:.0f} {min_y:.0f} {max_x - min_x:.0f} {max_y - min_y:.0f}">'
+        f'<style>{style}path{{fill-rule:evenodd}}</style>'
+    ]
+    for i in range(len(PALETTE)):
+        data = ''.join(path for path, area_class in zip(area_paths, area_classes) if area_class == i)
+        if data:
+            parts.append(f'<path class="c{i}" d="{data}"/>')
+    parts.extend(
+        f'<circle class="c{point_class}" cx="{x:.0f}" cy="{y:.0f}" r="{POINT_RADIUS}"/>'
+        for (x, y), point_class in zip(points.tolist(), point_classes.tolist())
+    )
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+# path data of the areas, keyed by PathKey
+path_cache = MemoryCache(app.config['SVG_PATH_CACHE_SIZE'], size=lambda path: len(path[0]))
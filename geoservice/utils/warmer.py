@@ -0,0 +1,203 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import fcntl
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from threading import Lock, Thread
+from time import monotonic, sleep, time
+from typing import Iterable, Mapping, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from flask import request
+
+from ..application import app
+from .compression import negotiate
+from .degradation import pool_saturation
+from .lookup import data_versions
+from .metrics import metrics
+
+# seconds between the flushes of the counts of a worker
+FLUSH_INTERVAL = 60
+# seconds after which a count has lost half its weight
+HALF_LIFE = 86400
+# entries kept per entry replayed, so queries can climb into the top
+KEEP_FACTOR = 4
+# marks the requests of the warmer, they are not recorded
+WARMER_HEADER = 'X-Geoservice-Warmer'
+# request line and status of the gunicorn access log
+ACCESS_LOG_LINE = re.compile(r'"GET (?P<target>/api/\S+) HTTP/[\d.]+" (?P<status>\d{3}) ')
+
+Query = tuple[str, str]
+
+
+def normalize(path: str, args: Iterable[tuple[str, str]]) -> str:
+    """
+    Target of a query with its arguments sorted, so equal queries are counted together
+    """
+    query = urlencode(sorted(args))
+    return f'{path}?{query}' if query else path
+
+
+class HotQueries:
+    """
+    Counts of the API queries served per target and encoding, shared by the workers of a host through a file.
+    Workers add their counts every FLUSH_INTERVAL seconds; stored counts decay with a half life of HALF_LIFE
+    """
+
+    def __init__(self, directory: Path, size: int):
+        self.directory = directory
+        self.size = size
+        self._counts: Counter = Counter()
+        self._lock = Lock()
+        self._flushed = monotonic()
+
+    @property
+    def path(self) -> Path:
+        return self.directory / 'hot_queries.json'
+
+    def record(self, query: Query) -> None:
+        with self._lock:
+            self._counts[query] += 1
+            flush = monotonic() - self._flushed > FLUSH_INTERVAL
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._flushed = monotonic()
+        if counts:
+            self.add(counts)
+
+    def add(self, counts: Mapping[Query, float]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / 'hot_queries.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                updated, stored = self._read()
+                decay = 0.5 ** (max(time() - updated, 0) / HALF_LIFE)
+                merged = Counter({query: count * decay for query, count in stored.items()})
+                merged.update(counts)
+                temporary_path = self.path.with_suffix(f'.{os.getpid()}')
+                with open(temporary_path, 'w') as file:
+                    json.dump({
+                        'updated': time(),
+                        'queries': [[target, encoding, count] for (target, encoding), count in
+                                    merged.most_common(self.size * KEEP_FACTOR)],
+                    }, file)
+                temporary_path.replace(self.path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> tuple[float, dict[Query, float]]:
+        try:
+            with open(self.path) as file:
+                stored = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return time(), {}
+        return stored['updated'], {(target, encoding): count for target, encoding, count in stored['queries']}
+
+    def top(self) -> list[Query]:
+        _, stored = self._read()
+        return [query for query, _ in Counter(stored).most_common(self.size)]
+
+    def record_access_log(self, lines: Iterable[str], encoding: str = 'gzip') -> int:
+        """
+        Add the successful API queries of a gunicorn access log, which holds no encoding
+        """
+        counts: Counter = Counter()
+        for line in lines:
+            match = ACCESS_LOG_LINE.search(line)
+            if match and match['status'] == '200':
+                path, _, query = match['target'].partition('?')
+                counts[(normalize(path, parse_qsl(query, keep_blank_values=True)), encoding)] += 1
+        if counts:
+            self.add(counts)
+        return sum(counts.values())
+
+
+class Warmer:
+    """
+    Replays the hot queries of the host on startup and whenever the data changed, e.g. after an ETL update.
+    One worker per host warms, the others wait for its lock. Queries are replayed one by one, at most `rate`
+    per second and only while the connection pool is less than half saturated
+    """
+
+    def __init__(self, hot_queries: HotQueries, rate: float, interval: float):
+        self.hot_queries = hot_queries
+        self.rate = rate
+        self.interval = interval
+        self._thread: Optional[Thread] = None
+        self._lock = Lock()
+
+    def replay(self) -> int:
+        client = app.test_client()
+        replayed = 0
+        for target, encoding in self.hot_queries.top():
+            started = monotonic()
+            with app.app_context():
+                while pool_saturation() >= app.config['ADAPTIVE_SATURATION'] / 2:
+                    sleep(1 / self.rate)
+            try:
+                response = client.get(target, headers={'Accept-Encoding': encoding, WARMER_HEADER: '1'})
+                response.close()
+                status = str(response.status_code)
+            except Exception:
+                # exceptions are propagated by the application, the other queries are still replayed
+                app.logger.exception(f"Warming {target} failed")
+                status = 'error'
+            metrics.increase('geoservice_warmed_requests_total', status=status)
+            replayed += 1
+            sleep(max(1 / self.rate - (monotonic() - started), 0))
+        return replayed
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name='warmer', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        self.hot_queries.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.hot_queries.directory / 'warmer.lock', 'w') as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    sleep(self.interval)
+            # this worker warms the host until it exits
+            warmed_tag = None
+            while True:
+                try:
+                    with app.app_context():
+                        tag = data_versions.tag
+                    if tag != warmed_tag:
+                        app.logger.info(f"Warmed {self.replay()} hot queries for data versions {tag}")
+                        warmed_tag = tag
+                except Exception:
+                    app.logger.exception("Warming failed")
+                sleep(self.interval)
+
+
+hot_queries = HotQueries(Path(app.config['WARMER_DIRECTORY']), size=app.config['WARMER_SIZE'])
+warmer = Warmer(hot_queries, rate=app.config['WARMER_RATE'], interval=app.config['WARMER_INTERVAL'])
+
+
+def record_hot_query(response):
+    if request.method == 'GET' and response.status_code == 200 and WARMER_HEADER not in request.headers:
+        encoding = negotiate(request.headers.get('Accept-Encoding', '')) or ''
+        hot_queries.record((normalize(request.path, request.args.items(multi=True)), encoding))
+    return response
+
+
+def start_warmer():
+    if app.config['WARMER_ENABLED']:
+        warmer.start()
+
+
+metrics.counter('geoservice_warmed_requests_total', 'Hot queries replayed to warm the caches')
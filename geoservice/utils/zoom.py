@@ -0,0 +1,20 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+TILE_SIZE = 256
+
+
+def geometry_level_for_zoom(zoom_level: int) -> int:
+    """
+    Simplification level (0 = original .. 10 = coarsest) of the geometries shown at a web map zoom level
+    """
+    return int(min(max(10 - int(zoom_level - 1) // 1.1, 0), 10))
+
+
+def minimum_area_for_zoom(zoom_level: int, pixels: float = 1.0) -> float:
+    """
+    Area in square degrees covered by the given number of pixels at a web map zoom level at the equator.
+    Polygons and polygon parts below it are not visible at that zoom level
+    """
+    degrees_per_pixel = 360 / (TILE_SIZE * 2 ** zoom_level)
+    return pixels * degrees_per_pixel ** 2
@@ -0,0 +1,19 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+"""
+gunicorn configuration of the workers (run.sh webserver), extended by geoservice.preload:
+
+    gunicorn --config python:geoservice.workers geoservice:app
+
+Every worker opens its database connections and starts the cache warmer as soon as it has loaded the
+application, so the hot queries are replayed right after a deploy instead of on the first request; one worker
+per host holds the lock of the warmer
+"""
+
+
+def post_worker_init(worker):
+    from geoservice.model.pool import connect_pools
+    connect_pools()
+    from geoservice.utils.warmer import start_warmer
+    start_warmer()
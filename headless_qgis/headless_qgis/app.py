@@ -2,36 +2,97 @@
 # For the license, see the accompanying file LICENSE.md.
 
 # remember: chmod  ugo+x qgis_process_xyz.sh
+import json
+import os
+import shutil
 from pathlib import Path
 import subprocess
-from flask import Flask, request, make_response
-from tempfile import TemporaryDirectory
+from flask import Flask, abort, request, make_response, send_file
+from tempfile import TemporaryDirectory, gettempdir, mkdtemp
 
+from .buffer import buffer_geopackage
+from .cache import FileCache, print_key
+from .pool import PrintPool
+from .sources import SourceDownloadError, SourceError, SourceFetcher
 
 
 app = Flask(__name__)
 
+# worker processes keeping QGIS initialised for /print, 0 starts a new interpreter per print instead
+print_pool = PrintPool(
+    size=int(os.environ.get('HEADLESS_QGIS_POOL_SIZE', '2')),
+    max_jobs=int(os.environ.get('HEADLESS_QGIS_POOL_MAX_JOBS', '50')),
+    timeout=float(os.environ.get('HEADLESS_QGIS_PRINT_TIMEOUT', '120')),
+)
+
+# prints of the same script and data are served from disk, a size of 0 disables the cache
+render_cache = FileCache(
+    Path(os.environ.get('HEADLESS_QGIS_CACHE_DIRECTORY', os.path.join(gettempdir(), 'headless_qgis', 'prints'))),
+    max_bytes=int(os.environ.get('HEADLESS_QGIS_CACHE_SIZE', '1073741824')),
+    suffix='.png',
+)
+
+# geoservice queries referenced by print jobs are downloaded by the service itself and kept for max_age seconds
+source_fetcher = SourceFetcher(
+    os.environ.get('HEADLESS_QGIS_GEOSERVICE_URL', ''),
+    FileCache(
+        Path(os.environ.get('HEADLESS_QGIS_SOURCE_CACHE_DIRECTORY',
+                            os.path.join(gettempdir(), 'headless_qgis', 'sources'))),
+        max_bytes=int(os.environ.get('HEADLESS_QGIS_SOURCE_CACHE_SIZE', '1073741824')),
+    ),
+    max_age=float(os.environ.get('HEADLESS_QGIS_SOURCE_MAX_AGE', '600')),
+    threads=int(os.environ.get('HEADLESS_QGIS_SOURCE_THREADS', '8')),
+    timeout=float(os.environ.get('HEADLESS_QGIS_SOURCE_TIMEOUT', '60')),
+)
+
 
 @app.route('/')
 def hello_world():
     return  '<p>Hello, 🌐-less qgis!</p>'
 
 
+# bytes copied at a time from a raw upload
+CHUNK_SIZE = 1 << 20
+
+
+def _save_upload(path):
+    """
+    Save the uploaded GeoPackage, either the form field 'file', which werkzeug spools to disk, or the raw
+    request body, which is streamed to the file
+    """
+    if request.mimetype == 'multipart/form-data':
+        request.files['file'].save(path)
+    else:
+        with open(path, 'wb') as file:
+            shutil.copyfileobj(request.stream, file, CHUNK_SIZE)
+
+
 @app.route('/buffer', methods=['POST'])
 def buffer():
     distance = request.args.get('distance', default=10.0, type=float)
-
-    with TemporaryDirectory() as tmpdir:
-        in_filename = Path(tmpdir) / 'in.gpkg'
-        request.files['file'].save(in_filename)
-        proc = subprocess.run(
-            ['qgis_process_buffer.sh', in_filename, f'{distance}'],
-            check=True,
-            stdout=subprocess.PIPE,
-        )
-
-    response = make_response(proc.stdout, 200)
-    response.headers.set('Content-Disposition', 'attachment; filename="result.gpkg"')
+    engine = request.args.get('engine', default='native')
+    if engine not in ('native', 'qgis'):
+        abort(400, "engine must be 'native' or 'qgis'")
+
+    # every request works in a directory of its own, which is removed once the response is sent
+    tmpdir = Path(mkdtemp())
+    try:
+        in_filename = tmpdir / 'in.gpkg'
+        out_filename = tmpdir / 'result.gpkg'
+        _save_upload(in_filename)
+        if engine == 'qgis':
+            subprocess.run(
+                ['qgis_process_buffer.sh', in_filename, f'{distance}', out_filename],
+                check=True,
+            )
+        else:
+            buffer_geopackage(in_filename, out_filename, distance)
+        response = send_file(out_filename, mimetype='application/geopackage+sqlite3',
+                             as_attachment=True, download_name='result.gpkg')
+    except BaseException:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+    response.call_on_close(lambda: shutil.rmtree(tmpdir, ignore_errors=True))
     return response
 
 
@@ -44,16 +105,41 @@ def print_qgis_layout():
 
         request.files['script'].save(script_filename)
 
+        data_filenames = []
         for file in request.files.getlist('data'):
             file.save(data_path / file.filename)
             file.close()
-
-        subprocess.run(
-            ['qgis_print_layout.sh', data_path, data_path / 'out'],
-            check=True,
-        )
-
-        with (data_path / 'out').open('rb') as f:
-            r = make_response(f.read(), 200)
-            r.headers.set('Content-Disposition', 'attachment; filename="layout.png"')
-            return r
\ No newline at end of file
+            data_filenames.append(data_path / file.filename)
+
+        if 'sources' in request.form:
+            try:
+                sources = json.loads(request.form['sources'])
+                if not isinstance(sources, dict):
+                    raise SourceError('sources must be an object of file names and geoservice paths')
+                data_filenames += source_fetcher.fetch(sources, data_path)
+            except (json.JSONDecodeError, SourceError) as e:
+                abort(400, str(e))
+            except SourceDownloadError as e:
+                abort(502, str(e))
+
+        out_filename = data_path / 'out'
+        key = print_key(script_filename, data_filenames) if render_cache.max_bytes > 0 else None
+        cached = render_cache.open(key) if key else None
+        if cached is not None:
+            with cached:
+                content = cached.read()
+        else:
+            if print_pool.size > 0:
+                print_pool.print_layout(script_filename, data_path, out_filename)
+            else:
+                subprocess.run(
+                    ['qgis_print_layout.sh', data_path, out_filename],
+                    check=True,
+                )
+            if key:
+                render_cache.put(key, out_filename)
+            content = out_filename.read_bytes()
+
+        r = make_response(content, 200)
+        r.headers.set('Content-Disposition', 'attachment; filename="layout.png"')
+        return r
@@ -0,0 +1,52 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from pathlib import Path
+
+import shapely
+from osgeo import ogr
+
+ogr.UseExceptions()
+
+# features buffered at once, bounds the memory of large files
+BATCH_SIZE = 10000
+
+
+def _buffer_batch(features, out_layer, distance: float, segments: int) -> None:
+    geometries = shapely.from_wkb([
+        None if feature.GetGeometryRef() is None else bytes(feature.GetGeometryRef().ExportToWkb())
+        for feature in features
+    ])
+    out_definition = out_layer.GetLayerDefn()
+    for feature, wkb in zip(features, shapely.to_wkb(shapely.buffer(geometries, distance, quad_segs=segments))):
+        out_feature = ogr.Feature(out_definition)
+        out_feature.SetFrom(feature)
+        out_feature.SetGeometry(None if wkb is None else ogr.ForceToMultiPolygon(ogr.CreateGeometryFromWkb(wkb)))
+        out_layer.CreateFeature(out_feature)
+
+
+def buffer_geopackage(in_path: Path, out_path: Path, distance: float, segments: int = 5) -> None:
+    """
+    Buffer the features of the first layer of a GeoPackage like native:buffer of QGIS with its defaults
+    (round caps and joins, no dissolve), keeping their attributes. GEOS buffers a batch of geometries at once
+    """
+    source = ogr.Open(str(in_path))
+    layer = source.GetLayer(0)
+    target = ogr.GetDriverByName('GPKG').CreateDataSource(str(out_path))
+    out_layer = target.CreateLayer(layer.GetName(), layer.GetSpatialRef(), ogr.wkbMultiPolygon)
+    definition = layer.GetLayerDefn()
+    for i in range(definition.GetFieldCount()):
+        out_layer.CreateField(definition.GetFieldDefn(i))
+    # - - - - - - - - - - - - - - - - - - - -
+    out_layer.StartTransaction()
+    batch = []
+    for feature in layer:
+        batch.append(feature)
+        if len(batch) == BATCH_SIZE:
+            _buffer_batch(batch, out_layer, distance, segments)
+            batch = []
+    _buffer_batch(batch, out_layer, distance, segments)
+    out_layer.CommitTransaction()
+    target.FlushCache()
+    target = None
+    source = None
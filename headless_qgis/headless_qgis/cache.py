@@ -0,0 +1,104 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import json
+import os
+import shutil
+import tempfile
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Iterable, Optional
+
+# bytes read at a time when hashing
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: Path) -> str:
+    digest = sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def print_key(script: Path, data: Iterable[Path]) -> str:
+    """
+    Content address of a print: the hashes of the script and of the data files under their names, which the
+    scripts open them by
+    """
+    return sha256(json.dumps([
+        file_digest(script),
+        sorted((path.name, file_digest(path)) for path in data),
+    ]).encode()).hexdigest()
+
+
+class FileCache:
+    """
+    Files stored under a hex digest, shared by the processes of a host. Entries are copied to a temporary
+    file of their own and renamed when complete; serving an entry refreshes its modification time, and the
+    least recently used entries are removed once the directory holds more than `max_bytes`
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ''):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._written = 0
+        self._lock = Lock()
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / f'{key}{self.suffix}'
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """
+        The entry opened for reading, None if there is none. An open entry stays readable when it is evicted
+        """
+        path = self.path(key)
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(file.fileno())
+        except OSError:
+            pass
+        return file
+
+    def put(self, key: str, source: Path) -> None:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # every put writes a file of its own, threads and processes may store the same key at once
+        descriptor, name = tempfile.mkstemp(prefix=f'.{path.name}.', dir=path.parent)
+        os.close(descriptor)
+        temporary_path = Path(name)
+        try:
+            shutil.copyfile(source, temporary_path)
+            size = temporary_path.stat().st_size
+            temporary_path.replace(path)
+        finally:
+            temporary_path.unlink(missing_ok=True)
+        # the directory is only scanned after roughly a tenth of the capacity has been written by this process
+        with self._lock:
+            self._written += size
+            if self._written < self.max_bytes / 10:
+                return
+            self._written = 0
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for path in self.directory.glob('*/*'):
+            if path.name.startswith('.'):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
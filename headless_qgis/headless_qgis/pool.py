@@ -0,0 +1,172 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import multiprocessing
+import os
+import queue
+import runpy
+import sys
+import traceback
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+
+class PrintError(Exception):
+    pass
+
+
+class _SharedApplication:
+    """
+    Stands in for QgsApplication while a print script runs. The scripts create and initialise the application
+    themselves; here they get the one of the worker, which stays initialised after them
+    """
+
+    def __init__(self, application_class, application):
+        self._application_class = application_class
+        self._application = application
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def initQgis(self):
+        pass
+
+    def exitQgis(self):
+        pass
+
+    def exec_(self):
+        return 0
+
+    def __getattr__(self, name):
+        if hasattr(self._application, name):
+            return getattr(self._application, name)
+        return getattr(self._application_class, name)
+
+
+def _run_script(script: Path, data_dir: Path, out_path: Path, shared_application) -> None:
+    import qgis.core
+    from qgis.core import QgsProject
+    # - - - - - - - - - - - - - - - - - - - -
+    application_class = qgis.core.QgsApplication
+    argv, cwd = sys.argv, os.getcwd()
+    sys.argv = [str(script), str(data_dir), str(out_path)]
+    os.chdir(data_dir)
+    qgis.core.QgsApplication = shared_application
+    try:
+        runpy.run_path(str(script), run_name='__main__')
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise PrintError(f'script exited with {e.code}')
+    finally:
+        qgis.core.QgsApplication = application_class
+        sys.argv = argv
+        os.chdir(cwd)
+        QgsProject.instance().clear()
+
+
+def _serve(connection, max_jobs: int) -> None:
+    """
+    Main function of a worker process: initialise QGIS once, then run the print jobs received on connection
+    until max_jobs are done
+    """
+    os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    os.environ.setdefault('XDG_RUNTIME_DIR', 'offscreen')
+    from qgis.core import QgsApplication
+    # - - - - - - - - - - - - - - - - - - - -
+    QgsApplication.setPrefixPath('/usr', True)
+    application = QgsApplication([], False)
+    application.initQgis()
+    shared_application = _SharedApplication(QgsApplication, application)
+    connection.send(('ready', None))
+    for _ in range(max_jobs):
+        script, data_dir, out_path = connection.recv()
+        try:
+            _run_script(Path(script), Path(data_dir), Path(out_path), shared_application)
+            connection.send(('done', None))
+        except BaseException:
+            connection.send(('failed', traceback.format_exc()))
+    connection.close()
+
+
+class _Worker:
+
+    def __init__(self, context, max_jobs: int, start_timeout: float):
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=_serve, args=(worker_connection, max_jobs), daemon=True)
+        self.process.start()
+        worker_connection.close()
+        self.jobs_left = max_jobs
+        if not self.connection.poll(start_timeout):
+            self.stop()
+            raise PrintError('QGIS worker did not start')
+        self.connection.recv()
+
+    def run(self, script: Path, data_dir: Path, out_path: Path, timeout: float) -> None:
+        self.jobs_left -= 1
+        self.connection.send((str(script), str(data_dir), str(out_path)))
+        if not self.connection.poll(timeout):
+            raise TimeoutError(f'print did not finish within {timeout} seconds')
+        try:
+            status, error = self.connection.recv()
+        except EOFError:
+            # the process died with the print, it is replaced
+            self.jobs_left = 0
+            raise PrintError('QGIS worker crashed') from None
+        if status != 'done':
+            raise PrintError(error)
+
+    def stop(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class PrintPool:
+    """
+    Long-lived worker processes which keep QGIS initialised and run the print scripts one at a time. Requests
+    wait up to `timeout` seconds for an idle worker. A worker is replaced after `max_jobs` prints, so leaks of
+    the scripts do not pile up, and whenever a print crashed it or timed out
+    """
+
+    def __init__(self, size: int, max_jobs: int, timeout: float, start_timeout: float = 60):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self._context = multiprocessing.get_context('spawn')
+        self._idle: queue.Queue[Optional[_Worker]] = queue.Queue()
+        self._lock = Lock()
+        self._started = False
+
+    def _start(self) -> None:
+        with self._lock:
+            if not self._started:
+                # workers are started by the first requests waiting for them
+                for _ in range(self.size):
+                    self._idle.put(None)
+                self._started = True
+
+    def print_layout(self, script: Path, data_dir: Path, out_path: Path) -> None:
+        self._start()
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f'no QGIS worker idle within {self.timeout} seconds')
+        try:
+            if worker is None:
+                worker = _Worker(self._context, self.max_jobs, self.start_timeout)
+            worker.run(script, data_dir, out_path, self.timeout)
+        except PrintError:
+            raise
+        except BaseException:
+            if worker is not None:
+                worker.stop()
+            worker = None
+            raise
+        finally:
+            if worker is not None and worker.jobs_left <= 0:
+                worker.process.join(self.start_timeout)
+                worker.stop()
+                worker = None
+            self._idle.put(worker)
@@ -2,10 +2,8 @@
 
 INFILENAME="$1"
 DISTANCE="$2"
-OUTFILENAME=/tmp/result.gpkg
+OUTFILENAME="$3"
 
 export QT_QPA_PLATFORM=offscreen
 
 qgis_process run native:buffer -- INPUT="$INFILENAME" DISTANCE="$DISTANCE" OUTPUT="$OUTFILENAME" > /dev/null
-
-cat "$OUTFILENAME"
\ No newline at end of file
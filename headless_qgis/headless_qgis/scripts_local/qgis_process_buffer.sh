@@ -11,4 +11,5 @@ docker run --rm \
     --entrypoint=qgis_process \
     qgis/qgis  \
     run native:buffer -- INPUT=/data/in.gpkg DISTANCE=$distance OUTPUT=/data/result.gpkg > /dev/null
-cat $TEMPDIR/result.gpkg
+cp $TEMPDIR/result.gpkg $3
+rm -r $TEMPDIR
@@ -0,0 +1,86 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from http.client import HTTPException
+from pathlib import Path
+from time import time
+from urllib.request import urlopen
+
+from .cache import FileCache
+
+# bytes copied at a time from a response
+CHUNK_SIZE = 1 << 20
+
+
+class SourceError(ValueError):
+    pass
+
+
+class SourceDownloadError(Exception):
+    """
+    A query of a print job failed at geoservice or could not be downloaded
+    """
+
+    def __init__(self, filename: str, error: Exception):
+        super().__init__(f'source {filename!r} could not be downloaded: {error}')
+        self.filename = filename
+
+
+class SourceFetcher:
+    """
+    Downloads the geoservice queries a print job references, e.g. '/api/geo/?source=gadm&filter_adm0=DEU',
+    into its data directory, all at once. Responses are kept in `cache` for `max_age` seconds, the time
+    geoservice allows its responses to be cached, so prints of the same data query it once
+    """
+
+    def __init__(self, base_url: str, cache: FileCache, max_age: float, threads: int, timeout: float):
+        self.base_url = base_url
+        self.cache = cache
+        self.max_age = max_age
+        self.threads = threads
+        self.timeout = timeout
+
+    def _key(self, url: str) -> str:
+        # the key changes every max_age seconds, entries of earlier periods are evicted as the least recently used
+        period = int(time() // self.max_age) if self.max_age > 0 else 0
+        return sha256(f'{url} {period}'.encode()).hexdigest()
+
+    def _fetch(self, url: str, path: Path) -> None:
+        key = self._key(url) if self.cache.max_bytes > 0 and self.max_age > 0 else None
+        cached = self.cache.open(key) if key else None
+        if cached is not None:
+            with cached, open(path, 'wb') as file:
+                shutil.copyfileobj(cached, file, CHUNK_SIZE)
+            return
+        try:
+            with urlopen(url, timeout=self.timeout) as response, open(path, 'wb') as file:
+                shutil.copyfileobj(response, file, CHUNK_SIZE)
+        except (OSError, HTTPException) as e:
+            # HTTPError and URLError are OSErrors, like timeouts
+            raise SourceDownloadError(path.name, e) from e
+        if key:
+            self.cache.put(key, path)
+
+    def fetch(self, sources: dict, data_path: Path) -> list[Path]:
+        """
+        Save the response of every query of `sources`, a mapping of file names to geoservice paths, under
+        its file name in data_path. Raises SourceDownloadError for the first query which failed
+        """
+        if not self.base_url:
+            raise SourceError('HEADLESS_QGIS_GEOSERVICE_URL is not configured')
+        jobs = []
+        for filename, query in sources.items():
+            if not isinstance(query, str) or not query.startswith('/api/'):
+                raise SourceError(f'source {filename!r} is not a geoservice path')
+            if os.path.basename(filename) != filename or filename in ('', '.', '..', 'script.py', 'out'):
+                raise SourceError(f'invalid source file name {filename!r}')
+            jobs.append((self.base_url.rstrip('/') + query, data_path / filename))
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(min(self.threads, len(jobs))) as executor:
+            list(executor.map(lambda job: self._fetch(*job), jobs))
+        return [path for _, path in jobs]
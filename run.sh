@@ -2,18 +2,37 @@
 
 GEOSERVICE_WEBWORKER_AMOUNT="${GEOSERVICE_WEBWORKER_AMOUNT:-8}"
 GEOSERVICE_WEBWORKER_TIMEOUT="${GEOSERVICE_WEBWORKER_TIMEOUT:-5}"
+GEOSERVICE_WEBWORKER_THREADS="${GEOSERVICE_WEBWORKER_THREADS:-4}"
+GEOSERVICE_WEBWORKER_PRELOAD="${GEOSERVICE_WEBWORKER_PRELOAD:-false}"
+GEOSERVICE_ASGI_WORKER_AMOUNT="${GEOSERVICE_ASGI_WORKER_AMOUNT:-2}"
+
+GUNICORN_CONFIG=(--config python:geoservice.workers)
+if [ "${GEOSERVICE_WEBWORKER_PRELOAD,,}" = "true" ]; then
+    GUNICORN_CONFIG=(--config python:geoservice.preload)
+fi
 
 case "$1" in
 
     ""|"webserver")
         gunicorn \
+            "${GUNICORN_CONFIG[@]}" \
             --access-logfile - \
             --timeout "$GEOSERVICE_WEBWORKER_TIMEOUT" \
             --workers "$GEOSERVICE_WEBWORKER_AMOUNT" \
+            --worker-class gthread \
+            --threads "$GEOSERVICE_WEBWORKER_THREADS" \
             --bind 0.0.0.0:8080 \
             geoservice:app
     ;;
 
+    "asgi")
+        uvicorn \
+            --workers "$GEOSERVICE_ASGI_WORKER_AMOUNT" \
+            --host 0.0.0.0 \
+            --port 8080 \
+            geoservice.asgi:application
+    ;;
+
     "worker")
         flask work
     ;;
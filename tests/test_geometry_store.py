@@ -0,0 +1,77 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import json
+
+import numpy
+import pandas
+import shapely
+from shapely.geometry import MultiPolygon, box
+
+from geoservice.utils.geometry_store import open_store, write_partitions
+
+
+def test_write_and_open(tmp_path):
+    # -----------------------------------------------------------------
+    # GIVEN
+    path = str(tmp_path / 'geometries')
+    vg250 = pandas.DataFrame({
+        'partition': ['KRS'] * 3,
+        'geometry_level': [3, 3, 3],
+        'code': ['01001', '01002', '01003'],
+        'name': ['Flensburg', 'Kiel', None],
+        'agg_level': ['KRS'] * 3,
+        'source': ['vg250'] * 3,
+        'area': [1.0, 4.01, None],
+        'part_areas': [[1.0], [4.0, 0.01], None],
+        'geometry': [
+            shapely.to_wkb(box(1, 1, 2, 2)),
+            shapely.to_wkb(MultiPolygon([box(3, 3, 5, 5), box(6, 6, 6.1, 6.1)])),
+            None,
+        ],
+    })
+    attributes = pandas.DataFrame({'arsk': ['01001'], 'ewz': [90000], 'id': [1]})
+    # -----------------------------------------------------------------
+    # WHEN
+    write_partitions(path, {'vg250': 2}, [(('vg250', 'KRS', 3), vg250)], attributes)
+    store = open_store(path, {'gadm': 0, 'vg250': 2})
+    # -----------------------------------------------------------------
+    # THEN
+    partition = store[('vg250', 'KRS', 3)]
+    assert partition.column('name').tolist() == ['Flensburg', 'Kiel', None]
+    assert partition.column('geometry_level').tolist() == [3, 3, 3]
+    assert partition.candidates((0, 0, 3.5, 3.5)).tolist() == [True, True, False]
+    frame = partition.frame(numpy.array([1]))
+    assert frame['part_areas'].tolist() == [[4.0, 0.01]]
+    assert frame.geometry[0].equals(MultiPolygon([box(3, 3, 5, 5), box(6, 6, 6.1, 6.1)]))
+    assert json.loads(frame['feature'][0])['properties'] == {
+        'code': '01002', 'name': 'Kiel', 'geometry_level': 3, 'agg_level': 'KRS', 'source': 'vg250'
+    }
+    assert store['vg250_attributes'].to_dict('records') == [{'arsk': '01001', 'ewz': 90000, 'id': 1}]
+    assert open_store(path, {'vg250': 3}) is None
+    assert open_store(str(tmp_path / 'missing'), {}) is None
+
+
+def test_packed_index(tmp_path):
+    # -----------------------------------------------------------------
+    # GIVEN
+    path = str(tmp_path / 'geometries')
+    squares = [box(x, y, x + 0.5, y + 0.5) for x in range(30) for y in range(20)]
+    adm0 = pandas.DataFrame({
+        'partition': ['gadm'] * (len(squares) + 1),
+        'geometry_level': [3] * (len(squares) + 1),
+        'adm0_code': [str(i) for i in range(len(squares) + 1)],
+        'area': [0.25] * (len(squares) + 1),
+        'part_areas': [[0.25]] * (len(squares) + 1),
+        'geometry': [*shapely.to_wkb(squares), None],
+    })
+    write_partitions(path, {}, [(('adm0', 'gadm', 3), adm0)], pandas.DataFrame({'arsk': []}))
+    partition = open_store(path, {})[('adm0', 'gadm', 3)]
+    # -----------------------------------------------------------------
+    # WHEN
+    found = partition.candidates((10.2, 5.2, 12.2, 6.2))
+    # -----------------------------------------------------------------
+    # THEN
+    assert sorted(partition.column('adm0_code')[found]) == sorted(
+        str(20 * x + y) for x in (10, 11, 12) for y in (5, 6))
+    assert not partition.candidates((100, 100, 101, 101)).any()
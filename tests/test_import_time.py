@@ -0,0 +1,39 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import os
+import subprocess
+import sys
+
+# microseconds `import geoservice` may take, measured by python -X importtime, e.g. 2500000. Without it the
+# budget is a multiple of the import of flask measured in the same run, which holds on any machine
+IMPORT_BUDGET = os.environ.get('IMPORT_TIME_BUDGET')
+FLASK_MULTIPLE = 15
+
+# only imported by the routes or commands which need them
+DEFERRED_MODULES = ['matplotlib', 's3fs', 'minio', 'thefuzz', 'geoservice.controller.data_sources.data_source__base']
+
+
+def _import_times(module: str = 'geoservice') -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=os.environ, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line.split('|')
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_import_time():
+    # -----------------------------------------------------------------
+    # WHEN
+    times = _import_times()
+    # -----------------------------------------------------------------
+    # THEN
+    assert [module for module in DEFERRED_MODULES if module in times] == []
+    budget = int(IMPORT_BUDGET) if IMPORT_BUDGET else FLASK_MULTIPLE * _import_times('flask')['flask']
+    assert times['geoservice'] < budget
@@ -0,0 +1,35 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from geoservice.utils.memory_cache import MemoryCache
+
+
+def test_eviction():
+    # -----------------------------------------------------------------
+    # GIVEN
+    cache = MemoryCache(10, size=len)
+    cache.put_many('v1', {'a': 'aaaa', 'b': 'bbbb'})
+    # -----------------------------------------------------------------
+    # WHEN
+    cache.get('v1', 'a')
+    cache.put('v1', 'c', 'cccc')
+    # -----------------------------------------------------------------
+    # THEN
+    assert cache.get_many('v1', ['a', 'b', 'c']) == {'a': 'aaaa', 'c': 'cccc'}
+    cache.put('v1', 'd', 'd' * 11)
+    assert cache.get_many('v1', ['a', 'c', 'd']) == {}
+
+
+def test_tag_change():
+    # -----------------------------------------------------------------
+    # GIVEN
+    cache = MemoryCache(10, size=len)
+    cache.put('v1', 'a', 'aaaa')
+    # -----------------------------------------------------------------
+    # WHEN
+    value = cache.get('v2', 'a')
+    # -----------------------------------------------------------------
+    # THEN
+    assert value is None
+    cache.put('v2', 'b', 'b' * 10)
+    assert cache.get('v2', 'b') == 'b' * 10
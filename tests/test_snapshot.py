@@ -0,0 +1,32 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import json
+
+import geopandas
+from shapely.geometry import MultiPolygon, box
+
+from geoservice.utils.snapshot import shape
+
+
+def test_shape():
+    # -----------------------------------------------------------------
+    # GIVEN
+    frame = geopandas.GeoDataFrame({
+        'code': ['inside', 'island', 'crossing', 'outside'],
+        'part_areas': [json.dumps([1.0]), json.dumps([4.0, 0.01]), json.dumps([4.0]), json.dumps([1.0])],
+    }, geometry=[
+        box(1, 1, 2, 2),
+        MultiPolygon([box(3, 3, 5, 5), box(6, 6, 6.1, 6.1)]),
+        box(8, 8, 10, 10),
+        box(20, 20, 21, 21),
+    ], crs=4326)
+    # -----------------------------------------------------------------
+    # WHEN
+    shaped, unchanged = shape(frame, (0, 0, 9, 9), min_area=0.1)
+    # -----------------------------------------------------------------
+    # THEN
+    assert shaped['code'].tolist() == ['inside', 'island', 'crossing']
+    assert unchanged.tolist() == [True, False, False]
+    assert shaped.geometry[1].equals(MultiPolygon([box(3, 3, 5, 5)]))
+    assert shaped.geometry[2].equals(box(8, 8, 9, 9))
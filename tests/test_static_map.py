@@ -0,0 +1,77 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import numpy
+import pytest
+from shapely.geometry import MultiPolygon, Point, box
+
+from geoservice.utils.static_map import (BOUNDARY_STYLES, LANDSCAN_MAX, MERCATOR_EXTENT, bounds, boundary_layer,
+                                         extent, place, raster_layer)
+from geoservice.utils.svg import PALETTE
+
+
+def test_extent_and_bounds():
+    # -----------------------------------------------------------------
+    # WHEN
+    map_extent = extent(-10, -10, 10, 10, 200, 100)
+    # -----------------------------------------------------------------
+    # THEN
+    min_x, min_y, max_x, max_y = map_extent
+    assert (max_x - min_x) / (max_y - min_y) == pytest.approx(2)
+    assert (min_x + max_x, min_y + max_y) == pytest.approx((0, 0), abs=1e-6)
+    west, south, east, north = bounds(map_extent)
+    assert west < -10 and east > 10
+    assert (south, north) == pytest.approx((-10, 10))
+    assert bounds(extent(-180, -90, 180, 90, 100, 100)) == pytest.approx(
+        (-180, -85.0511287798, 180, 85.0511287798))
+    assert extent(-180, -90, 180, 90, 100, 100)[2] == pytest.approx(MERCATOR_EXTENT)
+
+
+def test_place():
+    # -----------------------------------------------------------------
+    # GIVEN
+    map_extent = (0, 0, 40, 30)
+    values = numpy.array([[1.0, 2.0], [3.0, 4.0]])
+    # -----------------------------------------------------------------
+    # WHEN
+    image = place(values, (-10, 20), map_extent, 4, 3)
+    # -----------------------------------------------------------------
+    # THEN
+    assert numpy.isnan(image[0]).all()
+    assert image[1:, 0].tolist() == [2.0, 4.0]
+    assert numpy.isnan(image[1:, 1:]).all()
+    assert numpy.isnan(place(values, (100, 100), map_extent, 4, 3)).all()
+
+
+def test_raster_layer():
+    # -----------------------------------------------------------------
+    # GIVEN
+    values = numpy.array([[numpy.nan, 0.0, LANDSCAN_MAX]])
+    # -----------------------------------------------------------------
+    # WHEN
+    landscan = raster_layer(values, 'landscan')
+    hillshade = raster_layer(numpy.array([[numpy.nan, 128.0, 300.0]]), 'hillshade')
+    # -----------------------------------------------------------------
+    # THEN
+    rgb = [[int(colour[i:i + 2], 16) for i in (1, 3, 5)] for colour in (PALETTE[0], PALETTE[-1])]
+    assert landscan[0, 0, 3] == 0
+    assert landscan[0, 1].tolist() == [*rgb[0], 255]
+    assert landscan[0, 2].tolist() == [*rgb[1], 255]
+    assert hillshade[0].tolist() == [[0, 0, 0, 0], [128, 128, 128, 255], [255, 255, 255, 255]]
+
+
+def test_boundary_layer():
+    # -----------------------------------------------------------------
+    # GIVEN
+    map_extent = (0, 0, 100, 100)
+    square = box(20, 20, 80, 80)
+    # -----------------------------------------------------------------
+    # WHEN
+    layer = boundary_layer([MultiPolygon([square]), Point(50, 50)], 'adm0', map_extent, 100, 100)
+    # -----------------------------------------------------------------
+    # THEN
+    assert layer.shape == (100, 100, 4)
+    assert layer[50, 20, :3].tolist() == list(BOUNDARY_STYLES['adm0'][0][:3])
+    assert layer[50, 20, 3] > 0
+    assert layer[50, 50, 3] == 0
+    assert layer[5, 5, 3] == 0
@@ -0,0 +1,35 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+import pandas
+from shapely.geometry import MultiPolygon, Point, Polygon
+
+from geoservice.utils.svg import classes, path_data
+
+
+def test_path_data():
+    # -----------------------------------------------------------------
+    # GIVEN
+    square = Polygon([(0, 0), (10, 0), (10, 10), (0, 10)], [[(2, 2), (2, 3), (3, 3), (3, 2)]])
+    too_small = Polygon([(20, 20), (20.2, 20), (20.2, 20.2), (20, 20.2)])
+    # -----------------------------------------------------------------
+    # WHEN
+    data = path_data(MultiPolygon([square, too_small]))
+    # -----------------------------------------------------------------
+    # THEN
+    assert data == 'M0 0l10 0 0 10-10 0zM2 2l0 1 1 0 0-1z'
+    assert path_data(Point(1, 1)) == ''
+
+
+def test_classes():
+    # -----------------------------------------------------------------
+    # WHEN
+    weight_classes = classes(pandas.Series(['DEU', 'FRA', 'POL', 'AUT']), [
+        {'code': 'DEU', 'value': 10.0},
+        {'code': 'FRA', 'value': 5.0},
+        {'code': 'POL', 'value': 2.0},
+    ])
+    # -----------------------------------------------------------------
+    # THEN
+    assert weight_classes.tolist() == [5, 3, 1, 0]
+    assert classes(pandas.Series(['DEU']), []).tolist() == [0]
@@ -0,0 +1,24 @@
+# Copyright 2025 Bundesdruckerei GmbH
+# For the license, see the accompanying file LICENSE.md.
+
+from geoservice.utils.zoom import geometry_level_for_zoom, minimum_area_for_zoom
+
+
+def test_geometry_level_for_zoom():
+    # -----------------------------------------------------------------
+    # WHEN
+    levels = [geometry_level_for_zoom(zoom) for zoom in range(0, 15)]
+    # -----------------------------------------------------------------
+    # THEN
+    assert levels == [10, 10, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1, 1, 0, 0]
+
+
+def test_minimum_area_for_zoom():
+    # -----------------------------------------------------------------
+    # WHEN
+    world_pixel = minimum_area_for_zoom(0)
+    # -----------------------------------------------------------------
+    # THEN
+    assert world_pixel == (360 / 256) ** 2
+    assert minimum_area_for_zoom(1) == world_pixel / 4
+    assert minimum_area_for_zoom(1, pixels=4) == world_pixel